@@ -1,5 +1,13 @@
-import pygame, json, sys, time, os, random
+import pygame, json, sys, time, os, random, hashlib, threading, sqlite3, bisect, uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import date, datetime, timedelta
+import pet_engine
+import save_format
+from save_system import ProfileStore, SaveQueue
+from shared_storage import SharedStorage
+from pet_engine import MAX_PET_LEVEL, EXP_FOR_NEXT_LEVEL
 # -------------------- MODULE:CORE SYSTEM--------------------
 # -------------------- SUB-MODULE:CONSTANTS --------------------
 pygame.init()
@@ -40,37 +48,90 @@ RARITY_COLORS = {
 
 # --- Animation Timings ---
 HATCH_ANIM_DURATION = 1500
+HATCH_FRAME_SIZE = (512, 512)
 PET_ANIM_SPEED = 120
 EFFECT_DURATION = 1.5
+EFFECT_ALPHA_STEPS = 32  # pre-faded copies per effect sprite
+EFFECT_PARTICLES_PER_PET = 15  # three bursts; a new burst reuses the oldest slots
 SCROLL_SPEED = 30
 
 # --- Game Progression ---
 MAX_PET_SLOTS = 15
 PET_SLOT_UNLOCK_PRICES = [50, 150, 400, 1000, 2500, 5000, 10000, 20000, 50000, 100000]
-MAX_PET_LEVEL = 10
-EXP_FOR_NEXT_LEVEL = [
-    600,  # Lvl 0 -> 1 (10 minutes of active time)
-    1200, # Lvl 1 -> 2 (20 minutes)
-    1800, # Lvl 2 -> 3 (30 minutes)
-    2400, # Lvl 3 -> 4 (40 minutes)
-    3600, # Lvl 4 -> 5 (1 hour)
-    5400, # Lvl 5 -> 6 (1.5 hours)
-    7200, # Lvl 6 -> 7 (2 hours)
-    9000, # Lvl 7 -> 8 (2.5 hours)
-    10800,# Lvl 8 -> 9 (3 hours)
-    14400 # Lvl 9 -> 10 (4 hours)
-]
-EXP_GAIN_RATE = 1.0
+# Levels, EXP, decay, income and hatch rules live in pet_engine.py.
 LEFT_SECTION_PETS = ["Bear", "Boar", "Fox", "Wolf"]
 PATH_WIDTH = 500
 PATH_START_X = (SCREEN_WIDTH - PATH_WIDTH) // 2
 PATH_END_X = PATH_START_X + PATH_WIDTH
 
-# --- Pet Names ---
-PET_NAMES = ["Buddy", "Lucy", "Max", "Bella", "Charlie", "Daisy", "Rocky", "Molly", "Toby", "Sadie", "Coco", "Lola", "Jack", "Zoe", "Milo", "Ruby", "Oscar", "Penny", "Leo", "Rosie", "Pip", "Fuzzy", "Sparky", "Noodle", "Waffles"]
+# --- Sprite Cache ---
+SPRITE_CACHE_MAX_BYTES = 192 * 1024 * 1024
+
+# --- Asset Loader ---
+ASSET_LOADER_WORKERS = 4
+LOADING_FRAME_BUDGET_MS = 8
+ASSET_GROUP_IDLE_SECONDS = 60
+ENEMY_SCALE = 2.0
+
+# --- Surface Cache ---
+SURFACE_CACHE_DIR = os.path.join(".cache", "surfaces")
+SURFACE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+SURFACE_CACHE_MAX_ENTRY_BYTES = 32 * 1024 * 1024
+
+# --- Draw Caches ---
+OVERLAY_CACHE_MAX_ENTRIES = 64
+TEXT_CACHE_MAX_ENTRIES = 512
+PANEL_CHROME_COLORKEY = (255, 0, 255)
+
+# --- Saving ---
+SAVE_COALESCE_SECONDS = 0.5
+NUM_PROFILE_SLOTS = 3
+SHARED_STORAGE_FILE = "global_storage.db"  # point every instance that should share storage at the same file
+SAVE_FORMAT = "json"  # "json" or "binary" (compact, see save_format.py); saves in the other format are converted on load
+
+# --- Inventory ---
+INVENTORY_BACKEND = "memory"  # "memory" (TuiDo) or "sqlite" (TuiDoSQLite, for very large collections)
+
+# --- Dirty Rects ---
+DIRTY_RECT_RENDERING = True
+DIRTY_RECT_FULL_UPDATE_SECONDS = 0.5
 clock = pygame.time.Clock()
 
 # -------------------- SUB-MODULE:HELPER FUNCTIONS --------------------
+pet_atlases = {}
+
+def load_pet_atlas(pet_id):
+    """
+    Returns (sheet, frame table) for ATLAS/<pet_id>.json as written by build_atlases.py,
+    or None when the pet has no atlas and its loose frame files should be used.
+    """
+    if pet_id not in pet_atlases:
+        pet_atlases[pet_id] = None
+        try:
+            table = safe_json_load(f"ATLAS/{pet_id}.json")
+            sheet = safe_image_load(f"ATLAS/{table['image']}").convert_alpha()
+            pet_atlases[pet_id] = (sheet, table["animations"])
+        except (FileNotFoundError, KeyError, ValueError, pygame.error):
+            pass
+    return pet_atlases[pet_id]
+
+def slice_atlas_frames(sheet, rects, scale):
+    return [pygame.transform.scale(sheet.subsurface(pygame.Rect(f["x"],f["y"],f["w"],f["h"])), (int(f["w"]*scale), int(f["h"]*scale))) for f in rects]
+
+CHARACTER_TAGS = ("IdleSouth","IdleNorth","IdleEast","IdleWest","WalkSouth","WalkNorth","WalkEast","WalkWest")
+
+def index_character_frames(frame_data):
+    """
+    Groups the flash.json frames by CHARACTER_TAGS tag ("... #WalkEast 3.aseprite"), in frame name order.
+    Returns {tag: [frame rect dict, ...]}.
+    """
+    tag_frames = {tag: [] for tag in CHARACTER_TAGS}
+    for name in sorted(frame_data):
+        tag = name.partition("#")[2].split(" ")[0]
+        if tag in tag_frames:
+            tag_frames[tag].append(frame_data[name]["frame"])
+    return tag_frames
+
 def load_pet_animation_frames(pet_id, anim_key="idle", scale=1.0):
     if pet_id not in pet_data:
         print(f"Error: Pet ID '{pet_id}' not found in pets.json")
@@ -81,6 +142,13 @@ def load_pet_animation_frames(pet_id, anim_key="idle", scale=1.0):
     path_prefix = p_data['animation_paths'].get(anim_key)
     if not path_prefix: return []
 
+    atlas = load_pet_atlas(pet_id)
+    if atlas and anim_key in atlas[1]:
+        sheet, table = atlas
+        if anim_key == "attack":
+            return [slice_atlas_frames(sheet, style, scale) for style in table[anim_key]]
+        return slice_atlas_frames(sheet, table[anim_key], scale)
+
     if anim_key == "attack":
         all_attack_frames = []
         anim_num = 1
@@ -138,6 +206,90 @@ def load_pet_animation_frames(pet_id, anim_key="idle", scale=1.0):
                 break
         return frames
 
+sprite_frame_cache = OrderedDict()
+sprite_frame_cache_bytes = 0
+
+def frames_byte_size(frames):
+    total = 0
+    for frame in frames:
+        if isinstance(frame, list): total += frames_byte_size(frame)
+        else: total += frame.get_width() * frame.get_height() * frame.get_bytesize()
+    return total
+
+def get_cached_frames(key, build):
+    """
+    Returns the frame list stored under key, building it on a miss.
+    Least recently used entries are evicted once SPRITE_CACHE_MAX_BYTES of pixels are held.
+    """
+    global sprite_frame_cache_bytes
+    frames = sprite_frame_cache.get(key)
+    if frames is not None:
+        sprite_frame_cache.move_to_end(key)
+        return frames
+    frames = build()
+    sprite_frame_cache[key] = frames
+    sprite_frame_cache_bytes += frames_byte_size(frames)
+    while sprite_frame_cache_bytes > SPRITE_CACHE_MAX_BYTES and len(sprite_frame_cache) > 1:
+        _, evicted = sprite_frame_cache.popitem(last=False)
+        sprite_frame_cache_bytes -= frames_byte_size(evicted)
+    return frames
+
+def get_pet_animation_frames(pet_id, anim_key="idle", scale=1.0):
+    """
+    Shared version of load_pet_animation_frames keyed by (pet_id, anim_key, scale).
+    Every pet of the same type gets the same Surface lists, so never draw onto them.
+    """
+    return get_cached_frames((pet_id, anim_key, scale), lambda: load_pet_animation_frames(pet_id, anim_key, scale))
+
+def decode_scaled_pet_frames(pet_id, anim_key, scale):
+    """
+    Runs on a loader thread: a plain (not attack) animation scaled, without display conversion.
+    """
+    path_prefix = pet_data[pet_id]['animation_paths'].get(anim_key)
+    if not path_prefix: return []
+    atlas = pet_atlases.get(pet_id)
+    if atlas and anim_key in atlas[1]:
+        return slice_atlas_frames(atlas[0], atlas[1][anim_key], scale)
+    frames = []
+    i = 1
+    while True:
+        path = f"{path_prefix}{pet_id}_{i}.png"
+        img = decode_images([path])[path]
+        if img is None:
+            if i == 1: print(f"Warning: Could not find first frame for '{pet_id}' at '{path}'")
+            break
+        frames.append(pygame.transform.scale(img, (int(img.get_width() * scale), int(img.get_height() * scale))))
+        i += 1
+    return frames
+
+def prefetch_pet_animation_frames(pet_id, anim_key="idle", scale=1.0):
+    """
+    Starts building get_pet_animation_frames(pet_id, anim_key, scale) on a loader thread.
+    Returns the Future to hand to collect_pet_animation_frames, or None if there is nothing to build.
+    """
+    if pet_id not in pet_data or (pet_id, anim_key, scale) in sprite_frame_cache:
+        return None
+    return asset_loader.executor.submit(decode_scaled_pet_frames, pet_id, anim_key, scale)
+
+def collect_pet_animation_frames(future, pet_id, anim_key="idle", scale=1.0):
+    """
+    Main-thread half of a prefetch: waits for it if it is still running, converts the frames and caches them.
+    Falls back to a normal load when there was no prefetch.
+    """
+    def build():
+        if future is None:
+            return load_pet_animation_frames(pet_id, anim_key, scale)
+        return [frame.convert_alpha() for frame in future.result()]
+    return get_cached_frames((pet_id, anim_key, scale), build)
+
+def evict_cached_frames(should_evict):
+    """
+    Drops every cached frame list whose key matches should_evict(key).
+    """
+    global sprite_frame_cache_bytes
+    for key in [k for k in sprite_frame_cache if should_evict(k)]:
+        sprite_frame_cache_bytes -= frames_byte_size(sprite_frame_cache.pop(key))
+
 def load_enemy_animation_frames(enemy_id, anim_key="idle", scale=1.0):
     if enemy_id not in enemy_data:
         print(f"Error: Enemy ID '{enemy_id}' not found in enemies.json")
@@ -164,15 +316,87 @@ def load_enemy_animation_frames(enemy_id, anim_key="idle", scale=1.0):
             break
     return frames
 
+def get_enemy_animation_frames(enemy_id, anim_key="idle", scale=1.0):
+    """
+    Shared version of load_enemy_animation_frames, cached under ("enemy", enemy_id, anim_key, scale).
+    """
+    return get_cached_frames(("enemy", enemy_id, anim_key, scale), lambda: load_enemy_animation_frames(enemy_id, anim_key, scale))
+
+def get_mirrored_frames(key, frames):
+    """
+    Horizontally flipped copies of frames, the list cached under key, kept in the same cache under key + ("mirrored",).
+    """
+    return get_cached_frames(key + ("mirrored",), lambda: [pygame.transform.flip(frame, True, False) for frame in frames])
+
 # -------------------- SUB-MODULE:LOADER --------------------
+ASSET_ROOTS = ["ATLAS", "CHARACTER", "ENTITY", "FONT", "GUI", "JSON", "MUSIC", "PET_ATTACK", "PET_IDLE", "PET_WALKING", "SHOP_ITEMS"]
+ASSET_MANIFEST_FILE = "asset_manifest.json"
+asset_index = {}
+asset_index_roots = set()
+asset_index_from_manifest = False
+asset_index_misses = set()  # keys a manifest-built index lacked and the disk did not have either
+
+def asset_key(file_path):
+    return os.path.normpath(file_path).replace("\\", "/").lower()
+
+def build_asset_index():
+    """
+    Maps every lower-cased relative path under ASSET_ROOTS to its real path.
+    Uses ASSET_MANIFEST_FILE when it exists, otherwise walks the asset folders once.
+    """
+    global asset_index, asset_index_roots, asset_index_from_manifest
+    asset_index = {}
+    asset_index_misses.clear()
+    relative_paths = None
+    if os.path.exists(ASSET_MANIFEST_FILE):
+        try:
+            with open(ASSET_MANIFEST_FILE) as f:
+                relative_paths = json.load(f)["files"]
+        except (json.JSONDecodeError, KeyError, OSError):
+            print(f"Warning: '{ASSET_MANIFEST_FILE}' is unreadable. Scanning asset folders instead.")
+    asset_index_from_manifest = relative_paths is not None
+    if relative_paths is None:
+        relative_paths = []
+        for root in ASSET_ROOTS:
+            for dirpath, _, filenames in os.walk(root):
+                relative_paths.extend(os.path.join(dirpath, name).replace("\\", "/") for name in filenames)
+    for path in relative_paths:
+        asset_index[asset_key(path)] = path
+    asset_index_roots = {root.lower() for root in ASSET_ROOTS}
+    print(f"Indexed {len(asset_index)} asset files.")
+
+def save_asset_manifest():
+    """
+    Writes the current index so packaged builds can skip the folder scan.
+    """
+    with open(ASSET_MANIFEST_FILE, "w") as f:
+        json.dump({"files": sorted(asset_index.values())}, f, indent=2)
+    print(f"Asset manifest written to '{ASSET_MANIFEST_FILE}'.")
+
 def load_file_case_insensitive(file_path):
     """
     Attempts to load a file in a case-insensitive manner.
     Returns the correct path if found, None if not found.
+    Paths under ASSET_ROOTS are answered from the asset index without touching the disk. A scanned
+    index is complete, so a miss there is final. A manifest can be older than the folders, so a path
+    it lacks (e.g. an atlas built after it was written) is looked up on disk once and the answer kept.
     """
+    key = asset_key(file_path)
+    if key.split("/", 1)[0] in asset_index_roots:
+        if key in asset_index:
+            return asset_index[key]
+        if not asset_index_from_manifest or key in asset_index_misses:
+            return None
+        found = find_file_on_disk(file_path)
+        if found: asset_index[key] = found
+        else: asset_index_misses.add(key)
+        return found
+    return find_file_on_disk(file_path)
+
+def find_file_on_disk(file_path):
     if os.path.exists(file_path):
         return file_path
-    
+
     directory = os.path.dirname(file_path)
     target_filename = os.path.basename(file_path)
     
@@ -194,7 +418,11 @@ def load_file_case_insensitive(file_path):
 def safe_image_load(file_path):
     """
     Safely loads an image with case-insensitive file matching.
+    Images already decoded by the asset loader are returned without touching the disk.
     """
+    surface = predecoded_images.get(asset_key(file_path))
+    if surface is not None:
+        return surface
     correct_path = load_file_case_insensitive(file_path)
     if correct_path:
         return pygame.image.load(correct_path)
@@ -211,6 +439,188 @@ def safe_json_load(file_path):
             return json.load(f)
     else:
         raise FileNotFoundError(f"File not found: {file_path}")
+
+predecoded_images = {}
+
+def decode_images(paths):
+    """
+    Runs on a loader thread: reads and decodes each file, without any display conversion.
+    Returns {path: Surface or None}.
+    """
+    surfaces = {}
+    for path in paths:
+        correct_path = load_file_case_insensitive(path)
+        try:
+            surfaces[path] = pygame.image.load(correct_path) if correct_path else None
+        except pygame.error:
+            surfaces[path] = None
+    return surfaces
+
+@contextmanager
+def predecoded(surfaces):
+    """
+    Lets safe_image_load answer the given paths from already decoded surfaces.
+    """
+    for path, surface in surfaces.items():
+        if surface is not None:
+            predecoded_images[asset_key(path)] = surface
+    try:
+        yield
+    finally:
+        for path in surfaces:
+            predecoded_images.pop(asset_key(path), None)
+
+def surface_cache_path(sources, sizes, pixel_format, variant=""):
+    """
+    Returns the cache file for surfaces built from sources at the given sizes, or None if a source is missing.
+    The key covers each source's real path, mtime and size, the target sizes, the pixel format,
+    the display resolution and variant (to tell apart entries cut from different parts of one source),
+    so any change to them misses the old entry.
+    """
+    key = hashlib.sha1()
+    for source in sources:
+        real_path = load_file_case_insensitive(source)
+        if not real_path:
+            return None
+        stat = os.stat(real_path)
+        key.update(f"{real_path}|{stat.st_mtime_ns}|{stat.st_size}|".encode())
+    key.update(f"{sizes}|{pixel_format}|{SCREEN_WIDTH}x{SCREEN_HEIGHT}|{variant}".encode())
+    return os.path.join(SURFACE_CACHE_DIR, key.hexdigest() + ".raw")
+
+def read_cached_surfaces(cache_path, sizes, pixel_format):
+    """
+    Rebuilds the surfaces stored at cache_path with pygame.image.frombuffer, or returns None on a miss.
+    The surfaces share the file's buffer; convert them before keeping them around.
+    """
+    try:
+        with open(cache_path, "rb") as f:
+            data = memoryview(f.read())
+    except OSError:
+        return None
+    bytes_per_pixel = len(pixel_format)
+    if len(data) != sum(w * h * bytes_per_pixel for w, h in sizes):
+        return None
+    try:
+        os.utime(cache_path)
+    except OSError:
+        pass
+    surfaces, offset = [], 0
+    for w, h in sizes:
+        length = w * h * bytes_per_pixel
+        surfaces.append(pygame.image.frombuffer(data[offset:offset + length], (w, h), pixel_format))
+        offset += length
+    return surfaces
+
+def write_cached_surfaces(cache_path, data):
+    try:
+        os.makedirs(SURFACE_CACHE_DIR, exist_ok=True)
+        temp_path = f"{cache_path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, cache_path)
+        trim_surface_cache()
+    except OSError as e:
+        print(f"Warning: Could not write surface cache entry. Error: {e}")
+
+def trim_surface_cache():
+    """
+    Deletes the least recently used entries until the cache fits SURFACE_CACHE_MAX_BYTES.
+    """
+    entries = []
+    for entry in os.scandir(SURFACE_CACHE_DIR):
+        if entry.name.endswith(".raw"):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= SURFACE_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+def store_cached_surfaces(cache_path, surfaces, pixel_format):
+    """
+    Copies the pixels out on the calling (main) thread and writes the file on a loader thread.
+    Entries over SURFACE_CACHE_MAX_ENTRY_BYTES are not stored.
+    """
+    if sum(s.get_width() * s.get_height() for s in surfaces) * len(pixel_format) > SURFACE_CACHE_MAX_ENTRY_BYTES:
+        return
+    data = b"".join(pygame.image.tobytes(surface, pixel_format) for surface in surfaces)
+    asset_loader.executor.submit(write_cached_surfaces, cache_path, data)
+
+def decode_scaled_image(path, size, has_alpha):
+    """
+    Loader-thread half of a scaled image.
+    Returns (Surface or None, cache path, True if the Surface is already scaled from the cache).
+    """
+    pixel_format = "RGBA" if has_alpha else "RGB"
+    cache_path = surface_cache_path([path], [size], pixel_format) if size else None
+    if cache_path:
+        cached = read_cached_surfaces(cache_path, [size], pixel_format)
+        if cached:
+            return cached[0], cache_path, True
+    return decode_images([path])[path], cache_path, False
+
+def finish_scaled_image(img, size, has_alpha, cache_path, from_cache):
+    """
+    Main-thread half of a scaled image: converts it, and scales and caches it if it came from the file.
+    """
+    if from_cache:
+        return img.convert_alpha() if has_alpha else img.convert()
+    img = img.convert_alpha() if has_alpha else img.convert()
+    if size:
+        img = pygame.transform.scale(img, size)
+    if cache_path:
+        store_cached_surfaces(cache_path, [img], "RGBA" if has_alpha else "RGB")
+    return img
+
+def load_scaled_image(path, size, has_alpha):
+    """
+    Synchronous load through the surface cache. Returns None if the file is missing.
+    """
+    img, cache_path, from_cache = decode_scaled_image(path, size, has_alpha)
+    if img is None:
+        return None
+    return finish_scaled_image(img, size, has_alpha, cache_path, from_cache)
+
+class AssetLoader:
+    """
+    File reads and decodes run on a thread pool; each task's finish callback
+    (convert, scale, assign) runs on the main thread inside pump()'s time slice.
+    """
+    def __init__(self, workers):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="asset-loader")
+        self.pending = deque()
+        self.total = 0
+        self.finished = 0
+    def add(self, work, finish):
+        self.pending.append((self.executor.submit(work), finish))
+        self.total += 1
+    def add_images(self, paths, finish):
+        self.add(lambda: decode_images(paths), finish)
+    def pump(self, budget_ms):
+        deadline = time.perf_counter() + budget_ms / 1000
+        while self.pending and self.pending[0][0].done():
+            future, finish = self.pending.popleft()
+            finish(future.result())
+            self.finished += 1
+            if time.perf_counter() >= deadline:
+                break
+    def progress(self):
+        return self.finished / self.total if self.total else 1.0
+    def is_done(self):
+        return not self.pending
+
+build_asset_index()
+if "--write-asset-manifest" in sys.argv:
+    save_asset_manifest()
+    pygame.quit()
+    sys.exit()
+asset_loader = AssetLoader(ASSET_LOADER_WORKERS)
+
 try:
     correct_font_path = load_file_case_insensitive("FONT/PixelEmulator.otf")
     if correct_font_path:
@@ -230,39 +640,18 @@ except (FileNotFoundError, OSError):
     font_reveal = pygame.font.Font(None, 80)
 
 # -------------------- Load Resources --------------------
-try:
-    title_img = safe_image_load("GUI/title_screen2.png")
-    title_img = pygame.transform.scale(title_img, (SCREEN_WIDTH, SCREEN_HEIGHT))
-except pygame.error:
+title_img = load_scaled_image("GUI/title_screen2.png", (SCREEN_WIDTH, SCREEN_HEIGHT), True)
+if title_img is None:
     print("Warning: title_screen2.png not found.")
     title_img = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-try:
-    bg_img = safe_image_load("GUI/background.jpg").convert()
-    bg_img = pygame.transform.scale(bg_img, (SCREEN_WIDTH, SCREEN_HEIGHT))
-except pygame.error:
-    print("Warning: background.jpg not found.")
-    bg_img = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-    bg_img.fill((30,10,40))
-try:
-    trash_can_img_original = safe_image_load("GUI/trashcan.png").convert_alpha()
-    trash_can_img = pygame.transform.scale(trash_can_img_original, (48, 48))
-except pygame.error:
-    print("Warning: GUI/trashcan.png not found.")
-    trash_can_img = None
-try:
-    coin_img_original = safe_image_load("ENTITY/currency.jpg").convert_alpha()
-    coin_img = pygame.transform.scale(coin_img_original, (48, 48))
-except pygame.error:
-    print("Warning: ENTITY/currency.jpg not found.")
-    coin_img = pygame.Surface((48,48))
-    coin_img.fill((255,215,0))
-try:
-    clock_img_original = safe_image_load("ENTITY/clock.png").convert_alpha()
-    clock_img = pygame.transform.scale(clock_img_original, (48, 48))
-except pygame.error:
-    print("Warning: ENTITY/clock.png not found.")
-    clock_img = pygame.Surface((48,48))
-    clock_img.fill(WHITE)
+# The loading scene swaps these placeholders for the real images; a placeholder stays if its file is missing.
+bg_img = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+bg_img.fill((30,10,40))
+trash_can_img = None
+coin_img = pygame.Surface((48,48))
+coin_img.fill((255,215,0))
+clock_img = pygame.Surface((48,48))
+clock_img.fill(WHITE)
 try:
     theme_song_path = load_file_case_insensitive("MUSIC/theme.mp3")
     if not theme_song_path:
@@ -271,151 +660,85 @@ except Exception as e:
     print(f"Warning: Could not prepare music. Error: {e}")
     theme_song_path = None
 try:
-    frame_data = safe_json_load("CHARACTER/flash.json")["frames"]
+    character_frames = index_character_frames(safe_json_load("CHARACTER/flash.json")["frames"])
 except FileNotFoundError:
     print("FATAL ERROR: CHARACTER/flash.json not found.")
     pygame.quit()
     sys.exit()
-try:
-    map_image_original = safe_image_load("GUI/map.jpg").convert()
-    play_map_img = pygame.transform.scale(map_image_original, (SCREEN_WIDTH, SCREEN_HEIGHT))
-except pygame.error:
-    print("Warning: GUI/map.jpg not found.")
-    play_map_img = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-    play_map_img.fill(GRAY)
+play_map_img = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+play_map_img.fill(GRAY)
 map_rect = play_map_img.get_rect()
-try:
-    fence_img = safe_image_load("ENTITY/fence.png").convert_alpha()
-    fence_img = pygame.transform.scale(fence_img, (64, 64))
-except pygame.error:
-    print("Warning: ENTITY/fence.png not found.")
-    fence_img = pygame.Surface((64,64))
-    fence_img.fill(PANEL_BORDER_COLOR)
-try:
-    hatch_img = safe_image_load("GUI/hatch.png").convert_alpha()
-except pygame.error:
-    print("Warning: GUI/hatch.png not found.")
-    hatch_img = pygame.Surface((128, 64), pygame.SRCALPHA)
-    hatch_img.fill((180, 140, 80))
-try:
-    lock_img_original = safe_image_load("GUI/lock.png").convert_alpha()
-    lock_img = pygame.transform.scale(lock_img_original, (64, 64))
-except pygame.error:
-    print("Warning: GUI/lock.png not found.")
-    lock_img = pygame.Surface((64, 64), pygame.SRCALPHA)
-    pygame.draw.rect(lock_img, GRAY, (16, 32, 32, 32), border_radius=5)
-    pygame.draw.arc(lock_img, GRAY, (8, 8, 48, 48), 0, 3.14, 8)
-try:
-    sold_out_img_original = safe_image_load("GUI/sold.png").convert_alpha()
-    sold_out_img = pygame.transform.scale(sold_out_img_original, (128, 128))
-except pygame.error:
-    print("Warning: GUI/sold.png not found.")
-    sold_out_img = pygame.Surface((128, 128), pygame.SRCALPHA)
-    sold_out_text = font_small.render("SOLD", True, (200, 0, 0))
-    sold_out_img.blit(sold_out_text, (30, 50))
-try:
-    backpack_img_original = safe_image_load("GUI/backpack.png").convert_alpha()
-    backpack_img = pygame.transform.scale(backpack_img_original, (64, 64))
-    backpack_rect = backpack_img.get_rect(midleft=(20, SCREEN_HEIGHT // 2))
-except pygame.error:
-    print("Warning: GUI/backpack.png not found.")
-    backpack_img = pygame.Surface((64, 64))
-    backpack_img.fill(PANEL_BORDER_COLOR)
-    backpack_rect = backpack_img.get_rect(midleft=(20, SCREEN_HEIGHT // 2))
-try:
-    pet_menu_icon_original = safe_image_load("GUI/paw_icon.png").convert_alpha()
-    pet_menu_icon = pygame.transform.scale(pet_menu_icon_original, (64, 64))
-    pet_menu_rect = pet_menu_icon.get_rect(midleft=(20, backpack_rect.bottom + 40))
-except pygame.error:
-    print("Warning: GUI/paw_icon.png not found.")
-    pet_menu_icon = pygame.Surface((64, 64), pygame.SRCALPHA)
-    pygame.draw.circle(pet_menu_icon, PANEL_BORDER_COLOR, (32, 32), 30)
-    pygame.draw.circle(pet_menu_icon, TEXT_COLOR, (32, 32), 26)
-    pet_menu_rect = pet_menu_icon.get_rect(midleft=(20, backpack_rect.bottom + 40))
-try:
-    heart_img = safe_image_load("GUI/heart.png").convert_alpha()
-    heart_img = pygame.transform.scale(heart_img, (32, 32))
-except pygame.error:
-    print("Warning: GUI/heart.png not found.")
-    heart_img = pygame.Surface((32,32), pygame.SRCALPHA)
-    pygame.draw.circle(heart_img, (255, 105, 180), (16,16), 14, 0)
-try:
-    smile_img = safe_image_load("GUI/smile.png").convert_alpha()
-    smile_img = pygame.transform.scale(smile_img, (32, 32))
-except pygame.error:
-    print("Warning: GUI/smile.png not found.")
-    smile_img = pygame.Surface((32,32), pygame.SRCALPHA)
-    pygame.draw.circle(smile_img, HAPPINESS_COLOR, (16,16), 14, 0)
-try:
-    mission_icon_original = safe_image_load("GUI/mission_icon.png").convert_alpha()
-    mission_icon_img = pygame.transform.scale(mission_icon_original, (64, 64))
-    mission_icon_rect = mission_icon_img.get_rect(midleft=(20, pet_menu_rect.bottom + 40))
-except pygame.error:
-    print("Warning: GUI/mission_icon.png not found.")
-    mission_icon_img = pygame.Surface((64, 64))
-    mission_icon_img.fill(QUEST_PROGRESS_COLOR)
-    mission_icon_rect = mission_icon_img.get_rect(midleft=(20, pet_menu_rect.bottom + 40))
-try:
-    quest_stand_img_original = safe_image_load("GUI/stand.png").convert_alpha()
-    quest_stand_img = pygame.transform.scale(quest_stand_img_original, (110, 110))
-except pygame.error:
-    print("Warning: GUI/stand.png not found.")
-    quest_stand_img = pygame.Surface((110, 110), pygame.SRCALPHA)
-    quest_stand_img.fill(PANEL_BORDER_COLOR)
-try:
-    quest_pointer_img_original = safe_image_load("GUI/pointer.png").convert_alpha()
-    quest_pointer_img = pygame.transform.scale(quest_pointer_img_original, (48, 48))
-except pygame.error:
-    print("Warning: GUI/pointer.png not found.")
-    quest_pointer_img = pygame.Surface((48, 48), pygame.SRCALPHA)
-    pygame.draw.polygon(quest_pointer_img, (255, 215, 0), [(0,0), (48,0), (24, 24)])
-try:
-    challenge_stand_img_original = safe_image_load("GUI/stand2.png").convert_alpha()
-    challenge_stand_img = pygame.transform.scale(challenge_stand_img_original, (110, 110))
-except pygame.error:
-    print("Warning: GUI/stand2.png not found.")
-    challenge_stand_img = pygame.Surface((110, 110), pygame.SRCALPHA)
-    challenge_stand_img.fill(PANEL_BORDER_COLOR)
-try:
-    chicken_map_img_original = safe_image_load("GUI/map2.png").convert()
-    chicken_map_img = pygame.transform.scale(chicken_map_img_original, (SCREEN_WIDTH, SCREEN_HEIGHT))
-except pygame.error:
-    print("Warning: GUI/map2.png not found.")
-    chicken_map_img = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-    chicken_map_img.fill((210, 180, 140))
-try:
-    music_on_img_original = safe_image_load("GUI/music_on.png").convert_alpha()
-    music_on_img = pygame.transform.scale(music_on_img_original, (48, 48))
-    music_off_img_original = safe_image_load("GUI/music_off.png").convert_alpha()
-    music_off_img = pygame.transform.scale(music_off_img_original, (48, 48))
-except pygame.error:
-    print("Warning: GUI/music_on.png or GUI/music_off.png not found.")
-    music_on_img = pygame.Surface((48, 48), pygame.SRCALPHA)
-    pygame.draw.circle(music_on_img, WHITE, (24, 24), 20, 2)
-    pygame.draw.polygon(music_on_img, WHITE, [(16, 16), (16, 32), (32, 24)])
-    music_off_img = music_on_img.copy()
-    pygame.draw.line(music_off_img, (255,0,0), (8,8), (40,40), 4)
-try:
-    pet_house_img_original = safe_image_load("GUI/pet_house.png").convert_alpha()
-    pet_house_img = pygame.transform.scale(pet_house_img_original, (256, 256))
-except pygame.error:
-    print("Warning: GUI/pet_house.png not found.")
-    pet_house_img = pygame.Surface((256, 256), pygame.SRCALPHA)
-    pet_house_img.fill((150, 75, 0))
-try:
-    pond_img_original = safe_image_load("GUI/pond.png").convert_alpha()
-    pond_img = pygame.transform.scale(pond_img_original, (400, 200))
-except pygame.error:
-    print("Warning: GUI/pond.png not found.")
-    pond_img = pygame.Surface((400, 200), pygame.SRCALPHA)
-    pond_img.fill((0, 100, 200))
-try:
-    tree_img_original = safe_image_load("GUI/tree.png").convert_alpha()
-    tree_img = pygame.transform.scale(tree_img_original, (128, 160))
-except pygame.error:
-    print("Warning: GUI/tree.png not found.")
-    tree_img = pygame.Surface((128, 160), pygame.SRCALPHA)
-    tree_img.fill((0, 100, 0))
+fence_img = pygame.Surface((64,64))
+fence_img.fill(PANEL_BORDER_COLOR)
+hatch_img = pygame.Surface((128, 64), pygame.SRCALPHA)
+hatch_img.fill((180, 140, 80))
+lock_img = pygame.Surface((64, 64), pygame.SRCALPHA)
+pygame.draw.rect(lock_img, GRAY, (16, 32, 32, 32), border_radius=5)
+pygame.draw.arc(lock_img, GRAY, (8, 8, 48, 48), 0, 3.14, 8)
+sold_out_img = pygame.Surface((128, 128), pygame.SRCALPHA)
+sold_out_text = font_small.render("SOLD", True, (200, 0, 0))
+sold_out_img.blit(sold_out_text, (30, 50))
+backpack_img = pygame.Surface((64, 64))
+backpack_img.fill(PANEL_BORDER_COLOR)
+backpack_rect = backpack_img.get_rect(midleft=(20, SCREEN_HEIGHT // 2))
+pet_menu_icon = pygame.Surface((64, 64), pygame.SRCALPHA)
+pygame.draw.circle(pet_menu_icon, PANEL_BORDER_COLOR, (32, 32), 30)
+pygame.draw.circle(pet_menu_icon, TEXT_COLOR, (32, 32), 26)
+pet_menu_rect = pet_menu_icon.get_rect(midleft=(20, backpack_rect.bottom + 40))
+heart_img = pygame.Surface((32,32), pygame.SRCALPHA)
+pygame.draw.circle(heart_img, (255, 105, 180), (16,16), 14, 0)
+smile_img = pygame.Surface((32,32), pygame.SRCALPHA)
+pygame.draw.circle(smile_img, HAPPINESS_COLOR, (16,16), 14, 0)
+mission_icon_img = pygame.Surface((64, 64))
+mission_icon_img.fill(QUEST_PROGRESS_COLOR)
+mission_icon_rect = mission_icon_img.get_rect(midleft=(20, pet_menu_rect.bottom + 40))
+quest_stand_img = pygame.Surface((110, 110), pygame.SRCALPHA)
+quest_stand_img.fill(PANEL_BORDER_COLOR)
+quest_pointer_img = pygame.Surface((48, 48), pygame.SRCALPHA)
+pygame.draw.polygon(quest_pointer_img, (255, 215, 0), [(0,0), (48,0), (24, 24)])
+challenge_stand_img = pygame.Surface((110, 110), pygame.SRCALPHA)
+challenge_stand_img.fill(PANEL_BORDER_COLOR)
+music_on_img = pygame.Surface((48, 48), pygame.SRCALPHA)
+pygame.draw.circle(music_on_img, WHITE, (24, 24), 20, 2)
+pygame.draw.polygon(music_on_img, WHITE, [(16, 16), (16, 32), (32, 24)])
+music_off_img = music_on_img.copy()
+pygame.draw.line(music_off_img, (255,0,0), (8,8), (40,40), 4)
+# Map-only images are loaded by their asset group on first entry (see SUB-MODULE:MAP ASSET GROUPS).
+chicken_map_img = pet_house_img = pond_img = tree_img = None
+
+# (global name, path, scaled size or None to keep the file's size, has alpha)
+GUI_IMAGE_SPECS = [
+    ("bg_img", "GUI/background.jpg", (SCREEN_WIDTH, SCREEN_HEIGHT), False),
+    ("trash_can_img", "GUI/trashcan.png", (48, 48), True),
+    ("coin_img", "ENTITY/currency.jpg", (48, 48), True),
+    ("clock_img", "ENTITY/clock.png", (48, 48), True),
+    ("play_map_img", "GUI/map.jpg", (SCREEN_WIDTH, SCREEN_HEIGHT), False),
+    ("fence_img", "ENTITY/fence.png", (64, 64), True),
+    ("hatch_img", "GUI/hatch.png", None, True),
+    ("lock_img", "GUI/lock.png", (64, 64), True),
+    ("sold_out_img", "GUI/sold.png", (128, 128), True),
+    ("backpack_img", "GUI/backpack.png", (64, 64), True),
+    ("pet_menu_icon", "GUI/paw_icon.png", (64, 64), True),
+    ("heart_img", "GUI/heart.png", (32, 32), True),
+    ("smile_img", "GUI/smile.png", (32, 32), True),
+    ("mission_icon_img", "GUI/mission_icon.png", (64, 64), True),
+    ("quest_stand_img", "GUI/stand.png", (110, 110), True),
+    ("quest_pointer_img", "GUI/pointer.png", (48, 48), True),
+    ("challenge_stand_img", "GUI/stand2.png", (110, 110), True),
+    ("music_on_img", "GUI/music_on.png", (48, 48), True),
+    ("music_off_img", "GUI/music_off.png", (48, 48), True),
+]
+
+def finish_gui_image(name, path, size, has_alpha, decoded):
+    img, cache_path, from_cache = decoded
+    if img is None:
+        print(f"Warning: {path} not found.")
+        return
+    globals()[name] = finish_scaled_image(img, size, has_alpha, cache_path, from_cache)
+
+for name, path, size, has_alpha in GUI_IMAGE_SPECS:
+    asset_loader.add(lambda spec=(path, size, has_alpha): decode_scaled_image(*spec),
+                     lambda decoded, spec=(name, path, size, has_alpha): finish_gui_image(*spec, decoded))
 
 try:
     item_data = safe_json_load("JSON/items_p.json")
@@ -443,28 +766,135 @@ except FileNotFoundError:
     pygame.quit()
     sys.exit()
 
+def finish_item_image(item_id, path, decoded):
+    img, cache_path, from_cache = decoded
+    if img is None:
+        print(f"Warning: Item image not found at {path}")
+        return
+    item_images[item_id] = finish_scaled_image(img, (96, 96), True, cache_path, from_cache)
+
 item_images = {}
 for item_id, data in item_data.items():
+    img_placeholder = pygame.Surface((96, 96), pygame.SRCALPHA)
+    img_placeholder.fill((255, 0, 255))
+    item_images[item_id] = img_placeholder
+    asset_loader.add(lambda path=data["image_path"]: decode_scaled_image(path, (96, 96), True),
+                     lambda decoded, item_id=item_id, path=data["image_path"]: finish_item_image(item_id, path, decoded))
+
+def decode_pet_icon_source(pet_id):
+    """
+    Loader-thread half of a pet icon: the pet's atlas sheet and frame table,
+    or its first loose idle frame and None.
+    """
     try:
-        img = safe_image_load(data["image_path"]).convert_alpha()
-        item_images[item_id] = pygame.transform.scale(img, (96, 96))
-    except pygame.error:
-        print(f"Warning: Item image not found at {data['image_path']}")
-        img_placeholder = pygame.Surface((96, 96), pygame.SRCALPHA)
-        img_placeholder.fill((255, 0, 255))
-        item_images[item_id] = img_placeholder
+        table = safe_json_load(f"ATLAS/{pet_id}.json")
+        sheet_path = f"ATLAS/{table['image']}"
+        sheet = decode_images([sheet_path])[sheet_path]
+        if sheet is not None and table["animations"].get("idle"):
+            return sheet, table
+    except (FileNotFoundError, KeyError, ValueError):
+        pass
+    path_prefix = pet_data[pet_id]['animation_paths'].get("idle")
+    if not path_prefix:
+        return None, None
+    first_frame_path = f"{path_prefix}{pet_id}_1.png"
+    return decode_images([first_frame_path])[first_frame_path], None
+
+def finish_pet_icon(pet_id, source):
+    surface, table = source
+    if surface is None:
+        print(f"Warning: Could not create icon for '{pet_id}'")
+        return
+    if table is not None:
+        sheet = surface.convert_alpha()
+        pet_atlases[pet_id] = (sheet, table["animations"])
+        first_frame = slice_atlas_frames(sheet, table["animations"]["idle"][:1], 1.0)[0]
+    else:
+        first_frame = surface.convert_alpha()
+    pet_icons[pet_id] = pygame.transform.scale(first_frame, (64, 64))
+
 pet_icons = {}
 for pet_id in pet_data:
-    idle_frames = load_pet_animation_frames(pet_id, "idle", scale=1.0)
-    if idle_frames:
-        pet_icons[pet_id] = pygame.transform.scale(idle_frames[0], (64, 64))
-    else:
-        print(f"Warning: Could not create icon for '{pet_id}'")
-        img_placeholder = pygame.Surface((64, 64), pygame.SRCALPHA)
-        img_placeholder.fill((0, 255, 0))
-        pet_icons[pet_id] = img_placeholder
+    img_placeholder = pygame.Surface((64, 64), pygame.SRCALPHA)
+    img_placeholder.fill((0, 255, 0))
+    pet_icons[pet_id] = img_placeholder
+    asset_loader.add(lambda pet_id=pet_id: decode_pet_icon_source(pet_id), lambda source, pet_id=pet_id: finish_pet_icon(pet_id, source))
 
 # -------------------- SUB-MODULE:DRAW UTILITIES --------------------
+overlay_cache = OrderedDict()
+panel_chrome_cache = {}
+text_cache = OrderedDict()
+glyph_text_cache = {}
+
+def render_text(font, text, antialias, color):
+    """
+    Cached font.render keyed by (font, text, antialias, color).
+    The returned surface is shared; blit it, but never draw on it or change its alpha.
+    """
+    key = (font, text, antialias, tuple(color))
+    text_surface = text_cache.get(key)
+    if text_surface is None:
+        text_surface = font.render(text, antialias, color)
+        text_cache[key] = text_surface
+        if len(text_cache) > TEXT_CACHE_MAX_ENTRIES:
+            text_cache.popitem(last=False)
+    else:
+        text_cache.move_to_end(key)
+    return text_surface
+
+def render_glyph_text(font, text, antialias, color, slot):
+    """
+    Builds fast-changing strings such as the money counter and play time from cached
+    single-character renders, so each new value does not push a fresh entry into text_cache.
+    Each slot (one per counter on screen) keeps its last surface, so an unchanged value is
+    returned as is; like render_text, the surface is shared and only blitted.
+    """
+    key = (font, text, antialias, tuple(color))
+    last = glyph_text_cache.get(slot)
+    if last is not None and last[0] == key:
+        return last[1]
+    glyphs = [render_text(font, char, antialias, color) for char in text]
+    text_surface = pygame.Surface((sum(g.get_width() for g in glyphs), font.get_height()), pygame.SRCALPHA)
+    x = 0
+    for glyph in glyphs:
+        text_surface.blit(glyph, (x, 0), special_flags=pygame.BLEND_RGBA_MAX)
+        x += glyph.get_width()
+    glyph_text_cache[slot] = (key, text_surface)
+    return text_surface
+
+def get_overlay(size, color):
+    """
+    Returns a shared SRCALPHA surface of the given size filled with color.
+    Callers only blit it; never draw onto the returned surface.
+    """
+    key = (int(size[0]), int(size[1]), tuple(color))
+    overlay = overlay_cache.get(key)
+    if overlay is None:
+        overlay = pygame.Surface(key[:2], pygame.SRCALPHA)
+        overlay.fill(color)
+        overlay_cache[key] = overlay
+        if len(overlay_cache) > OVERLAY_CACHE_MAX_ENTRIES:
+            overlay_cache.popitem(last=False)
+    else:
+        overlay_cache.move_to_end(key)
+    return overlay
+
+def draw_panel(surface, rect, border_width, radius):
+    """
+    Draws a PANEL_FILL_COLOR panel with a PANEL_BORDER_COLOR border by blitting chrome cached per size.
+    """
+    rect = pygame.Rect(rect)
+    key = (rect.size, border_width, radius)
+    chrome = panel_chrome_cache.get(key)
+    if chrome is None:
+        chrome = pygame.Surface(rect.size)
+        chrome.fill(PANEL_CHROME_COLORKEY)
+        pygame.draw.rect(chrome, PANEL_FILL_COLOR, chrome.get_rect(), 0, radius)
+        pygame.draw.rect(chrome, PANEL_BORDER_COLOR, chrome.get_rect(), border_width, radius)
+        chrome.set_colorkey(PANEL_CHROME_COLORKEY, pygame.RLEACCEL)
+        panel_chrome_cache[key] = chrome
+    surface.blit(chrome, rect)
+
 def draw_text_wrapped(surface, text, font, color, rect, line_spacing=5, centered=False):
     words = text.split(' ')
     lines = []
@@ -480,7 +910,7 @@ def draw_text_wrapped(surface, text, font, color, rect, line_spacing=5, centered
 
     y = rect.top
     for line in lines:
-        line_surface = font.render(line, True, color)
+        line_surface = render_text(font, line, True, color)
         if centered:
             line_rect = line_surface.get_rect(centerx=rect.centerx, top=y)
         else:
@@ -490,40 +920,156 @@ def draw_text_wrapped(surface, text, font, color, rect, line_spacing=5, centered
         y += font.get_height() + line_spacing
     
     return y
+
+dirty_rects = []
+last_dirty_rects = []
+last_full_update = 0.0
+
+def mark_dirty(rect):
+    """
+    Records a screen area that changes on its own (animation, timer) so present_frame can push just that area.
+    """
+    if rect: dirty_rects.append(pygame.Rect(rect))
+
+def present_frame(full_update):
+    """
+    Sends the finished frame to the display.
+    Only this frame's and last frame's dirty rects are sent, so moved or vanished sprites are erased too.
+    Everything is sent when full_update is set, when DIRTY_RECT_RENDERING is off,
+    and every DIRTY_RECT_FULL_UPDATE_SECONDS so unmarked slow changes still show.
+    """
+    global dirty_rects, last_dirty_rects, last_full_update
+    now = time.time()
+    if full_update or not DIRTY_RECT_RENDERING or now - last_full_update >= DIRTY_RECT_FULL_UPDATE_SECONDS:
+        pygame.display.update()
+        last_full_update = now
+    else:
+        pygame.display.update(dirty_rects + last_dirty_rects)
+    last_dirty_rects, dirty_rects = dirty_rects, []
+effect_frame_cache = {}
+
+def get_effect_frames(kind):
+    """
+    EFFECT_ALPHA_STEPS copies of an effect sprite ('heart', 'smile' or 'level_up'), fading from
+    fully opaque at index 0. Rebuilt only when the source image or font is replaced.
+    """
+    source = {'heart': heart_img, 'smile': smile_img, 'level_up': font}.get(kind)
+    cached = effect_frame_cache.get(kind)
+    if cached and cached[0] is source:
+        return cached[1]
+    if source is None:
+        return None
+    base = render_text(font, "LVL UP!", True, LEVEL_UP_COLOR) if kind == 'level_up' else source
+    frames = []
+    for step in range(EFFECT_ALPHA_STEPS):
+        frame = base.copy()
+        frame.set_alpha(int(255 * (1 - step / EFFECT_ALPHA_STEPS)))
+        frames.append(frame)
+    effect_frame_cache[kind] = (source, frames)
+    return frames
 # -------------------- SUB-MODULE:SAVING SYSTEM --------------------
+save_queue = SaveQueue(SAVE_COALESCE_SECONDS)
 profile_file = "profiles.json"
-correct_profile_path = load_file_case_insensitive(profile_file)
-if correct_profile_path:
-    with open(correct_profile_path) as f: profiles = json.load(f)
-else: profiles = [None, None, None]
-
-global_storage_file = "global_storage.json"
-global_storage_data = {"items": {}, "pets": []}
-def load_global_storage():
-    global global_storage_data
-    correct_path = load_file_case_insensitive(global_storage_file)
-    if correct_path:
+save_codec = save_format.CODECS[SAVE_FORMAT]
+profile_store = ProfileStore("saves", NUM_PROFILE_SLOTS, save_codec)
+# Only the summaries are read here; a slot's full profile is read when its row is clicked.
+profile_index = profile_store.load_index(load_file_case_insensitive(profile_file), f"{profile_file}.journal")
+profiles = [None] * NUM_PROFILE_SLOTS
+
+def load_legacy_global_storage():
+    """
+    Reads the global storage file written before storage moved into SHARED_STORAGE_FILE.
+    """
+    for codec in save_format.CODECS.values():
+        correct_path = load_file_case_insensitive("global_storage" + codec.suffix)
+        if not correct_path: continue
         try:
-            with open(correct_path, 'r') as f:
-                data = json.load(f)
-                if isinstance(data, dict) and 'items' in data and 'pets' in data:
-                    global_storage_data = data
-                else:
-                    print(f"Warning: '{global_storage_file}' is malformed or empty. Initializing.")
-                    global_storage_data = {"items": {}, "pets": []}
-        except (json.JSONDecodeError, IOError):
-             print(f"Warning: Could not read '{global_storage_file}'. Initializing.")
-             global_storage_data = {"items": {}, "pets": []}
+            with open(correct_path, 'rb') as f:
+                data = codec.loads(f.read())
+        except (ValueError, IOError):
+            print(f"Warning: Could not read '{correct_path}'.")
+            continue
+        if isinstance(data, dict) and 'items' in data and 'pets' in data:
+            return save_format.migrate_storage(data)
+        print(f"Warning: '{correct_path}' is malformed or empty.")
+    return {"items": {}, "pets": []}
 
-def save_global_storage():
-    with open(global_storage_file, 'w') as f:
-        json.dump(global_storage_data, f, indent=2)
-    print("Global storage saved.")
+shared_storage = SharedStorage(SHARED_STORAGE_FILE)
+if shared_storage.is_new() and shared_storage.import_legacy(load_legacy_global_storage(), save_format.STORAGE_SCHEMA_VERSION):
+    print(f"Global storage moved into '{SHARED_STORAGE_FILE}'.")
 
-load_global_storage()
+def storage_owner(profile):
+    """
+    The id the shared storage records this profile's transfers under.
+    """
+    if "storage_owner" not in profile:
+        profile["storage_owner"] = uuid.uuid4().hex
+    return profile["storage_owner"]
+
+def apply_storage_transfer(profile, record):
+    """
+    Makes the profile side of a storage transfer that was committed but never saved into the profile.
+    """
+    inventory, pets = profile.setdefault("inventory", {}), profile.setdefault("pets", [])
+    if record["kind"] == "item":
+        item_id = record["item_id"]
+        left = inventory.get(item_id, 0) + (record["quantity"] if record["direction"] == "retrieve" else -record["quantity"])
+        if left > 0: inventory[item_id] = left
+        else: inventory.pop(item_id, None)
+    elif record["direction"] == "retrieve":
+        pet = record["pet"]
+        if any(p["instance_id"] == pet["instance_id"] for p in pets):
+            pet["instance_id"] = max(p["instance_id"] for p in pets) + 1
+        pets.append(pet)
+    else:
+        profile["pets"] = [p for p in pets if p["instance_id"] != record["pet"]["instance_id"]]
+
+def reconcile_storage_transfers(profile):
+    """
+    Runs when a profile is loaded. Transfers whose id the saved profile holds are settled; the ones
+    a crash kept out of it are applied now and settled after the next load.
+    """
+    save_queue.flush()  # only ids already on disk may be settled
+    saved_ids = set(profile.get("storage_transfers", []))
+    settled, applied = [], []
+    for transfer_id, record in shared_storage.pending_transfers(storage_owner(profile)):
+        if transfer_id in saved_ids:
+            settled.append(transfer_id)
+        else:
+            apply_storage_transfer(profile, record)
+            applied.append(transfer_id)
+    shared_storage.settle_transfers(settled)
+    profile["storage_transfers"] = applied
+    if applied:
+        print(f"Finished {len(applied)} storage transfers that were not saved before the game stopped.")
+
+def storage_transfer_done(transfer_id):
+    """
+    Records a committed transfer in the profile and saves it together with the inventory change.
+    """
+    profiles[selected_profile_idx].setdefault("storage_transfers", []).append(transfer_id)
+    save_profiles()
+    save_queue.pump(force=True)
+
+def prepare_profiles_save():
+    # A store takes the items or pet out of the inventory before the storage commits it, so
+    # no save may run until the transfer is done; the transfer's own save follows right after.
+    if shared_storage.transfers_in_flight:
+        save_profiles()
+        return None
+    # The loaded profile's pets are live, so stamp it; the next load catches up from here.
+    if player_inventory and selected_profile_idx is not None and profiles[selected_profile_idx]:
+        profile = profiles[selected_profile_idx]
+        # The inventory keeps its own collections, so copy them in before the profile is diffed.
+        profile['inventory'], profile['pets'] = player_inventory.export()
+        profile['last_saved'] = time.time()
+        profile['income_timer'] = money_generation_timer / 1000
+    return profile_store.prepare_save(profiles)
 
 def save_profiles():
-    with open(profile_file, "w") as f: json.dump(profiles, f, indent=2)
+    save_queue.mark_dirty("profiles")
+
+save_queue.register("profiles", prepare_profiles_save)
 
 # -------------------- MODULE:CLASSES--------------------
 class TienTe:
@@ -543,53 +1089,75 @@ class TienTe:
         seconds = total_seconds % 60
         return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
     def draw(self, surface, show_time=True):
-        money_text = self.font.render(str(self.money), True, WHITE)
+        money_text = render_glyph_text(self.font, str(self.money), True, WHITE, "money")
         money_rect = money_text.get_rect(topright=(SCREEN_WIDTH - 60, 20))
-        surface.blit(money_text, money_rect)
-        surface.blit(self.coin_icon, (money_rect.left - 58, 10))
+        mark_dirty(surface.blit(money_text, money_rect))
+        mark_dirty(surface.blit(self.coin_icon, (money_rect.left - 58, 10)))
         if show_time:
-            time_text = self.font.render(self.format_time(self.get_current_play_time()), True, WHITE)
+            time_text = render_glyph_text(self.font, self.format_time(self.get_current_play_time()), True, WHITE, "play_time")
             time_rect = time_text.get_rect(topright=(SCREEN_WIDTH - 60, 80))
-            surface.blit(time_text, time_rect)
-            surface.blit(self.clock_icon, (time_rect.left - 58, 70))
+            mark_dirty(surface.blit(time_text, time_rect))
+            mark_dirty(surface.blit(self.clock_icon, (time_rect.left - 58, 70)))
+
+missing_character_frames = [pygame.Surface((32, 32))]  # drawn when a sheet has no IdleSouth frames
 
 class NguoiChamSoc:
-    def __init__(self, name, sheet_path, frame_data, scale):
+    """
+    A character from a flash.json sprite sheet. Each tag's frames are scaled on first use,
+    so a large NPC that only ever shows IdleSouth never builds the other seven.
+    """
+    def __init__(self, name, sheet_path, tag_frames, scale):
         self.name = name
         self.sheet_path = sheet_path
-        try:
-            self.sheet = safe_image_load(sheet_path).convert_alpha()
-        except pygame.error:
-            self.sheet = pygame.Surface((32, 32), pygame.SRCALPHA)
-            self.sheet.fill((255, 0, 255))
+        self.sheet = None
         self.scale = scale
+        self.tag_frames = tag_frames
         self.animations = {}
         self.frame_index, self.timer = 0, 0
         self.x, self.y = 0, 0
         self.last_dir = 'South'
-        self.load_animations(frame_data)
-    def load_animations(self, frame_data):
-        tags = ["IdleSouth","IdleNorth","IdleEast","IdleWest","WalkSouth","WalkNorth","WalkEast","WalkWest"]
-        for tag in tags:
-            frames = sorted([(k,v["frame"]) for k,v in frame_data.items() if f"#{tag}" in k], key=lambda x: x[0])
-            images = [pygame.transform.scale(self.sheet.subsurface(pygame.Rect(f["x"],f["y"],f["w"],f["h"])), (int(f["w"]*self.scale), int(f["h"]*self.scale))) for _,f in frames]
-            self.animations[tag] = images
+    def load_sheet(self):
+        try:
+            self.sheet = safe_image_load(self.sheet_path).convert_alpha()
+        except pygame.error:
+            self.sheet = pygame.Surface((32, 32), pygame.SRCALPHA)
+            self.sheet.fill((255, 0, 255))
+    def load_animation(self, tag):
+        """
+        Scales one tag's frames through the surface cache; the sheet itself is only read on a cache miss.
+        """
+        rects = self.tag_frames.get(tag, [])
+        if not rects: return []
+        sizes = [(int(f["w"]*self.scale), int(f["h"]*self.scale)) for f in rects]
+        cache_path = surface_cache_path([self.sheet_path, "CHARACTER/flash.json"], sizes, "RGBA", tag)
+        cached = read_cached_surfaces(cache_path, sizes, "RGBA") if cache_path else None
+        if cached:
+            return [img.convert_alpha() for img in cached]
+        if self.sheet is None: self.load_sheet()
+        images = slice_atlas_frames(self.sheet, rects, self.scale)
+        if cache_path:
+            store_cached_surfaces(cache_path, images, "RGBA")
+        return images
+    def get_frames(self, key):
+        frames = self.animations.get(key)
+        if frames is None:
+            frames = self.animations[key] = self.load_animation(key)
+        return frames
     def update(self, dt):
         self.timer += dt
         if self.timer > 150:
-            key = "IdleSouth"
-            length = len(self.animations.get(key,[]))
+            length = len(self.get_frames("IdleSouth"))
             self.frame_index = (self.frame_index +1) % length if length > 0 else 0
             self.timer = 0
     def get_current_image(self, key="IdleSouth"):
-        frames = self.animations.get(key) or self.animations.get("IdleSouth", [pygame.Surface((32,32))])
+        frames = self.get_frames(key) or self.get_frames("IdleSouth") or missing_character_frames
         return frames[self.frame_index % len(frames)]
     def get_rect(self):
         return self.get_current_image().get_rect(center=(self.x, self.y))
     def draw(self, surf, pos, key="IdleSouth"):
         image_to_draw = self.get_current_image(key)
         rect = image_to_draw.get_rect(center=pos)
-        surf.blit(image_to_draw, rect)
+        mark_dirty(surf.blit(image_to_draw, rect))
 
 class CongTrinh:
     def __init__(self, image_path, pos, scale_size, interaction_text, target_scene):
@@ -615,62 +1183,282 @@ class CongTrinh:
         if not self.is_valid or not player or interaction_blocked: return False, None
         player_can_interact = self.interaction_rect.colliderect(player.get_rect())
         if player_can_interact:
-            prompt_text = font_small.render(self.interaction_text, True, WHITE)
-            prompt_bg = pygame.Surface((prompt_text.get_width() + 20, prompt_text.get_height() + 10), pygame.SRCALPHA)
-            prompt_bg.fill((0, 0, 0, 150))
+            prompt_text = render_text(font_small, self.interaction_text, True, WHITE)
+            prompt_bg = get_overlay((prompt_text.get_width() + 20, prompt_text.get_height() + 10), (0, 0, 0, 150))
             surface.blit(prompt_bg, (20, SCREEN_HEIGHT - 60))
             surface.blit(prompt_text, (30, SCREEN_HEIGHT - 55))
         return player_can_interact, self.target_scene
 
 class TuiDo:
+    """
+    The player's items and pets, with the views the menus read every frame kept up to date.
+
+    pets stays sorted by instance_id, pets_by_id finds a pet in O(1), and instance ids come from a
+    counter that only grows. Item keys are kept sorted overall and per category; the (item_id, qty)
+    lists built from them are cached until an item of that category changes. Returned lists are
+    shared, so treat them as read-only.
+    """
     def __init__(self, initial_items=None, initial_pets=None):
-        self.items = initial_items if initial_items is not None else {}
-        self.pets = initial_pets if initial_pets is not None else []
+        self.items = dict(initial_items) if initial_items is not None else {}
+        self.pets = sorted(initial_pets if initial_pets is not None else [], key=lambda p: p['instance_id'])
+        self.pets_by_id = {p['instance_id']: p for p in self.pets}
+        self.next_id = max(self.pets_by_id, default=0) + 1
+        self.pets_by_species = {}  # tuple of pet_ids -> sorted pets
+        self.item_keys = sorted(self.items)
+        self.category_keys = {}
+        for item_id in self.item_keys:
+            self.category_keys.setdefault(self.category_of(item_id), []).append(item_id)
+        self.item_views = {}  # None (all items) or a category -> cached (item_id, qty) list
+    @staticmethod
+    def category_of(item_id): return item_data.get(item_id, {}).get('category')
+    def item_changed(self, item_id, added=False, removed=False):
+        category = self.category_of(item_id)
+        if added:
+            bisect.insort(self.item_keys, item_id)
+            bisect.insort(self.category_keys.setdefault(category, []), item_id)
+        elif removed:
+            self.item_keys.remove(item_id)
+            self.category_keys[category].remove(item_id)
+        self.item_views.pop(None, None)
+        self.item_views.pop(category, None)
     def add_item(self, item_id, quantity=1):
+        is_new = item_id not in self.items
         self.items[item_id] = self.items.get(item_id, 0) + quantity
+        self.item_changed(item_id, added=is_new)
         print(f"Added {quantity} of {item_id} to inventory. New total: {self.items[item_id]}")
     def remove_item(self, item_id, quantity=1):
         if item_id in self.items and self.items[item_id] >= quantity:
             self.items[item_id] -= quantity
             if self.items[item_id] == 0: del self.items[item_id]
+            self.item_changed(item_id, removed=item_id not in self.items)
             return True
         return False
+    def get_item_count(self, item_id): return self.items.get(item_id, 0)
+    def next_instance_id(self):
+        instance_id = self.next_id
+        self.next_id += 1
+        return instance_id
+    def pets_changed(self): self.pets_by_species.clear()
     def add_pet(self, pet_id):
-        new_pet_instance_id = max([p['instance_id'] for p in self.pets] + [0]) + 1
-        base_stats = pet_data.get(pet_id, {}).get("base_stats", {"health": 100, "happiness": 100, "fullness": 100})
-        random_name = random.choice(PET_NAMES)
-        new_pet = {
-            "instance_id": new_pet_instance_id,
-            "pet_id": pet_id,
-            "name": random_name,
-            "health": base_stats["health"],
-            "happiness": base_stats["happiness"],
-            "fullness": base_stats["hunger"],
-            ### NEW: Initialize level and experience for new pets
-            "level": 0,
-            "experience": 0
-        }
-        self.pets.append(new_pet)
-        print(f"Added new pet: {random_name} the {pet_id} (Instance: {new_pet_instance_id})")
+        new_pet_instance_id = self.next_instance_id()
+        new_pet = pet_engine.new_pet_record(pet_id, new_pet_instance_id, pet_data.get(pet_id, {}))
+        self.insert_pet(new_pet)
+        print(f"Added new pet: {new_pet['name']} the {pet_id} (Instance: {new_pet_instance_id})")
         return new_pet
-    def get_all_items(self): return sorted(self.items.items())
-    def get_all_pets(self): return sorted(self.pets, key=lambda p: p['instance_id'])
+    def insert_pet(self, pet):
+        """Adds an existing pet record (e.g. from storage), renumbering it if its instance_id is taken."""
+        if pet['instance_id'] in self.pets_by_id: pet['instance_id'] = self.next_instance_id()
+        self.next_id = max(self.next_id, pet['instance_id'] + 1)
+        self.pets_by_id[pet['instance_id']] = pet
+        if not self.pets or self.pets[-1]['instance_id'] < pet['instance_id']:
+            self.pets.append(pet)
+        else:
+            self.pets.insert(bisect.bisect(self.pets, pet['instance_id'], key=lambda p: p['instance_id']), pet)
+        self.pets_changed()
+    def remove_pet(self, instance_id):
+        pet = self.pets_by_id.pop(instance_id, None)
+        if pet:
+            del self.pets[bisect.bisect_left(self.pets, instance_id, key=lambda p: p['instance_id'])]
+            self.pets_changed()
+        return pet
+    def update_pet(self, pet_record):
+        pet = self.get_pet_by_instance_id(pet_record['instance_id'])
+        if pet is not None and pet is not pet_record: pet.update(pet_record)
+    def get_all_items(self):
+        if None not in self.item_views:
+            self.item_views[None] = [(k, self.items[k]) for k in self.item_keys]
+        return self.item_views[None]
+    def get_items_by_category(self, category):
+        if category not in self.item_views:
+            self.item_views[category] = [(k, self.items[k]) for k in self.category_keys.get(category, [])]
+        return self.item_views[category]
+    def get_all_pets(self): return self.pets
+    def get_pets_by_pet_ids(self, pet_ids):
+        key = tuple(sorted(pet_ids))
+        if key not in self.pets_by_species:
+            self.pets_by_species[key] = [p for p in self.pets if p['pet_id'] in key]
+        return self.pets_by_species[key]
+    def get_pet_by_instance_id(self, instance_id): return self.pets_by_id.get(instance_id)
+    def get_eggs(self): return self.get_items_by_category('egg')
+    def export(self):
+        """Returns copies of (items dict, pets list) for the profile save; the profile never aliases the inventory."""
+        return dict(self.items), [dict(pet) for pet in self.pets]
+
+class TuiDoSQLite:
+    """
+    The TuiDo API over an SQLite database, for collections of tens of thousands of pets and items.
+
+    Lookups, the next instance_id, category and species queries go through indexes, and the sorted
+    lists the menus ask for every frame are cached until the collection changes. Pet dicts handed out
+    stay live (ThuCung and pet_engine mutate them in place) and are written back by flush()/export().
+    The cached lists are shared between callers, so treat them as read-only.
+    """
+    SCHEMA = """
+    CREATE TABLE items (item_id TEXT PRIMARY KEY, quantity INTEGER NOT NULL, category TEXT);
+    CREATE INDEX items_by_category ON items (category, item_id);
+    CREATE TABLE pets (instance_id INTEGER PRIMARY KEY, pet_id TEXT NOT NULL, data TEXT NOT NULL);
+    CREATE INDEX pets_by_pet_id ON pets (pet_id, instance_id);
+    """
+
+    def __init__(self, initial_items=None, initial_pets=None, path=":memory:"):
+        self.db = sqlite3.connect(path)
+        self.db.executescript(self.SCHEMA)
+        self.live_pets = {}  # instance_id -> the dict handed out for that pet
+        self.sorted_items = None
+        self.items_by_category = {}  # category -> sorted (item_id, qty) list, like sorted_items
+        self.sorted_pets = None
+        self.pets_by_species = {}  # tuple of pet_ids -> sorted pets, like sorted_pets
+        with self.db:
+            self.db.executemany("INSERT INTO items VALUES (?, ?, ?)",
+                                [(k, v, item_data.get(k, {}).get('category')) for k, v in (initial_items or {}).items()])
+        for pet in initial_pets or []:
+            self.insert_pet(pet)
+
+    def items_changed(self, item_id):
+        self.sorted_items = None
+        self.items_by_category.pop(item_data.get(item_id, {}).get('category'), None)
+    def pets_changed(self):
+        self.sorted_pets = None
+        self.pets_by_species.clear()
+    def live_pet(self, instance_id, data):
+        pet = self.live_pets.get(instance_id)
+        if pet is None:
+            pet = self.live_pets[instance_id] = json.loads(data)
+        return pet
+
+    def add_item(self, item_id, quantity=1):
+        with self.db:
+            self.db.execute("INSERT INTO items VALUES (?, ?, ?) ON CONFLICT (item_id) DO UPDATE SET quantity = quantity + excluded.quantity",
+                            (item_id, quantity, item_data.get(item_id, {}).get('category')))
+        self.items_changed(item_id)
+        print(f"Added {quantity} of {item_id} to inventory. New total: {self.get_item_count(item_id)}")
+    def remove_item(self, item_id, quantity=1):
+        with self.db:
+            if not self.db.execute("UPDATE items SET quantity = quantity - ? WHERE item_id = ? AND quantity >= ?", (quantity, item_id, quantity)).rowcount:
+                return False
+            self.db.execute("DELETE FROM items WHERE item_id = ? AND quantity = 0", (item_id,))
+        self.items_changed(item_id)
+        return True
+    def get_item_count(self, item_id):
+        row = self.db.execute("SELECT quantity FROM items WHERE item_id = ?", (item_id,)).fetchone()
+        return row[0] if row else 0
+    def next_instance_id(self):
+        return self.db.execute("SELECT coalesce(max(instance_id), 0) + 1 FROM pets").fetchone()[0]
+    def add_pet(self, pet_id):
+        new_pet_instance_id = self.next_instance_id()
+        new_pet = pet_engine.new_pet_record(pet_id, new_pet_instance_id, pet_data.get(pet_id, {}))
+        self.insert_pet(new_pet)
+        print(f"Added new pet: {new_pet['name']} the {pet_id} (Instance: {new_pet_instance_id})")
+        return new_pet
+    def insert_pet(self, pet):
+        """Adds an existing pet record (e.g. from storage), renumbering it if its instance_id is taken."""
+        if self.get_pet_by_instance_id(pet['instance_id']): pet['instance_id'] = self.next_instance_id()
+        with self.db:
+            self.db.execute("INSERT INTO pets VALUES (?, ?, ?)", (pet['instance_id'], pet['pet_id'], json.dumps(pet)))
+        self.live_pets[pet['instance_id']] = pet
+        self.pets_changed()
+    def remove_pet(self, instance_id):
+        pet = self.get_pet_by_instance_id(instance_id)
+        if pet:
+            with self.db:
+                self.db.execute("DELETE FROM pets WHERE instance_id = ?", (instance_id,))
+            self.live_pets.pop(instance_id, None)
+            self.pets_changed()
+        return pet
+    def update_pet(self, pet_record):
+        pet = self.get_pet_by_instance_id(pet_record['instance_id'])
+        if pet is not None and pet is not pet_record: pet.update(pet_record)
+    def get_all_items(self):
+        if self.sorted_items is None:
+            self.sorted_items = self.db.execute("SELECT item_id, quantity FROM items ORDER BY item_id").fetchall()
+        return self.sorted_items
+    def get_items_by_category(self, category):
+        if category not in self.items_by_category:
+            self.items_by_category[category] = self.db.execute("SELECT item_id, quantity FROM items WHERE category = ? ORDER BY item_id", (category,)).fetchall()
+        return self.items_by_category[category]
+    def get_all_pets(self):
+        if self.sorted_pets is None:
+            self.sorted_pets = [self.live_pet(i, data) for i, data in self.db.execute("SELECT instance_id, data FROM pets ORDER BY instance_id")]
+        return self.sorted_pets
+    def get_pets_by_pet_ids(self, pet_ids):
+        key = tuple(sorted(pet_ids))
+        if key not in self.pets_by_species:
+            # Only the covering index is read; pets already handed out are not decoded again.
+            rows = self.db.execute(f"SELECT instance_id FROM pets WHERE pet_id IN ({','.join('?' * len(key))}) ORDER BY instance_id", key)
+            self.pets_by_species[key] = [self.get_pet_by_instance_id(i) for i, in rows]
+        return self.pets_by_species[key]
     def get_pet_by_instance_id(self, instance_id):
-        for pet in self.pets:
-            if pet['instance_id'] == instance_id:
-                return pet
-        return None
-    def get_eggs(self):
-        return sorted([(k, v) for k, v in self.items.items() if item_data.get(k, {}).get('category') == 'egg'])
+        pet = self.live_pets.get(instance_id)
+        if pet is None:
+            row = self.db.execute("SELECT data FROM pets WHERE instance_id = ?", (instance_id,)).fetchone()
+            if row: pet = self.live_pet(instance_id, row[0])
+        return pet
+    def get_eggs(self): return self.get_items_by_category('egg')
+    def flush(self):
+        """Writes the live pet dicts back to their rows."""
+        with self.db:
+            self.db.executemany("UPDATE pets SET data = ? WHERE instance_id = ?",
+                                [(json.dumps(pet), instance_id) for instance_id, pet in self.live_pets.items()])
+    def export(self):
+        """Returns copies of (items dict, pets list) for the profile save; the profile never aliases the inventory."""
+        self.flush()
+        return dict(self.get_all_items()), [dict(pet) for pet in self.get_all_pets()]
+
+def make_inventory(items, pets):
+    return TuiDoSQLite(items, pets) if INVENTORY_BACKEND == "sqlite" else TuiDo(items, pets)
+
+class ParticlePool:
+    """
+    A fixed number of effect particle slots. Spawning writes over the oldest slot and expired
+    slots are only flagged, so a busy pet area creates no lists or dicts per frame.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.kinds = [None] * capacity  # None marks a free slot
+        self.start_times = [0.0] * capacity
+        self.offsets_x = [0] * capacity
+        self.offsets_y = [0] * capacity
+        self.next_slot = 0
+        self.active = 0
+
+    def spawn(self, kind, now, offset_x, offset_y):
+        i = self.next_slot
+        if self.kinds[i] is None: self.active += 1
+        self.kinds[i] = kind
+        self.start_times[i] = now
+        self.offsets_x[i] = offset_x
+        self.offsets_y[i] = offset_y
+        self.next_slot = (i + 1) % self.capacity
+
+    def expire(self, now):
+        if not self.active: return
+        for i in range(self.capacity):
+            if self.kinds[i] is not None and now - self.start_times[i] >= EFFECT_DURATION:
+                self.kinds[i] = None
+                self.active -= 1
+
+    def draw(self, surface, x, y, now, drift_speed):
+        """
+        Draws the live particles oldest first, each as the pre-faded frame for its age.
+        """
+        if not self.active: return
+        for n in range(self.capacity):
+            i = (self.next_slot + n) % self.capacity
+            kind = self.kinds[i]
+            if kind is None: continue
+            frames = get_effect_frames(kind)
+            if not frames: continue
+            elapsed = now - self.start_times[i]
+            image = frames[min(EFFECT_ALPHA_STEPS - 1, int(elapsed / EFFECT_DURATION * EFFECT_ALPHA_STEPS))]
+            draw_x = x + self.offsets_x[i] - image.get_width() // 2
+            draw_y = y + self.offsets_y[i] - elapsed * drift_speed - image.get_height() // 2
+            mark_dirty(surface.blit(image, (draw_x, draw_y)))
 
 class ThuCung:
     DRIFT_SPEED = 20
 
     def __init__(self, pet_instance_data):
-        self.instance_data = pet_instance_data
-        ### NEW: Ensure level and experience exist for backward compatibility
-        self.instance_data.setdefault('level', 0)
-        self.instance_data.setdefault('experience', 0)
+        self.instance_data = pet_engine.upgrade_pet_record(pet_instance_data)
         
         self.pet_id = self.instance_data['pet_id']
         self.definition = pet_data[self.pet_id]
@@ -698,47 +1486,22 @@ class ThuCung:
         self.state_timer = time.time()
         self.next_state_change = random.uniform(3, 7)
         self.speed = 100
-        self.effects = []
+        self.effects = ParticlePool(EFFECT_PARTICLES_PER_PET)
 
     def load_animations(self):
-        self.animations['idle'] = load_pet_animation_frames(self.pet_id, 'idle', self.scale)
-        self.animations['walk'] = load_pet_animation_frames(self.pet_id, 'walk', self.scale)
+        self.animations['idle'] = get_pet_animation_frames(self.pet_id, 'idle', self.scale)
+        self.animations['walk'] = get_pet_animation_frames(self.pet_id, 'walk', self.scale)
 
     def show_effect(self, effect_type):
+        now = time.time()
         for _ in range(5):
-            offset_x = random.randint(-40, 40)
-            offset_y = random.randint(-80, -20)
-            self.effects.append({
-                'type': effect_type,
-                'start_time': time.time(),
-                'offset': (offset_x, offset_y)
-            })
+            self.effects.spawn(effect_type, now, random.randint(-40, 40), random.randint(-80, -20))
 
     def update(self, dt):
-        # Stat decay
-        decay = self.definition['stat_decay_rate']
-        self.instance_data['hunger'] = max(0, self.instance_data['hunger'] - decay['hunger'] * (dt / 1000.0))
-        self.instance_data['happiness'] = max(0, self.instance_data['happiness'] - decay['happiness'] * (dt / 1000.0))
-        if self.instance_data['hunger'] <= 0:
-            self.instance_data['health'] = max(0, self.instance_data['health'] - decay['health'] * (dt / 1000.0))
-
-        ### NEW: Experience and Leveling logic
-        current_level = self.instance_data.get('level', 0)
-        if current_level < MAX_PET_LEVEL:
-            # Pet only gains exp if all stats are above 0
-            stats_ok = (self.instance_data['health'] > 0 and 
-                        self.instance_data['happiness'] > 0 and 
-                        self.instance_data['hunger'] > 0)
-            
-            if stats_ok:
-                self.instance_data['experience'] += EXP_GAIN_RATE * (dt / 1000.0)
-                
-                exp_needed = EXP_FOR_NEXT_LEVEL[current_level]
-                if self.instance_data['experience'] >= exp_needed:
-                    self.instance_data['level'] += 1
-                    self.instance_data['experience'] -= exp_needed
-                    self.show_effect('level_up') # Show a level up visual effect
-                    print(f"{self.instance_data['name']} leveled up to level {self.instance_data['level']}!")
+        # Stat decay, experience and leveling
+        if pet_engine.update_active_pet(self.instance_data, self.definition, dt / 1000.0):
+            self.show_effect('level_up') # Show a level up visual effect
+            print(f"{self.instance_data['name']} leveled up to level {self.instance_data['level']}!")
 
         # State machine for movement
         if time.time() - self.state_timer > self.next_state_change:
@@ -806,8 +1569,7 @@ class ThuCung:
             if frames:
                 self.frame_index = (self.frame_index + 1) % len(frames)
         
-        current_time = time.time()
-        self.effects = [e for e in self.effects if current_time - e['start_time'] < EFFECT_DURATION]
+        self.effects.expire(time.time())
     
     def get_current_animation_frames(self):
         if self.definition.get("directional"): 
@@ -817,43 +1579,24 @@ class ThuCung:
             key = self.state
             return self.animations.get(key, [])
 
+    def get_current_frames_key(self):
+        """Sprite cache key of the list get_current_animation_frames returns for a non-directional pet."""
+        return (self.pet_id, self.state, self.scale)
+
     def draw(self, surface):
         frames = self.get_current_animation_frames()
         if not frames: return
+        if not self.definition.get("directional") and self.direction == 'West':
+            frames = get_mirrored_frames(self.get_current_frames_key(), frames)
         self.frame_index = self.frame_index % len(frames)
         image = frames[self.frame_index]
-        
-        if not self.definition.get("directional") and self.direction == 'West':
-            image = pygame.transform.flip(image, True, False)
 
         rect = image.get_rect(center=(self.x, self.y))
-        surface.blit(image, rect)
+        mark_dirty(surface.blit(image, rect))
         if DEBUG_MODE: pygame.draw.rect(surface, (255,0,0), rect, 1)
 
         # Draw any active effects
-        current_time = time.time()
-        for effect in self.effects:
-            elapsed_time = current_time - effect['start_time']
-            draw_x = self.x + effect['offset'][0]
-            draw_y = self.y + effect['offset'][1] - (elapsed_time * self.DRIFT_SPEED)
-            alpha = max(0, 255 * (1 - (elapsed_time / EFFECT_DURATION)))
-            
-            if effect['type'] == 'level_up':
-                lvl_up_text = font.render("LVL UP!", True, LEVEL_UP_COLOR)
-                lvl_up_text.set_alpha(alpha)
-                surface.blit(lvl_up_text, lvl_up_text.get_rect(center=(draw_x, draw_y)))
-                continue
-            
-            img_to_draw = None
-            if effect['type'] == 'heart' and heart_img:
-                img_to_draw = heart_img
-            elif effect['type'] == 'smile' and smile_img:
-                img_to_draw = smile_img
-            
-            if img_to_draw:
-                img_copy = img_to_draw.copy()
-                img_copy.set_alpha(alpha)
-                surface.blit(img_copy, img_copy.get_rect(center=(draw_x, draw_y)))
+        self.effects.draw(surface, self.x, self.y, time.time(), self.DRIFT_SPEED)
 
     def get_rect(self):
         frames = self.get_current_animation_frames()
@@ -873,7 +1616,7 @@ class ThuCung:
             pygame.draw.rect(surface, GRAY, bg_rect, 0, 5)
             pygame.draw.rect(surface, color, fill_rect, 0, 5)
             pygame.draw.rect(surface, PANEL_BORDER_COLOR, bg_rect, 2, 5)
-            label_text = font_info.render(label, True, TEXT_COLOR)
+            label_text = render_text(font_info, label, True, TEXT_COLOR)
             surface.blit(label_text, (bg_rect.x + 5, bg_rect.centery - label_text.get_height() // 2))
 
         draw_bar(0, "Health", pet_instance['health'], HEALTH_COLOR)
@@ -897,7 +1640,7 @@ class ThuCung:
         
         # Adjust warning text position
         if pet_instance['hunger'] < 20:
-            warning_text = font_info.render("Pet need to be feed", True, HEALTH_COLOR)
+            warning_text = render_text(font_info, "Pet need to be feed", True, HEALTH_COLOR)
             warning_rect = warning_text.get_rect(centerx=start_x + width // 2, top=start_y + exp_y_offset + bar_height + 5)
             surface.blit(warning_text, warning_rect)
 class CuaHang:
@@ -957,7 +1700,11 @@ class Trung:
         table_h = (self.rows * self.box_size) + ((self.rows - 1) * self.padding)
         self.table_x = (SCREEN_WIDTH - table_w) // 2
         self.table_y = (SCREEN_HEIGHT - table_h) / 2 + 50
-        self.plus_text = font_plus.render("+", True, WHITE)
+        self.plus_text = render_text(font_plus, "+", True, WHITE)
+        # Scaled once here; draw only blits them.
+        orig_w, orig_h = hatch_img.get_size()
+        self.scaled_hatch = pygame.transform.scale(hatch_img, (self.box_size, int(orig_h * (self.box_size / orig_w))))
+        self.price_coin = pygame.transform.scale(coin_img, (32, 32))
 
     def place_egg(self, slot_index, egg_id):
         self.slots[str(slot_index)] = {"item_id": egg_id, "start_time": time.time()}
@@ -976,9 +1723,7 @@ class Trung:
                 if self.unlocked_incubators[i]:
                     if slot_key in self.slots:
                         egg_info = self.slots[slot_key]
-                        egg_data_def = item_data.get(egg_info['item_id'], {})
-                        hatch_time = egg_data_def.get("data", {}).get("hatch_time_seconds", 3600)
-                        if time.time() - egg_info['start_time'] >= hatch_time:
+                        if pet_engine.egg_ready(egg_info, item_data.get(egg_info['item_id'], {}), time.time()):
                             return {'action': 'hatch', 'slot_key': slot_key, 'egg_id': egg_info['item_id']}
                     else:
                         return {'action': 'select_egg', 'slot': i}
@@ -994,15 +1739,13 @@ class Trung:
         return None
         
     def draw(self, surface, mouse_pos):
-        overlay=pygame.Surface((SCREEN_WIDTH,SCREEN_HEIGHT),pygame.SRCALPHA)
-        overlay.fill((0,0,0,180))
+        overlay=get_overlay((SCREEN_WIDTH,SCREEN_HEIGHT),(0,0,0,180))
         surface.blit(overlay,(0,0))
         table_w=(self.cols*self.box_size)+((self.cols-1)*self.padding)
         table_h=(self.rows*self.box_size)+((self.rows-1)*self.padding)
         container_rect=pygame.Rect(self.table_x-self.padding,self.table_y-self.padding-80,table_w+2*self.padding,table_h+2*self.padding+80)
-        pygame.draw.rect(surface,PANEL_FILL_COLOR,container_rect,0,15)
-        pygame.draw.rect(surface,PANEL_BORDER_COLOR,container_rect,6,15)
-        title_text=font.render("INCUBATORS",True,TEXT_COLOR)
+        draw_panel(surface,container_rect,6,15)
+        title_text=render_text(font,"INCUBATORS",True,TEXT_COLOR)
         surface.blit(title_text,title_text.get_rect(center=(container_rect.centerx,container_rect.top+45)))
         for i in range(self.cols * self.rows):
             r, c = divmod(i, self.cols)
@@ -1011,32 +1754,26 @@ class Trung:
             box_rect = pygame.Rect(box_x, box_y, self.box_size, self.box_size)
             slot_key = str(i)
             if self.unlocked_incubators[i]:
-                orig_w, orig_h = hatch_img.get_size()
-                scaled_h = int(orig_h * (self.box_size / orig_w))
-                scaled_hatch = pygame.transform.scale(hatch_img, (self.box_size, scaled_h))
-                hatch_rect = scaled_hatch.get_rect(midbottom=box_rect.midbottom)
+                hatch_rect = self.scaled_hatch.get_rect(midbottom=box_rect.midbottom)
                 hatch_rect.y += 10
                 hatch_rect.x -= 10
-                surface.blit(scaled_hatch, hatch_rect)
+                surface.blit(self.scaled_hatch, hatch_rect)
                 if slot_key in self.slots:
                     egg_info=self.slots[slot_key]
                     egg_id=egg_info['item_id']
-                    egg_data_def=item_data.get(egg_id,{})
-                    total_hatch_time=egg_data_def.get("data",{}).get("hatch_time_seconds",3600)
-                    remaining_time=total_hatch_time-(time.time()-egg_info['start_time'])
+                    remaining_time=pet_engine.egg_time_left(egg_info,item_data.get(egg_id,{}),time.time())
                     if egg_img:=item_images.get(egg_id):
                         egg_rect=egg_img.get_rect(centerx=box_rect.centerx,bottom=hatch_rect.top+150)
                         surface.blit(egg_img,egg_rect)
                     if remaining_time > 0:
-                        timer_text=font_info.render(TienTe.format_time(remaining_time),True,WHITE)
+                        timer_text=render_glyph_text(font_info,TienTe.format_time(remaining_time),True,WHITE,("incubator",slot_key))
                         timer_rect=timer_text.get_rect(centerx=box_rect.centerx,bottom=box_rect.bottom-15)
                         bg_rect=timer_rect.inflate(10,5)
-                        bg_surf=pygame.Surface(bg_rect.size,pygame.SRCALPHA)
-                        bg_surf.fill((0,0,0,150))
-                        surface.blit(bg_surf,bg_rect)
+                        bg_surf=get_overlay(bg_rect.size,(0,0,0,150))
+                        mark_dirty(surface.blit(bg_surf,bg_rect))
                         surface.blit(timer_text,timer_rect)
                     else:
-                        ready_text=font_small.render("READY!",True,READY_COLOR)
+                        ready_text=render_text(font_small,"READY!",True,READY_COLOR)
                         surface.blit(ready_text,ready_text.get_rect(centerx=box_rect.centerx,bottom=box_rect.bottom-15))
                     border_color=READY_COLOR if remaining_time<=0 else PANEL_BORDER_COLOR
                     pygame.draw.rect(surface,BUTTON_HOVER_COLOR if box_rect.collidepoint(mouse_pos) else border_color,box_rect,5,10)
@@ -1050,9 +1787,9 @@ class Trung:
                 price_index=i-4
                 if 0<=price_index<len(UNLOCK_PRICES):
                     price=UNLOCK_PRICES[price_index]
-                    price_text=font_info.render(str(price),True,TEXT_COLOR)
+                    price_text=render_text(font_info,str(price),True,TEXT_COLOR)
                     surface.blit(price_text,(box_rect.centerx-price_text.get_width()-5,box_rect.bottom-40))
-                    surface.blit(pygame.transform.scale(coin_img,(32,32)),(box_rect.centerx+5,box_rect.bottom-45))
+                    surface.blit(self.price_coin,(box_rect.centerx+5,box_rect.bottom-45))
                 pygame.draw.rect(surface,BUTTON_HOVER_COLOR if box_rect.collidepoint(mouse_pos) else PANEL_BORDER_COLOR,box_rect,5,10)
 
 class NVHangNgay:
@@ -1130,7 +1867,7 @@ class Ga(ThuCung):
         self.definition = enemy_data[self.enemy_id]
         
         self.x, self.y = random.randint(100, SCREEN_WIDTH - 100), random.randint(100, SCREEN_HEIGHT - 200)
-        self.scale = 2.0
+        self.scale = ENEMY_SCALE
         self.animations = {}
         self.load_animations()
 
@@ -1143,11 +1880,14 @@ class Ga(ThuCung):
         self.state_timer = time.time()
         self.next_state_change = random.uniform(3, 7)
         self.speed = 80
-        self.effects = []
+        self.effects = ParticlePool(EFFECT_PARTICLES_PER_PET)
 
     def load_animations(self):
-        self.animations['idle'] = load_enemy_animation_frames(self.enemy_id, 'idle', self.scale)
-        self.animations['walk'] = load_enemy_animation_frames(self.enemy_id, 'walk', self.scale)
+        self.animations['idle'] = get_enemy_animation_frames(self.enemy_id, 'idle', self.scale)
+        self.animations['walk'] = get_enemy_animation_frames(self.enemy_id, 'walk', self.scale)
+
+    def get_current_frames_key(self):
+        return ("enemy", self.enemy_id, self.state, self.scale)
 
     def update(self, dt):
         if time.time() - self.state_timer > self.next_state_change:
@@ -1188,7 +1928,7 @@ class Ga(ThuCung):
         bar_x = self.x - bar_w // 2
         bar_y = self.get_rect().top - 15
         health_pct = self.health / self.max_health
-        pygame.draw.rect(surface, (50, 50, 50), (bar_x, bar_y, bar_w, bar_h))
+        mark_dirty(pygame.draw.rect(surface, (50, 50, 50), (bar_x, bar_y, bar_w, bar_h)))
         pygame.draw.rect(surface, HEALTH_COLOR, (bar_x, bar_y, bar_w * health_pct, bar_h))
 
 class ThuCungTanCong(ThuCung):
@@ -1202,8 +1942,9 @@ class ThuCungTanCong(ThuCung):
         self.damage = self.definition.get("damage", 10)
         self.x = SCREEN_WIDTH // 2
         self.y = SCREEN_HEIGHT - 100
-        self.animations['attack_styles'] = load_pet_animation_frames(self.pet_id, 'attack', self.scale)
+        self.animations['attack_styles'] = get_pet_animation_frames(self.pet_id, 'attack', self.scale)
         self.current_attack_frames = []
+        self.attack_style = 0
 
     def attack(self):
         if not self.is_attacking and self.animations['attack_styles']:
@@ -1212,7 +1953,8 @@ class ThuCungTanCong(ThuCung):
             self.frame_index = 0
             self.anim_timer = 0
             self.attack_anim_timer = 0
-            self.current_attack_frames = random.choice(self.animations['attack_styles'])
+            self.attack_style = random.randrange(len(self.animations['attack_styles']))
+            self.current_attack_frames = self.animations['attack_styles'][self.attack_style]
 
     def update(self, dt):
         if self.is_attacking:
@@ -1267,75 +2009,259 @@ class ThuCungTanCong(ThuCung):
             return self.current_attack_frames
         return super().get_current_animation_frames()
 
+    def get_current_frames_key(self):
+        if self.state == 'attack':
+            return (self.pet_id, 'attack', self.scale, self.attack_style)
+        return super().get_current_frames_key()
+
 # -------------------- MODULE:GAME INITIALIZATION & STATE --------------------
 # -------------------- SUB-MODULE:GAME OBJECTS --------------------
 char_paths = [f"CHARACTER/{var}_P{i}.png" for var in ["Hero","Modern_Hero","Ninja","Peasant","Warrior"] for i in range(1,4)]
-char_objs = [NguoiChamSoc(p.split("/")[-1].replace(".png",""), p, frame_data, 3.0) for p in char_paths]
-for c, p in zip(char_objs, char_paths): c.sheet_path = p
-shop = CongTrinh("GUI/shop.png", (0, 5), (256, 256), "Press 'E' to enter Shop", "shop_menu")
-home = CongTrinh("GUI/home2.png", (275, -12), (260, 260), "Press 'E' to enter Home", "home_menu")
-storage = CongTrinh("GUI/storage.png", (home.rect.right + 50, 33), (170, 170), "Press 'E' to open Storage", "storage_menu")
-world_buildings = [shop, home, storage]
-try:
-    shopkeeper = NguoiChamSoc("Shopkeeper", "CHARACTER/Ninja_Style_2_P2.png", frame_data, 10.0)
-except Exception as e:
-    print(f"Warning: Could not load shopkeeper character asset: {e}")
-    shopkeeper = None
+char_objs = []
+def create_character(sheet_path, surfaces):
+    with predecoded(surfaces):
+        char_obj = NguoiChamSoc(sheet_path.split("/")[-1].replace(".png",""), sheet_path, character_frames, 3.0)
+        char_obj.get_frames("IdleSouth")  # built now, while the sheet is predecoded
+        char_objs.append(char_obj)
+for p in char_paths:
+    asset_loader.add_images([p], lambda surfaces, p=p: create_character(p, surfaces))
+
+shop = home = storage = None
+world_buildings = []
+def create_buildings(surfaces):
+    global shop, home, storage
+    with predecoded(surfaces):
+        shop = CongTrinh("GUI/shop.png", (0, 5), (256, 256), "Press 'E' to enter Shop", "shop_menu")
+        home = CongTrinh("GUI/home2.png", (275, -12), (260, 260), "Press 'E' to enter Home", "home_menu")
+        storage = CongTrinh("GUI/storage.png", (home.rect.right + 50, 33), (170, 170), "Press 'E' to open Storage", "storage_menu")
+    world_buildings[:] = [shop, home, storage]
+asset_loader.add_images(["GUI/shop.png", "GUI/home2.png", "GUI/storage.png"], create_buildings)
 
-quest_giver_npc = NguoiChamSoc("QuestGiver", "CHARACTER/Ninja_Style_2_P4.png", frame_data, 2.0)
-quest_giver_npc_large = NguoiChamSoc("QuestGiver", "CHARACTER/Ninja_Style_2_P4.png", frame_data, 16.0)
 quest_stand_rect = quest_stand_img.get_rect(topright=(SCREEN_WIDTH - 550, 620))
-quest_giver_npc.x = quest_stand_rect.centerx
-quest_giver_npc.y = quest_stand_rect.centery + 10
 quest_interaction_rect = quest_stand_rect.inflate(-50, -50)
-
-challenge_npc_world = NguoiChamSoc("ChallengeNPC", "CHARACTER/Ninja_Style_2_P3.png", frame_data, 2.0)
-challenge_npc_map = NguoiChamSoc("ChallengeNPC_Map", "CHARACTER/Ninja_Style_2_P3.png", frame_data, 2.0)
-challenge_npc_large = NguoiChamSoc("ChallengeNPC_Large", "CHARACTER/Ninja_Style_2_P3.png", frame_data, 16.0)
 challenge_stand_rect = challenge_stand_img.get_rect(topleft=(SCREEN_WIDTH - 1000, 620))
-challenge_npc_world.x = challenge_stand_rect.centerx
-challenge_npc_world.y = challenge_stand_rect.centery + 20
-challenge_npc_map.x = SCREEN_WIDTH // 2
-challenge_npc_map.y = 150
 challenge_interaction_rect = challenge_stand_rect.inflate(-50, -50)
 
-pointer_text_surface = font_info.render("Quest", True, TEXT_COLOR)
-challenge_pointer_text_surface = font_info.render("Challenge", True, TEXT_COLOR)
+# shopkeeper and the 16x dialogue NPCs belong to asset groups and are created on first use.
+shopkeeper = quest_giver_npc_large = challenge_npc_large = None
+quest_giver_npc = challenge_npc_world = challenge_npc_map = None
+def create_npcs(surfaces):
+    global quest_giver_npc, challenge_npc_world, challenge_npc_map
+    with predecoded(surfaces):
+        quest_giver_npc = NguoiChamSoc("QuestGiver", "CHARACTER/Ninja_Style_2_P4.png", character_frames, 2.0)
+        quest_giver_npc.x = quest_stand_rect.centerx
+        quest_giver_npc.y = quest_stand_rect.centery + 10
+
+        challenge_npc_world = NguoiChamSoc("ChallengeNPC", "CHARACTER/Ninja_Style_2_P3.png", character_frames, 2.0)
+        challenge_npc_map = NguoiChamSoc("ChallengeNPC_Map", "CHARACTER/Ninja_Style_2_P3.png", character_frames, 2.0)
+        challenge_npc_world.x = challenge_stand_rect.centerx
+        challenge_npc_world.y = challenge_stand_rect.centery + 20
+        challenge_npc_map.x = SCREEN_WIDTH // 2
+        challenge_npc_map.y = 150
+        for npc in (quest_giver_npc, challenge_npc_world, challenge_npc_map):
+            npc.get_frames("IdleSouth")
+asset_loader.add_images(["CHARACTER/Ninja_Style_2_P4.png", "CHARACTER/Ninja_Style_2_P3.png"], create_npcs)
+
+pointer_text_surface = render_text(font_info, "Quest", True, TEXT_COLOR)
+challenge_pointer_text_surface = render_text(font_info, "Challenge", True, TEXT_COLOR)
 
 path_center_x, path_width, fence_y, fence_step = SCREEN_WIDTH*0.45, 150, SCREEN_HEIGHT-120, 48
 fence_objects = [(i*fence_step, fence_y) for i in range(int(path_center_x//fence_step))]
 start_x = path_center_x + path_width
 fence_objects.extend([(start_x+i*fence_step, fence_y) for i in range(int((SCREEN_WIDTH-start_x)//fence_step)+1)])
 
-fence_img_vertical_left = pygame.transform.rotate(fence_img, 90)
-fence_img_vertical_right = pygame.transform.rotate(fence_img, -90)
+pet_house_rect = pygame.Rect(0, 0, 256, 256)
+pet_house_rect.topright = (SCREEN_WIDTH - 50, 50)
+pond_rect = pygame.Rect(0, 0, 400, 200)
+pond_rect.bottomright = (SCREEN_WIDTH - 80, SCREEN_HEIGHT - 50)
+trees_rects = [pygame.Rect(0, 0, 128, 160) for _ in range(4)]
+trees_rects[0].center = (150, 200)
+trees_rects[1].center = (300, 500)
+trees_rects[2].center = (100, SCREEN_HEIGHT - 150)
+trees_rects[3].center = (PATH_START_X - 150, SCREEN_HEIGHT // 2 + 100)
+decorations_to_draw = {}
+
+def refresh_fence_images():
+    """
+    Rebuilds the rotated fence surfaces after the loader replaces fence_img.
+    """
+    global fence_img_vertical_left, fence_img_vertical_right
+    fence_img_vertical_left = pygame.transform.rotate(fence_img, 90)
+    fence_img_vertical_right = pygame.transform.rotate(fence_img, -90)
+
+refresh_fence_images()
 left_fence_line = [(PATH_START_X - fence_img_vertical_left.get_width()//2, i * 48) for i in range(SCREEN_HEIGHT // 48 + 1)]
 right_fence_line = [(PATH_END_X - fence_img_vertical_right.get_width()//2, i * 48) for i in range(SCREEN_HEIGHT // 48 + 1)]
 
 left_fence_interaction_rect = pygame.Rect(PATH_START_X - 50, SCREEN_HEIGHT // 2 - 75, 100, 150)
 right_fence_interaction_rect = pygame.Rect(PATH_END_X - 50, SCREEN_HEIGHT // 2 - 75, 100, 150)
 
-pet_house_rect = pet_house_img.get_rect(topright=(SCREEN_WIDTH - 50, 50))
-pond_rect = pond_img.get_rect(bottomright=(SCREEN_WIDTH - 80, SCREEN_HEIGHT - 50))
-trees_rects = [
-    tree_img.get_rect(center=(150, 200)),
-    tree_img.get_rect(center=(300, 500)),
-    tree_img.get_rect(center=(100, SCREEN_HEIGHT - 150)),
-    tree_img.get_rect(center=(PATH_START_X - 150, SCREEN_HEIGHT // 2 + 100))
-]
-decorations_to_draw = {}
-decorations_to_draw['pet_house'] = {'img': pet_house_img, 'rect': pet_house_rect, 'y_sort': pet_house_rect.bottom}
-decorations_to_draw['pond'] = {'img': pond_img, 'rect': pond_rect, 'y_sort': pond_rect.centery}
-for i, r in enumerate(trees_rects):
-    decorations_to_draw[f'tree_{i}'] = {'img': tree_img, 'rect': r, 'y_sort': r.bottom}
-
 pond_collision_rect = pond_rect.inflate(0, -pond_rect.height * 0.6)
 pond_collision_rect.bottom = pond_rect.bottom
 pet_house_collision_rect = pygame.Rect(pet_house_rect.left + 30, pet_house_rect.bottom - 60, pet_house_rect.width - 60, 60)
 decoration_collision_rects = [pet_house_collision_rect, pond_collision_rect]
 
-scene, loading_start = "loading", time.time()
+# -------------------- SUB-MODULE:MAP ASSET GROUPS --------------------
+def load_group_image(path, size, has_alpha, fallback_color):
+    img = load_scaled_image(path, size, has_alpha)
+    if img is None:
+        print(f"Warning: {path} not found.")
+        img = pygame.Surface(size, pygame.SRCALPHA if has_alpha else 0)
+        img.fill(fallback_color)
+    return img
+
+def load_pet_area_assets():
+    global pet_house_img, pond_img, tree_img
+    pet_house_img = load_group_image("GUI/pet_house.png", (256, 256), True, (150, 75, 0))
+    pond_img = load_group_image("GUI/pond.png", (400, 200), True, (0, 100, 200))
+    tree_img = load_group_image("GUI/tree.png", (128, 160), True, (0, 100, 0))
+    decorations_to_draw['pet_house'] = {'img': pet_house_img, 'rect': pet_house_rect, 'y_sort': pet_house_rect.bottom}
+    decorations_to_draw['pond'] = {'img': pond_img, 'rect': pond_rect, 'y_sort': pond_rect.centery}
+    for i, r in enumerate(trees_rects):
+        decorations_to_draw[f'tree_{i}'] = {'img': tree_img, 'rect': r, 'y_sort': r.bottom}
+
+def release_pet_area_assets():
+    global pet_house_img, pond_img, tree_img
+    pet_house_img = pond_img = tree_img = None
+    decorations_to_draw.clear()
+    static_layers.pop("pet_area", None)
+
+def load_chicken_map_assets():
+    global chicken_map_img
+    chicken_map_img = load_group_image("GUI/map2.png", (SCREEN_WIDTH, SCREEN_HEIGHT), False, (210, 180, 140))
+    for enemy_id in enemy_data:
+        get_enemy_animation_frames(enemy_id, 'idle', ENEMY_SCALE)
+        get_enemy_animation_frames(enemy_id, 'walk', ENEMY_SCALE)
+
+def release_chicken_map_assets():
+    global chicken_map_img
+    chicken_map_img = None
+    evict_cached_frames(lambda key: key[0] == "enemy")
+
+def load_npc_dialogue_assets():
+    global quest_giver_npc_large, challenge_npc_large
+    quest_giver_npc_large = NguoiChamSoc("QuestGiver", "CHARACTER/Ninja_Style_2_P4.png", character_frames, 16.0)
+    challenge_npc_large = NguoiChamSoc("ChallengeNPC_Large", "CHARACTER/Ninja_Style_2_P3.png", character_frames, 16.0)
+
+def release_npc_dialogue_assets():
+    global quest_giver_npc_large, challenge_npc_large
+    quest_giver_npc_large = challenge_npc_large = None
+
+def load_shop_assets():
+    global shopkeeper
+    try:
+        shopkeeper = NguoiChamSoc("Shopkeeper", "CHARACTER/Ninja_Style_2_P2.png", character_frames, 10.0)
+    except Exception as e:
+        print(f"Warning: Could not load shopkeeper character asset: {e}")
+        shopkeeper = None
+
+def release_shop_assets():
+    global shopkeeper
+    shopkeeper = None
+
+def release_char_select_assets():
+    global large_char
+    large_char = None
+
+# A group is in use while current_map is one of its maps (any scene drawn over that map)
+# or scene is one of its scenes. Idle groups are released after ASSET_GROUP_IDLE_SECONDS.
+asset_groups = {
+    "pet_area": {"maps": ["pet_area"], "scenes": [], "load": load_pet_area_assets, "release": release_pet_area_assets},
+    "chicken_map": {"maps": ["chicken_map"], "scenes": [], "load": load_chicken_map_assets, "release": release_chicken_map_assets},
+    "npc_dialogue": {"maps": [], "scenes": ["quest_dialogue", "challenge_main_dialogue", "challenge_pre_sell_dialogue", "challenge_dialogue", "challenge_sell_dialogue"],
+                     "load": load_npc_dialogue_assets, "release": release_npc_dialogue_assets},
+    "shop": {"maps": [], "scenes": ["shop_menu"], "load": load_shop_assets, "release": release_shop_assets},
+    # The 10x preview is built by the char_select draw for whichever character is selected.
+    "char_select": {"maps": [], "scenes": ["char_select"], "load": lambda: None, "release": release_char_select_assets},
+}
+for group in asset_groups.values():
+    group["loaded"], group["last_used"] = False, 0
+
+def update_asset_groups(current_map, scene, in_game):
+    """
+    Loads the groups the current map and scene need, and releases the ones idle for too long.
+    """
+    now = time.time()
+    for name, group in asset_groups.items():
+        if (in_game and current_map in group["maps"]) or scene in group["scenes"]:
+            if not group["loaded"]:
+                group["load"]()
+                group["loaded"] = True
+            group["last_used"] = now
+        elif group["loaded"] and now - group["last_used"] > ASSET_GROUP_IDLE_SECONDS:
+            group["release"]()
+            group["loaded"] = False
+
+# -------------------- SUB-MODULE:STATIC LAYERS --------------------
+# Map backgrounds and fence columns are composited once and rebuilt only when
+# a part changes: a loader swaps an image, a gate opens or the screen is resized.
+static_layers = {}
+
+def get_static_layer(name, parts, build):
+    """
+    Returns the cached layer for name, calling build() again only when parts differ from the last build.
+    """
+    layer = static_layers.get(name)
+    if layer is None or layer[0] != parts:
+        layer = (parts, build())
+        static_layers[name] = layer
+    return layer[1]
+
+def build_world_background():
+    layer = pygame.Surface(screen.get_size()).convert()
+    layer.blit(play_map_img, (0, 0))
+    for building in world_buildings:
+        building.draw(layer)
+    for pos in fence_objects:
+        layer.blit(fence_img, pos)
+    return layer
+
+def build_pet_area_background():
+    layer = pygame.Surface(screen.get_size()).convert()
+    layer.blit(play_map_img, (0, 0))
+    layer.blit(pond_img, pond_rect)
+    return layer
+
+def build_fence_column(fence_image, fence_line, gate_open):
+    """
+    Stacks one vertical fence line into a premultiplied strip, leaving the gate gap out when it is open.
+
+    Returns:
+        tuple: (strip Surface, topleft)
+    """
+    fence = fence_image.premul_alpha()
+    left = fence_line[0][0]
+    strip = pygame.Surface((fence.get_width(), max(y for _, y in fence_line) + fence.get_height()), pygame.SRCALPHA)
+    for x, y in fence_line:
+        if gate_open and SCREEN_HEIGHT // 2 - 80 < y < SCREEN_HEIGHT // 2 + 80:
+            continue
+        strip.blit(fence, (x - left, y), special_flags=pygame.BLEND_PREMULTIPLIED)
+    return strip, (left, 0)
+
+def draw_map_background(surface, current_map):
+    """
+    Blits the static layer of current_map: the map image plus every building, fence and decoration drawn under all sprites.
+    """
+    if current_map == "chicken_map":
+        surface.blit(chicken_map_img, (0, 0))
+    elif current_map == "pet_area":
+        surface.blit(get_static_layer("pet_area", (screen.get_size(), play_map_img, pond_img), build_pet_area_background), (0, 0))
+    else:
+        parts = (screen.get_size(), play_map_img, fence_img, tuple(b.image for b in world_buildings if b.is_valid))
+        surface.blit(get_static_layer("world", parts, build_world_background), (0, 0))
+
+def draw_pet_area_fences(surface):
+    """
+    Blits the two fence columns that are drawn over the pet area's sprites.
+    """
+    for name, fence_image, fence_line, gate_open in [("left_fence", fence_img_vertical_left, left_fence_line, left_fence_open),
+                                                     ("right_fence", fence_img_vertical_right, right_fence_line, right_fence_open)]:
+        strip, pos = get_static_layer(name, (fence_image, gate_open), lambda: build_fence_column(fence_image, fence_line, gate_open))
+        surface.blit(strip, pos, special_flags=pygame.BLEND_PREMULTIPLIED)
+
+scene = "loading"
 selection_idx, selected, player = 0, None, None
+large_char = None  # char_select's 10x preview, rebuilt only when the selection changes; released with its asset group
 selected_profile_idx, player_name_input = None, ""
 confirming_delete,confirming_escape, delete_target_index = False,False,None
 game_currency, current_map = None, "world"
@@ -1399,30 +2325,30 @@ left_fence_open = False
 right_fence_open = False
 # -------------------- SUB-MODULE:ITEM & PET LOGIC --------------------
 def load_hatching_animation(egg_id):
+    """
+    The egg's hatch frames already scaled to HATCH_FRAME_SIZE, kept in the sprite cache under ("hatch", egg_id).
+    """
     if egg_id not in item_data: return []
-    base_path = item_data[egg_id]["image_path"].replace("_1.png", "_")
-    frames = []
-    for i in range(1, 23):
-        path = f"{base_path}{i}.png"
-        try:
-            frames.append(safe_image_load(path).convert_alpha())
-        except pygame.error:
-            break
-    return frames
+    def build():
+        base_path = item_data[egg_id]["image_path"].replace("_1.png", "_")
+        frames = []
+        for i in range(1, 23):
+            path = f"{base_path}{i}.png"
+            try:
+                frames.append(pygame.transform.scale(safe_image_load(path).convert_alpha(), HATCH_FRAME_SIZE))
+            except pygame.error:
+                break
+        return frames
+    return get_cached_frames(("hatch", egg_id), build)
 
 def choose_pet_from_egg(egg_id):
     if egg_id not in item_data: return None
-    egg_details = item_data[egg_id].get("data", {})
-    possible_pets = egg_details.get("possible_pets", [])
-    if not possible_pets: return None
-    pet_ids = [p["pet_id"] for p in possible_pets]
-    chances = [p["chance"] for p in possible_pets]
-    return random.choices(pet_ids, weights=chances, k=1)[0]
+    return pet_engine.choose_pet_from_egg(item_data[egg_id])
 
 def draw_item_effects(surface, effects_dict, start_pos):
     y_offset = 0
     line_height = 28
-    effects_title = font_info.render("Effects:", True, TEXT_COLOR)
+    effects_title = render_text(font_info, "Effects:", True, TEXT_COLOR)
     surface.blit(effects_title, (start_pos[0], start_pos[1]))
     y_offset += line_height
     
@@ -1435,38 +2361,39 @@ def draw_item_effects(surface, effects_dict, start_pos):
                 display_stat = "Fullness" # Or "Fullness" if you prefer
             
             text = f"+{value} {display_stat}"
-            effect_text = font_info.render(text, True, BOOST_COLOR)
+            effect_text = render_text(font_info, text, True, BOOST_COLOR)
             surface.blit(effect_text, (start_pos[0] + 10, start_pos[1] + y_offset))
             y_offset += line_height
     return y_offset
 # -------------------- SUB-MODULE:SAVE AND QUIT HANDLING --------------------
 def save_and_quit():
+    shared_storage.wait()  # transfers still in flight save their profile side first
     if game_currency and selected_profile_idx is not None and incubator_manager and player_inventory:
         print("Saving game data...")
         for pet_obj in active_pets:
-            for p_inv_pet in player_inventory.pets:
-                if p_inv_pet['instance_id'] == pet_obj.instance_data['instance_id']:
-                    p_inv_pet.update(pet_obj.instance_data)
-                    break
+            player_inventory.update_pet(pet_obj.instance_data)
         
         profile = profiles[selected_profile_idx]
         profile['money'] = game_currency.money
         profile['play_time'] = game_currency.get_current_play_time()
         profile['unlocked_incubators'] = incubator_manager.unlocked_incubators
         profile['incubator_slots'] = incubator_manager.slots
-        profile['inventory'] = player_inventory.items
-        profile['pets'] = player_inventory.pets
+        profile['inventory'], profile['pets'] = player_inventory.export()
         profile['active_pet_instances'] = [p.instance_data['instance_id'] for p in active_pets]
         profile['unlocked_pet_slots'] = profiles[selected_profile_idx].get('unlocked_pet_slots', 5)
         profile['last_map'] = "world" if current_map == "chicken_map" else current_map
 
         save_profiles()
-        save_global_storage()
+        save_queue.flush()
+        profile_store.compact(selected_profile_idx, profile)
         print("Save complete.")
+    save_queue.flush()
+    shared_storage.close()
     pygame.quit()
     sys.exit()
 
 # -------------------- MODULE:GAME LOOP --------------------
+presented_view = None
 while True:
     dt = clock.tick(60)
     mouse_pos = pygame.mouse.get_pos()
@@ -1483,37 +2410,15 @@ while True:
         money_generation_timer += dt
         if money_generation_timer >= 60000:
             money_generation_timer -= 60000
-            total_money_generated = 0
-            for pet_obj in active_pets:
-                pet_instance = pet_obj.instance_data
-                pet_def = pet_obj.definition
-                if not pet_def: continue
-                
-                ### MODIFIED: Add level bonus to money generation
-                pet_level = pet_instance.get('level', 0)
-                level_bonus = 1.0 + (pet_level / 10.0)
-
-                avg_stat_percent = (pet_instance['health']+pet_instance['happiness']+pet_instance['hunger'])/3.0
-                avg_stat_ratio = avg_stat_percent / 100.0
-                base_money = pet_def.get('base_money_per_minute', 0)
-                
-                money_for_pet = base_money * avg_stat_ratio * level_bonus
-                total_money_generated += int(money_for_pet)
+            total_money_generated = pet_engine.collect_income([p.instance_data for p in active_pets], pet_data)
             
             if total_money_generated > 0:
                 game_currency.money += total_money_generated
                 if quest_manager: quest_manager.track_action("earn_money", amount=total_money_generated)
                 print(f"Your active pets generated {total_money_generated} coins!")
             
-            active_instance_ids = [p.instance_data['instance_id'] for p in active_pets]
-            for pet_instance in player_inventory.get_all_pets():
-                if pet_instance['instance_id'] not in active_instance_ids:
-                    pet_def = pet_data.get(pet_instance['pet_id'], {})
-                    if not pet_def: continue
-                    decay_rates = pet_def.get('stat_decay_rate', {})
-                    pet_instance['hunger'] = max(0, pet_instance['hunger'] - decay_rates.get('hunger',0)*60)
-                    pet_instance['happiness'] = max(0, pet_instance['happiness'] - decay_rates.get('happiness',0)*60)
-                    if pet_instance['hunger']<=0: pet_instance['health']=max(0,pet_instance['health']-decay_rates.get('health',0)*60)
+            active_instance_ids = {p.instance_data['instance_id'] for p in active_pets}
+            pet_engine.decay_inactive_pets(player_inventory.get_all_pets(), active_instance_ids, pet_data)
 
     if current_map == "chicken_map" and scene == "play":
         challenge_spawn_timer += dt
@@ -1526,7 +2431,8 @@ while True:
                 if c_type in enemy_data: active_enemies.append(Ga(c_type))
             print(f"Spawned {len(active_enemies)} chickens in the challenge map.")
 
-    for e in pygame.event.get():
+    frame_events = pygame.event.get()
+    for e in frame_events:
         if e.type == pygame.QUIT: save_and_quit()
         if e.type == pygame.MOUSEBUTTONUP and e.button == 1:
             is_dragging_scrollbar = False
@@ -1568,11 +2474,11 @@ while True:
             if e.type == pygame.KEYDOWN:
                 if e.key == pygame.K_RETURN:
                     if player_name_input.strip():
-                        profiles[selected_profile_idx]={"name":player_name_input.strip(),"char":None,"money":10,"play_time":0,"unlocked_incubators":[True,True,True,True,False,False,False,False],"inventory":{},"incubator_slots":{},"pets":[],"active_pet_instances":[],"last_map":"world","unlocked_pet_slots":5,"quests":{'daily_quests':[],'progress':{},'claimed':[],'last_reset_day':0,'quests_accepted_today':False}}
+                        profiles[selected_profile_idx]={"schema_version":save_format.PROFILE_SCHEMA_VERSION,"name":player_name_input.strip(),"char":None,"money":10,"play_time":0,"unlocked_incubators":[True,True,True,True,False,False,False,False],"inventory":{},"incubator_slots":{},"pets":[],"active_pet_instances":[],"last_map":"world","unlocked_pet_slots":5,"quests":{'daily_quests':[],'progress':{},'claimed':[],'last_reset_day':0,'quests_accepted_today':False}}
                         save_profiles()
                         incubator_manager=Trung(profiles[selected_profile_idx]['unlocked_incubators'],{})
                         game_currency=TienTe(10,0)
-                        player_inventory=TuiDo({},[])
+                        player_inventory=make_inventory({},[])
                         scene="char_select"
                 elif e.key == pygame.K_BACKSPACE: player_name_input=player_name_input[:-1]
                 else: player_name_input+=e.unicode
@@ -1582,6 +2488,7 @@ while True:
                 if confirming_delete:
                     if yes_button_rect.collidepoint(e.pos):
                         profiles[delete_target_index]=None
+                        profile_store.delete(delete_target_index)
                         save_profiles()
                         confirming_delete=False
                     elif no_button_rect.collidepoint(e.pos):
@@ -1589,28 +2496,29 @@ while True:
                 else:
                     for i in range(NUM_ROWS):
                         row_rect=pygame.Rect(PANEL_X,PANEL_Y+(i*ROW_HEIGHT),PANEL_WIDTH,ROW_HEIGHT)
-                        if trash_can_img and profiles[i] is not None and pygame.Rect(PANEL_X+PANEL_WIDTH-80,PANEL_Y+(i*ROW_HEIGHT)+ROW_HEIGHT//2-24,48,48).collidepoint(e.pos):
+                        if trash_can_img and profile_index[i] is not None and pygame.Rect(PANEL_X+PANEL_WIDTH-80,PANEL_Y+(i*ROW_HEIGHT)+ROW_HEIGHT//2-24,48,48).collidepoint(e.pos):
                             confirming_delete=True
                             delete_target_index=i
                             break
                         if row_rect.collidepoint(e.pos):
                             selected_profile_idx=i
+                            if profile_index[i] is not None and profiles[i] is None:
+                                profiles[i]=profile_store.load_profile(i)
                             profile=profiles[i]
                             if profile is None:
                                 player_name_input=""
                                 scene="name_input"
                             else:
-                                if 'unlocked_pet_slots' not in profile or profile['unlocked_pet_slots']<5: profile['unlocked_pet_slots']=5
-                                if 'active_pet_instances' not in profile: profile['active_pet_instances']=[]
-                                if 'last_map' not in profile: profile['last_map']='world'
-                                if 'quests' not in profile: profile['quests']={'daily_quests':[],'progress':{},'claimed':[],'last_reset_day':0,'quests_accepted_today':False}
-                                if 'quests_accepted_today' not in profile['quests']: profile['quests']['quests_accepted_today']=False
-
-                                ### NEW: Backwards compatibility for pet levels in save files
+                                # Older saves were already brought up to the current schema by profile_store.load_profile.
+                                reconcile_storage_transfers(profile)
                                 pets_data_saved = profile.get("pets", [])
-                                for pet in pets_data_saved:
-                                    pet.setdefault('level', 0)
-                                    pet.setdefault('experience', 0)
+                                away_seconds, away_coins = pet_engine.catch_up_profile(profile, pet_data, time.time())
+                                money_generation_timer = profile.get("income_timer", 0) * 1000
+                                if away_seconds > 0:
+                                    print(f"Caught up {TienTe.format_time(away_seconds)} away: pets earned {away_coins} coins.")
+                                    if away_coins > 0:
+                                        storage_message = f"While you were away, your pets earned {away_coins} coins!"
+                                        storage_message_timer = time.time()
 
                                 if theme_song_path and not pygame.mixer.music.get_busy():
                                     pygame.mixer.music.load(theme_song_path)
@@ -1621,7 +2529,7 @@ while True:
                                 play_time=profile.get("play_time",0)
                                 inventory_data=profile.get("inventory",{})
                                 game_currency=TienTe(money,play_time)
-                                player_inventory=TuiDo(inventory_data,pets_data_saved)
+                                player_inventory=make_inventory(inventory_data,pets_data_saved)
                                 unlocked_data=profile.get("unlocked_incubators",[True,True,True,True,False,False,False,False])
                                 slots_data=profile.get("incubator_slots",{})
                                 incubator_manager=Trung(unlocked_data,slots_data)
@@ -1636,7 +2544,7 @@ while True:
                                 if profile.get("char"):
                                     selected=next((c for c in char_objs if c.name==profile["char"]),None)
                                     if selected:
-                                        player=NguoiChamSoc(selected.name,selected.sheet_path,frame_data,2.0)
+                                        player=NguoiChamSoc(selected.name,selected.sheet_path,character_frames,2.0)
                                         player.x,player.y=SCREEN_WIDTH//2,SCREEN_HEIGHT//2
                                         saved_map = profile.get('last_map','world')
                                         if saved_map=="chicken_map":
@@ -1662,7 +2570,7 @@ while True:
                     selected=char_objs[selection_idx]
                     profiles[selected_profile_idx]["char"]=selected.name
                     save_profiles()
-                    player=NguoiChamSoc(selected.name,selected.sheet_path,frame_data,2.0)
+                    player=NguoiChamSoc(selected.name,selected.sheet_path,character_frames,2.0)
                     player.x,player.y=SCREEN_WIDTH//2,SCREEN_HEIGHT//2
                     scene="play"
             elif e.type == pygame.KEYDOWN:
@@ -1672,7 +2580,7 @@ while True:
                     selected=char_objs[selection_idx]
                     profiles[selected_profile_idx]["char"]=selected.name
                     save_profiles()
-                    player=NguoiChamSoc(selected.name,selected.sheet_path,frame_data,2.0)
+                    player=NguoiChamSoc(selected.name,selected.sheet_path,character_frames,2.0)
                     player.x,player.y=SCREEN_WIDTH//2,SCREEN_HEIGHT//2
                     scene="play"
             for char_obj in char_objs: char_obj.update(dt)
@@ -1854,7 +2762,10 @@ while True:
                         incubator_selection_slot=click_result['slot']
                         scene="incubator_egg_select"
                     elif click_result['action'] == 'hatch':
-                        hatching_info={'slot_key':click_result['slot_key'],'egg_id':click_result['egg_id']}
+                        # The pet is picked now so its reveal frames can be built while the egg cracks.
+                        hatched_pet_id=choose_pet_from_egg(click_result['egg_id'])
+                        hatching_info={'slot_key':click_result['slot_key'],'egg_id':click_result['egg_id'],'pet_id':hatched_pet_id,
+                                       'reveal_frames':prefetch_pet_animation_frames(hatched_pet_id,"idle",scale=15.0)}
                         hatching_animation_frames=load_hatching_animation(hatching_info['egg_id'])
                         hatching_frame_index=0
                         hatching_timer=0
@@ -1981,22 +2892,35 @@ while True:
                         storage_transfer_popup_active = False
                     elif confirm_rect.collidepoint(e.pos):
                         info = storage_transfer_info
-                        qty_to_move = info['quantity']
+                        item_id, qty_to_move = info['item_id'], info['quantity']
+                        owner = storage_owner(profiles[selected_profile_idx])
+                        # Transfers finish on the storage thread; the callbacks run in shared_storage.pump().
                         if info['direction'] == 'store':
-                            if player_inventory.remove_item(info['item_id'], qty_to_move):
-                                global_storage_data['items'][info['item_id']] = global_storage_data['items'].get(info['item_id'], 0) + qty_to_move
-                                storage_message = f"Stored {qty_to_move} {item_data[info['item_id']]['name']}."
+                            if player_inventory.remove_item(item_id, qty_to_move):
+                                def stored(transfer_id, item_id=item_id, qty=qty_to_move):
+                                    global storage_message, storage_message_timer
+                                    if transfer_id is None:
+                                        player_inventory.add_item(item_id, qty)
+                                        storage_message = "Storage is busy, try again."
+                                    else:
+                                        storage_transfer_done(transfer_id)
+                                        storage_message = f"Stored {qty} {item_data[item_id]['name']}."
+                                    storage_message_timer = time.time()
+                                shared_storage.deposit_item(owner, item_id, qty_to_move, stored)
                         elif info['direction'] == 'retrieve':
-                            global_storage_data['items'][info['item_id']] -= qty_to_move
-                            if global_storage_data['items'][info['item_id']] == 0: del global_storage_data['items'][info['item_id']]
-                            player_inventory.add_item(info['item_id'], qty_to_move)
-                            storage_message = f"Retrieved {qty_to_move} {item_data[info['item_id']]['name']}."
-                        
-                        save_profiles()
-                        save_global_storage()
+                            def retrieved(transfer_id, item_id=item_id, qty=qty_to_move):
+                                global storage_message, storage_message_timer
+                                if transfer_id is None:
+                                    # Another instance may have taken some since the popup opened.
+                                    storage_message = f"Only {shared_storage.items.get(item_id, 0)} left in storage."
+                                else:
+                                    player_inventory.add_item(item_id, qty)
+                                    storage_transfer_done(transfer_id)
+                                    storage_message = f"Retrieved {qty} {item_data[item_id]['name']}."
+                                storage_message_timer = time.time()
+                            shared_storage.withdraw_item(owner, item_id, qty_to_move, retrieved)
                         storage_transfer_popup_active = False
                         storage_selected_player_idx, storage_selected_global_idx = None, None
-                        storage_message_timer = time.time()
                 continue
 
             if e.type == pygame.MOUSEBUTTONDOWN and e.button == 1:
@@ -2023,27 +2947,37 @@ while True:
                             storage_message = "Cannot move an active pet!"
                             storage_message_timer = time.time()
                         else:
-                            player_inventory.pets.remove(pet_to_move)
-                            global_storage_data['pets'].append(pet_to_move)
-                            storage_message = f"Moved {pet_to_move['name']} to storage."
-                            storage_message_timer = time.time()
-                            save_profiles()
-                            save_global_storage()
+                            player_inventory.remove_pet(pet_to_move['instance_id'])
+                            def stored(transfer_id, pet=pet_to_move):
+                                global storage_message, storage_message_timer
+                                if transfer_id is None:
+                                    player_inventory.insert_pet(pet)
+                                    storage_message = "Storage is busy, try again."
+                                else:
+                                    storage_transfer_done(transfer_id)
+                                    storage_message = f"Moved {pet['name']} to storage."
+                                storage_message_timer = time.time()
+                            shared_storage.deposit_pet(storage_owner(profiles[selected_profile_idx]), pet_to_move, stored)
                             storage_selected_player_idx = None
                 
                 elif retrieve_button_rect.collidepoint(mouse_pos) and storage_selected_global_idx is not None:
                     if storage_scene_tab == 'items':
-                        item_id, quantity = sorted(global_storage_data['items'].items())[storage_selected_global_idx]
+                        item_id, quantity = sorted(shared_storage.items.items())[storage_selected_global_idx]
                         storage_transfer_popup_active = True
                         storage_transfer_info = {"item_id": item_id, "direction": "retrieve", "quantity": 1, "max_quantity": quantity, "is_dragging": False}
                     else:
-                        pet_to_move = sorted(global_storage_data['pets'], key=lambda p: p['instance_id'])[storage_selected_global_idx]
-                        global_storage_data['pets'].remove(pet_to_move)
-                        player_inventory.pets.append(pet_to_move)
-                        storage_message = f"Moved {pet_to_move['name']} to inventory."
-                        storage_message_timer = time.time()
-                        save_profiles()
-                        save_global_storage()
+                        stored_pet = sorted(shared_storage.pets, key=lambda p: p['instance_id'])[storage_selected_global_idx]
+                        def retrieved(result, name=stored_pet['name']):
+                            global storage_message, storage_message_timer
+                            if result is None:
+                                storage_message = f"{name} was already taken out."
+                            else:
+                                transfer_id, pet = result
+                                player_inventory.insert_pet(pet)
+                                storage_transfer_done(transfer_id)
+                                storage_message = f"Moved {pet['name']} to inventory."
+                            storage_message_timer = time.time()
+                        shared_storage.withdraw_pet(storage_owner(profiles[selected_profile_idx]), stored_pet['storage_id'], retrieved)
                         storage_selected_global_idx = None
 
             if e.type == pygame.MOUSEWHEEL:
@@ -2091,8 +3025,8 @@ while True:
                 if challenge_pre_sell_no_rect.collidepoint(mouse_pos):
                     scene = "play"
                 elif challenge_pre_sell_yes_rect.collidepoint(mouse_pos):
-                    if player_inventory.items.get("item_chicken_meat", 0) > 0:
-                        max_sell_quantity = player_inventory.items["item_chicken_meat"]
+                    if player_inventory.get_item_count("item_chicken_meat") > 0:
+                        max_sell_quantity = player_inventory.get_item_count("item_chicken_meat")
                         sell_quantity = 1
                         scene = "challenge_sell_dialogue"
                     else:
@@ -2168,7 +3102,7 @@ while True:
             if e.type == pygame.KEYDOWN and e.key == pygame.K_e:
                 scene = "play"
             if e.type == pygame.MOUSEBUTTONDOWN and e.button == 1:
-                eligible_pets = [p for p in player_inventory.get_all_pets() if pet_data.get(p['pet_id'],{}).get('can_attack')]
+                eligible_pets = player_inventory.get_pets_by_pet_ids([k for k,v in pet_data.items() if v.get('can_attack')])
                 list_panel_rect = pygame.Rect(0,0,800,SCREEN_HEIGHT-200)
                 list_panel_rect.center = (SCREEN_WIDTH/2,SCREEN_HEIGHT/2)
                 list_content_rect = list_panel_rect.inflate(-40,-120)
@@ -2187,6 +3121,7 @@ while True:
                             break
 
     # -------------------- Draw Scenes --------------------
+    update_asset_groups(current_map, scene, player is not None)
     screen.fill((0, 0, 0))
     
     if scene == 'play': clickable_interaction_rects = {}
@@ -2202,83 +3137,78 @@ while True:
         active_challenge_pet.update(dt)
 
     if scene == "loading":
+        asset_loader.pump(LOADING_FRAME_BUDGET_MS)
         screen.blit(title_img,(0,0))
-        elapsed=time.time()-loading_start
-        pct=min(elapsed/3,1)
+        pct=asset_loader.progress()
         w,h=400,30
         x,y=(SCREEN_WIDTH-w)//2,int(SCREEN_HEIGHT*0.85)
         pygame.draw.rect(screen,GRAY,(x,y,w,h),1,10)
         pygame.draw.rect(screen,LOADING_BAR,(x+2,y+2,int((w-4)*pct),h-4),0,8)
-        if pct>=1:
-            time.sleep(0.5)
+        if asset_loader.is_done():
+            refresh_fence_images()
             scene="profile_save"
     elif scene == "name_input":
         screen.blit(bg_img,(0,0))
-        overlay=pygame.Surface((SCREEN_WIDTH,SCREEN_HEIGHT),pygame.SRCALPHA)
-        overlay.fill((0,0,0,180))
+        overlay=get_overlay((SCREEN_WIDTH,SCREEN_HEIGHT),(0,0,0,180))
         screen.blit(overlay,(0,0))
-        prompt=font.render("Enter your name:",True,WHITE)
+        prompt=render_text(font,"Enter your name:",True,WHITE)
         screen.blit(prompt,(SCREEN_WIDTH//2-prompt.get_width()//2,SCREEN_HEIGHT//2-100))
-        name_surface=font.render(player_name_input+"_",True,WHITE)
+        name_surface=render_text(font,player_name_input+"_",True,WHITE)
         screen.blit(name_surface,(SCREEN_WIDTH//2-name_surface.get_width()//2,SCREEN_HEIGHT//2))
     elif scene == "profile_save":
         screen.blit(bg_img,(0,0))
-        overlay=pygame.Surface((SCREEN_WIDTH,SCREEN_HEIGHT),pygame.SRCALPHA)
-        overlay.fill((0,0,0,100))
+        overlay=get_overlay((SCREEN_WIDTH,SCREEN_HEIGHT),(0,0,0,100))
         screen.blit(overlay,(0,0))
-        title_label=font.render("SELECT A PROFILE",True,WHITE)
+        title_label=render_text(font,"SELECT A PROFILE",True,WHITE)
         screen.blit(title_label,(SCREEN_WIDTH//2-title_label.get_width()//2,150))
         pygame.draw.rect(screen,PANEL_FILL_COLOR,panel_rect,0,10)
         for i in range(NUM_ROWS):
             row_y=PANEL_Y+(i*ROW_HEIGHT)
-            profile=profiles[i]
+            profile=profile_index[i]
             char=None
-            screen.blit(font.render(f"{i+1}.",True,TEXT_COLOR),font.render(f"{i+1}.",True,TEXT_COLOR).get_rect(center=(PANEL_X+50,row_y+ROW_HEIGHT//2)))
+            screen.blit(render_text(font,f"{i+1}.",True,TEXT_COLOR),render_text(font,f"{i+1}.",True,TEXT_COLOR).get_rect(center=(PANEL_X+50,row_y+ROW_HEIGHT//2)))
             if profile and profile.get("char"): char=next((c for c in char_objs if c.name==profile["char"]),None)
             if char:
                 char.update(dt)
                 char.draw(screen,(PANEL_X+130,row_y+ROW_HEIGHT//2))
             name_y_offset=-20 if profile else 0
             name_str,color=(profile.get("name","PROFILE"),TEXT_COLOR) if profile else ("[EMPTY]",GRAY)
-            text_surf=font.render(name_str.upper(),True,color)
+            text_surf=render_text(font,name_str.upper(),True,color)
             screen.blit(text_surf,text_surf.get_rect(midleft=(PANEL_X+220,row_y+ROW_HEIGHT//2+name_y_offset)))
             if profile:
-                pet_count = len(profile.get('pets',[]))
+                pet_count = profile.get('pet_count',0)
                 slot_count=profile.get('unlocked_pet_slots',5)
                 info_text_str=f"Money: {profile.get('money',0)} Time: {TienTe.format_time(profile.get('play_time',0))} Pets: {pet_count} Slots: {slot_count}"
-                info_surface=font_info.render(info_text_str,True,TEXT_COLOR)
+                info_surface=render_text(font_info,info_text_str,True,TEXT_COLOR)
                 info_rect=info_surface.get_rect(midleft=(PANEL_X+220,row_y+ROW_HEIGHT//2+25))
                 screen.blit(info_surface,info_rect)
             if profile and trash_can_img: screen.blit(trash_can_img,trash_can_img.get_rect(center=(PANEL_X+PANEL_WIDTH-60,row_y+ROW_HEIGHT//2)))
             if i<NUM_ROWS-1: pygame.draw.line(screen,PANEL_BORDER_COLOR,(PANEL_X,row_y+ROW_HEIGHT),(PANEL_X+PANEL_WIDTH,row_y+ROW_HEIGHT),4)
         pygame.draw.rect(screen,PANEL_BORDER_COLOR,panel_rect,6,10)
         if confirming_delete:
-            overlay_dark=pygame.Surface((SCREEN_WIDTH,SCREEN_HEIGHT),pygame.SRCALPHA)
-            overlay_dark.fill((0,0,0,120))
+            overlay_dark=get_overlay((SCREEN_WIDTH,SCREEN_HEIGHT),(0,0,0,120))
             screen.blit(overlay_dark,(0,0))
-            pygame.draw.rect(screen,PANEL_FILL_COLOR,dialog_rect,0,10)
-            pygame.draw.rect(screen,PANEL_BORDER_COLOR,dialog_rect,6,10)
-            q_text=font_small.render("Delete this save profile?",True,TEXT_COLOR)
+            draw_panel(screen,dialog_rect,6,10)
+            q_text=render_text(font_small,"Delete this save profile?",True,TEXT_COLOR)
             screen.blit(q_text,q_text.get_rect(center=(dialog_rect.centerx,dialog_rect.top+60)))
             for r,t in [(yes_button_rect,"Yes"),(no_button_rect,"No")]:
                 pygame.draw.rect(screen,BUTTON_HOVER_COLOR if r.collidepoint(mouse_pos) else PANEL_BORDER_COLOR,r,0,8)
-                screen.blit(font.render(t,True,WHITE),font.render(t,True,WHITE).get_rect(center=r.center))
+                screen.blit(render_text(font,t,True,WHITE),render_text(font,t,True,WHITE).get_rect(center=r.center))
     elif scene == "char_select":
         screen.blit(bg_img,(0,0))
-        overlay=pygame.Surface((SCREEN_WIDTH,SCREEN_HEIGHT),pygame.SRCALPHA)
-        overlay.fill((0,0,0,80))
+        overlay=get_overlay((SCREEN_WIDTH,SCREEN_HEIGHT),(0,0,0,80))
         screen.blit(overlay,(0,0))
-        label=font.render("Choose your character",True,WHITE)
+        label=render_text(font,"Choose your character",True,WHITE)
         screen.blit(label,(SCREEN_WIDTH//2-label.get_width()//2,100))
         char=char_objs[selection_idx]
-        large_char=NguoiChamSoc(char.name,char.sheet_path,frame_data,10.0)
+        if large_char is None or large_char.sheet_path != char.sheet_path:
+            large_char=NguoiChamSoc(char.name,char.sheet_path,character_frames,10.0)
         large_char.frame_index=char.frame_index
         large_char.draw(screen,(SCREEN_WIDTH//2,SCREEN_HEIGHT//2))
         pygame.draw.polygon(screen,WHITE,[(100,SCREEN_HEIGHT//2),(140,SCREEN_HEIGHT//2-30),(140,SCREEN_HEIGHT//2+30)])
         pygame.draw.polygon(screen,WHITE,[(SCREEN_WIDTH-100,SCREEN_HEIGHT//2),(SCREEN_WIDTH-140,SCREEN_HEIGHT//2-30),(SCREEN_WIDTH-140,SCREEN_HEIGHT//2+30)])
     elif scene == "hatching_animation":
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 220))
+        overlay = get_overlay((SCREEN_WIDTH, SCREEN_HEIGHT), (0, 0, 0, 220))
         screen.blit(overlay, (0, 0))
         if not hatched_pet_info:
             if hatching_animation_frames:
@@ -2288,19 +3218,18 @@ while True:
                     hatching_frame_index += 1
                     hatching_timer = 0
                 if hatching_frame_index >= len(hatching_animation_frames):
-                    pet_id = choose_pet_from_egg(hatching_info['egg_id'])
+                    pet_id = hatching_info['pet_id']
                     if pet_id:
-                        pet_frames = load_pet_animation_frames(pet_id, "idle", scale=15.0) 
+                        pet_frames = collect_pet_animation_frames(hatching_info['reveal_frames'], pet_id, "idle", scale=15.0)
                         if pet_frames: hatched_pet_info = {'pet_id': pet_id, 'frames': pet_frames, 'frame_index': 0, 'timer': 0}
                         else: scene = "home_menu"
                     else: scene = "home_menu"
                 else:
                     current_frame=hatching_animation_frames[hatching_frame_index]
-                    scaled_frame=pygame.transform.scale(current_frame,(512,512))
-                    frame_rect=scaled_frame.get_rect(center=(SCREEN_WIDTH//2,SCREEN_HEIGHT//2))
-                    screen.blit(scaled_frame,frame_rect)
+                    frame_rect=current_frame.get_rect(center=(SCREEN_WIDTH//2,SCREEN_HEIGHT//2))
+                    screen.blit(current_frame,frame_rect)
             else: scene = "home_menu"
-        else:
+        if hatched_pet_info:
             pet_frames = hatched_pet_info['frames']
             if pet_frames:
                 hatched_pet_info['timer'] += dt
@@ -2311,16 +3240,15 @@ while True:
                 pet_rect = pet_image.get_rect(center=(SCREEN_WIDTH//2,SCREEN_HEIGHT//2))
                 screen.blit(pet_image,pet_rect)
             pet_display_name = pet_data.get(hatched_pet_info['pet_id'],{}).get('name',hatched_pet_info['pet_id'])
-            pet_name_text = font_reveal.render(pet_display_name.upper(),True,WHITE)
+            pet_name_text = render_text(font_reveal,pet_display_name.upper(),True,WHITE)
             name_rect=pet_name_text.get_rect(center=(SCREEN_WIDTH//2,pet_rect.bottom+60))
             screen.blit(pet_name_text,name_rect)
-            continue_text=font_small.render("Click to continue",True,GRAY)
+            continue_text=render_text(font_small,"Click to continue",True,GRAY)
             continue_rect=continue_text.get_rect(center=(SCREEN_WIDTH//2,SCREEN_HEIGHT-80))
             screen.blit(continue_text,continue_rect)
 
     else: 
-        if current_map == "chicken_map": screen.blit(chicken_map_img, (0, 0))
-        else: screen.blit(play_map_img, (0, 0))
+        draw_map_background(screen, current_map)
 
         keys = pygame.key.get_pressed()
         dx, dy = 0, 0
@@ -2341,32 +3269,26 @@ while True:
                     player.last_dir="East"
 
         if current_map == "world":
-            for building in world_buildings:
-                building.draw(screen)
-            for pos in fence_objects:
-                screen.blit(fence_img, pos)
             if quest_giver_npc:
                 quest_giver_npc.draw(screen, (quest_giver_npc.x, quest_giver_npc.y))
             screen.blit(quest_stand_img, quest_stand_rect)
             bob_offset=(1+(time.time()*3)%1)*-5
             pointer_pos=(quest_stand_rect.centerx-quest_pointer_img.get_width()/2,quest_stand_rect.top-30+bob_offset)
-            screen.blit(quest_pointer_img,pointer_pos)
-            screen.blit(pointer_text_surface,(pointer_pos[0]-(pointer_text_surface.get_width()-quest_pointer_img.get_width())/2,pointer_pos[1]-25))
+            mark_dirty(screen.blit(quest_pointer_img,pointer_pos))
+            mark_dirty(screen.blit(pointer_text_surface,(pointer_pos[0]-(pointer_text_surface.get_width()-quest_pointer_img.get_width())/2,pointer_pos[1]-25)))
             if challenge_npc_world:
                 challenge_npc_world.draw(screen, (challenge_npc_world.x, challenge_npc_world.y))
             screen.blit(challenge_stand_img, challenge_stand_rect)
             bob_offset_ch=(1+(time.time()*3.2)%1)*-5
             pointer_pos_ch=(challenge_stand_rect.centerx-quest_pointer_img.get_width()/2,challenge_stand_rect.top-30+bob_offset_ch)
-            screen.blit(quest_pointer_img,pointer_pos_ch)
-            screen.blit(challenge_pointer_text_surface,(pointer_pos_ch[0]-(challenge_pointer_text_surface.get_width()-quest_pointer_img.get_width())/2,pointer_pos_ch[1]-25))
+            mark_dirty(screen.blit(quest_pointer_img,pointer_pos_ch))
+            mark_dirty(screen.blit(challenge_pointer_text_surface,(pointer_pos_ch[0]-(challenge_pointer_text_surface.get_width()-quest_pointer_img.get_width())/2,pointer_pos_ch[1]-25)))
             if player and not active_challenge_pet:
                 is_moving = (dx != 0 or dy != 0)
                 key = f"Walk{player.last_dir}" if is_moving else f"Idle{player.last_dir}"
                 player.draw(screen, (player.x, player.y), key)
         
         elif current_map == "pet_area":
-            screen.blit(pond_img, pond_rect) 
-            
             ### FIXED: Correct and robust Y-sorting logic ###
             # 1. Create a list of all objects to be sorted
             all_drawables = []
@@ -2399,14 +3321,7 @@ while True:
                     screen.blit(obj['img'], obj['rect'])
 
             # Draw fences on top of everything
-            for pos in left_fence_line:
-                if left_fence_open and SCREEN_HEIGHT // 2 - 80 < pos[1] < SCREEN_HEIGHT // 2 + 80:
-                    continue
-                screen.blit(fence_img_vertical_left, pos)
-            for pos in right_fence_line:
-                if right_fence_open and SCREEN_HEIGHT // 2 - 80 < pos[1] < SCREEN_HEIGHT // 2 + 80:
-                    continue
-                screen.blit(fence_img_vertical_right, pos)
+            draw_pet_area_fences(screen)
             
             if DEBUG_MODE:
                 for rect in decoration_collision_rects: pygame.draw.rect(screen, (0, 255, 255), rect, 2)
@@ -2534,15 +3449,13 @@ while True:
                     if can_interact: interaction_is_possible = True
                 
                 if not interaction_is_possible and player and quest_interaction_rect.colliderect(player.get_rect()):
-                    prompt_text=font_small.render("Press 'E' for daily quests",True,WHITE)
-                    prompt_bg=pygame.Surface((prompt_text.get_width()+20,prompt_text.get_height()+10),pygame.SRCALPHA)
-                    prompt_bg.fill((0,0,0,150))
+                    prompt_text=render_text(font_small,"Press 'E' for daily quests",True,WHITE)
+                    prompt_bg=get_overlay((prompt_text.get_width()+20,prompt_text.get_height()+10),(0,0,0,150))
                     screen.blit(prompt_bg,(20,SCREEN_HEIGHT-60))
                     screen.blit(prompt_text,(30,SCREEN_HEIGHT-55))
                 elif not interaction_is_possible and player and challenge_interaction_rect.colliderect(player.get_rect()):
-                    prompt_text=font_small.render("Press 'E' to interact",True,WHITE)
-                    prompt_bg=pygame.Surface((prompt_text.get_width()+20,prompt_text.get_height()+10),pygame.SRCALPHA)
-                    prompt_bg.fill((0,0,0,150))
+                    prompt_text=render_text(font_small,"Press 'E' to interact",True,WHITE)
+                    prompt_bg=get_overlay((prompt_text.get_width()+20,prompt_text.get_height()+10),(0,0,0,150))
                     screen.blit(prompt_bg,(20,SCREEN_HEIGHT-60))
                     screen.blit(prompt_text,(30,SCREEN_HEIGHT-55))
 
@@ -2552,9 +3465,8 @@ while True:
                     if left_fence_interaction_rect.colliderect(player.get_rect()) or right_fence_interaction_rect.colliderect(player.get_rect()): can_interact_with_fence = True
                 
                 if can_interact_with_fence:
-                    prompt_text=font_small.render("Press 'E' to cross fence",True,WHITE)
-                    prompt_bg=pygame.Surface((prompt_text.get_width()+20,prompt_text.get_height()+10),pygame.SRCALPHA)
-                    prompt_bg.fill((0,0,0,150))
+                    prompt_text=render_text(font_small,"Press 'E' to cross fence",True,WHITE)
+                    prompt_bg=get_overlay((prompt_text.get_width()+20,prompt_text.get_height()+10),(0,0,0,150))
                     screen.blit(prompt_bg,(20,SCREEN_HEIGHT-60))
                     screen.blit(prompt_text,(30,SCREEN_HEIGHT-55))
                 else:
@@ -2566,17 +3478,15 @@ while True:
                                     can_interact_with_pet = True
                                     break
                     if can_interact_with_pet:
-                        prompt_text=font_small.render("Press 'E' to interact",True,WHITE)
-                        prompt_bg=pygame.Surface((prompt_text.get_width()+20,prompt_text.get_height()+10),pygame.SRCALPHA)
-                        prompt_bg.fill((0,0,0,150))
+                        prompt_text=render_text(font_small,"Press 'E' to interact",True,WHITE)
+                        prompt_bg=get_overlay((prompt_text.get_width()+20,prompt_text.get_height()+10),(0,0,0,150))
                         screen.blit(prompt_bg,(20,SCREEN_HEIGHT-60))
                         screen.blit(prompt_text,(30,SCREEN_HEIGHT-55))
             
             elif current_map == "chicken_map":
                 if active_challenge_pet and challenge_npc_map and challenge_npc_map.get_rect().inflate(40,40).colliderect(active_challenge_pet.get_rect()):
-                    prompt_text=font_small.render("Press 'E' to go home",True,WHITE)
-                    prompt_bg=pygame.Surface((prompt_text.get_width()+20,prompt_text.get_height()+10),pygame.SRCALPHA)
-                    prompt_bg.fill((0,0,0,150))
+                    prompt_text=render_text(font_small,"Press 'E' to go home",True,WHITE)
+                    prompt_bg=get_overlay((prompt_text.get_width()+20,prompt_text.get_height()+10),(0,0,0,150))
                     screen.blit(prompt_bg,(20,SCREEN_HEIGHT-60))
                     screen.blit(prompt_text,(30,SCREEN_HEIGHT-55))
 
@@ -2590,20 +3500,19 @@ while True:
                     panel_rect=pygame.Rect(0,0,panel_w,panel_h)
                     panel_rect.midleft=(interaction_pet.get_rect().right+10,interaction_pet.get_rect().centery)
                     panel_rect.clamp_ip(screen.get_rect())
-                    pygame.draw.rect(screen,PANEL_FILL_COLOR,panel_rect,0,15)
-                    pygame.draw.rect(screen,PANEL_BORDER_COLOR,panel_rect,4,15)
+                    draw_panel(screen,panel_rect,4,15)
                     pet_name=interaction_pet.instance_data.get('name','Pet')
-                    name_text=font_small.render(pet_name,True,TEXT_COLOR)
+                    name_text=render_text(font_small,pet_name,True,TEXT_COLOR)
                     name_rect=name_text.get_rect(centerx=panel_rect.centerx,top=panel_rect.top+15)
                     screen.blit(name_text,name_rect)
                     button_y_start=name_rect.bottom+15
                     feed_btn_rect=pygame.Rect(panel_rect.x+20,button_y_start,panel_w-40,50)
                     play_btn_rect=pygame.Rect(panel_rect.x+20,feed_btn_rect.bottom+10,panel_w-40,50)
                     pygame.draw.rect(screen,BUTTON_HOVER_COLOR if feed_btn_rect.collidepoint(mouse_pos) else PANEL_BORDER_COLOR,feed_btn_rect,0,8)
-                    feed_text=font_info.render("Feed",True,WHITE)
+                    feed_text=render_text(font_info,"Feed",True,WHITE)
                     screen.blit(feed_text,feed_text.get_rect(center=feed_btn_rect.center))
                     pygame.draw.rect(screen,BUTTON_HOVER_COLOR if play_btn_rect.collidepoint(mouse_pos) else PANEL_BORDER_COLOR,play_btn_rect,0,8)
-                    play_text=font_info.render("Play",True,WHITE)
+                    play_text=render_text(font_info,"Play",True,WHITE)
                     screen.blit(play_text,play_text.get_rect(center=play_btn_rect.center))
                     clickable_interaction_rects['feed_btn']=feed_btn_rect
                     clickable_interaction_rects['play_btn']=play_btn_rect
@@ -2611,20 +3520,19 @@ while True:
                     items_to_show=[]
                     title=""
                     if interaction_submenu=='feed':
-                        items_to_show=[(k,v) for k,v in player_inventory.items.items() if item_data.get(k,{}).get('category')=='food']
+                        items_to_show=player_inventory.get_items_by_category('food')
                         title="CHOOSE FOOD"
                     elif interaction_submenu=='play':
-                        items_to_show=[(k,v) for k,v in player_inventory.items.items() if item_data.get(k,{}).get('category')=='toy']
+                        items_to_show=player_inventory.get_items_by_category('toy')
                         title="CHOOSE TOY"
                     panel_w,panel_h=600,400
                     panel_rect=pygame.Rect(0,0,panel_w,panel_h)
                     panel_rect.center=(SCREEN_WIDTH//2,SCREEN_HEIGHT//2)
-                    pygame.draw.rect(screen,PANEL_FILL_COLOR,panel_rect,0,15)
-                    pygame.draw.rect(screen,PANEL_BORDER_COLOR,panel_rect,6,15)
-                    title_text=font.render(title,True,TEXT_COLOR)
+                    draw_panel(screen,panel_rect,6,15)
+                    title_text=render_text(font,title,True,TEXT_COLOR)
                     screen.blit(title_text,title_text.get_rect(centerx=panel_rect.centerx,top=panel_rect.top+20))
                     if not items_to_show:
-                        none_text=font_small.render("You have none!",True,TEXT_COLOR)
+                        none_text=render_text(font_small,"You have none!",True,TEXT_COLOR)
                         screen.blit(none_text,none_text.get_rect(center=panel_rect.center))
                     else:
                         ITEM_COLS,ITEM_BOX_SIZE,ITEM_PADDING = 4,100,15
@@ -2637,21 +3545,20 @@ while True:
                             if item_img:=item_images.get(item_id):
                                 scaled_img=pygame.transform.scale(item_img,(ITEM_BOX_SIZE-20,ITEM_BOX_SIZE-20))
                                 screen.blit(scaled_img,scaled_img.get_rect(center=item_box_rect.center))
-                            qty_text=font_info.render(f"x{qty}",True,TEXT_COLOR)
+                            qty_text=render_text(font_info,f"x{qty}",True,TEXT_COLOR)
                             screen.blit(qty_text,qty_text.get_rect(right=item_box_rect.right-5,bottom=item_box_rect.bottom-5))
                             pygame.draw.rect(screen,BUTTON_HOVER_COLOR if item_box_rect.collidepoint(mouse_pos) else PANEL_BORDER_COLOR,item_box_rect,4,8)
                             clickable_interaction_rects[item_id]=item_box_rect
                     cancel_btn_rect=pygame.Rect(0,0,150,50)
                     cancel_btn_rect.midbottom=(panel_rect.centerx,panel_rect.bottom-20)
                     pygame.draw.rect(screen,BUTTON_HOVER_COLOR if cancel_btn_rect.collidepoint(mouse_pos) else PANEL_BORDER_COLOR,cancel_btn_rect,0,8)
-                    cancel_text=font.render("Cancel",True,WHITE)
+                    cancel_text=render_text(font,"Cancel",True,WHITE)
                     screen.blit(cancel_text,cancel_text.get_rect(center=cancel_btn_rect.center))
                     clickable_interaction_rects['cancel_interaction']=cancel_btn_rect
         elif scene == "shop_menu":
             shop_manager.update()
             shopkeeper.update(dt)
-            overlay=pygame.Surface((SCREEN_WIDTH,SCREEN_HEIGHT),pygame.SRCALPHA)
-            overlay.fill((0,0,0,180))
+            overlay=get_overlay((SCREEN_WIDTH,SCREEN_HEIGHT),(0,0,0,180))
             screen.blit(overlay,(0,0))
             shop_items_all=list(shop_manager.current_stock.items())
             COLS,ROWS=4,2
@@ -2662,16 +3569,15 @@ while True:
             TABLE_Y=max(150,(SCREEN_HEIGHT-TABLE_H)//2+50)
             container_rect=pygame.Rect(TABLE_X-PADDING,TABLE_Y-PADDING-80,TABLE_W+2*PADDING,TABLE_H+2*PADDING+80)
             shopkeeper.draw(screen,(container_rect.left-100,container_rect.centery+20),"IdleSouth")
-            pygame.draw.rect(screen,PANEL_FILL_COLOR,container_rect,0,15)
-            pygame.draw.rect(screen,PANEL_BORDER_COLOR,container_rect,6,15)
-            quote_text=font.render("WHAT DO YOU WANT TO BUY?",True,WHITE)
+            draw_panel(screen,container_rect,6,15)
+            quote_text=render_text(font,"WHAT DO YOU WANT TO BUY?",True,WHITE)
             quote_rect=quote_text.get_rect(center=(container_rect.centerx,container_rect.top+55))
             screen.blit(quote_text,quote_rect)
             time_left=int(shop_manager.restock_interval-(time.time()-shop_manager.last_restock_time))
             minutes,seconds=divmod(time_left,60)
-            restock_text=font_info.render(f"RESTOCK IN: {minutes:02d}:{seconds:02d}",True,WHITE)
+            restock_text=render_glyph_text(font_info,f"RESTOCK IN: {minutes:02d}:{seconds:02d}",True,WHITE,"restock")
             restock_rect=restock_text.get_rect(midbottom=(quote_rect.centerx+120,quote_rect.top+5))
-            screen.blit(restock_text,restock_rect)
+            mark_dirty(screen.blit(restock_text,restock_rect))
             hovered_item_id=None
             for i,(item_id,stock_info) in enumerate(shop_items_all):
                 r,c=divmod(i,COLS)
@@ -2683,14 +3589,14 @@ while True:
                 pygame.draw.rect(screen,(230,200,130),box_rect,0,10)
                 if img_to_draw:=item_images.get(item_id):
                     screen.blit(img_to_draw,img_to_draw.get_rect(center=(box_rect.centerx,box_rect.centery-10)))
-                price_text=font_info.render(str(stock_info["price"]),True,TEXT_COLOR)
+                price_text=render_text(font_info,str(stock_info["price"]),True,TEXT_COLOR)
                 price_icon=pygame.transform.scale(coin_img,(24,24))
                 total_w=price_text.get_width()+price_icon.get_width()+5
                 start_x_price=box_rect.centerx-total_w/2
                 screen.blit(price_icon,(start_x_price,box_rect.bottom-35))
                 screen.blit(price_text,(start_x_price+price_icon.get_width()+5,box_rect.bottom-35))
                 if stock_info["quantity"]>0:
-                    qty_text=font_info.render(f"x{stock_info['quantity']}",True,TEXT_COLOR)
+                    qty_text=render_text(font_info,f"x{stock_info['quantity']}",True,TEXT_COLOR)
                     screen.blit(qty_text,qty_text.get_rect(topright=(box_rect.right-10,box_rect.top+5)))
                 else:
                     scaled_sold_out=pygame.transform.scale(sold_out_img,(BOX_SIZE-20,BOX_SIZE-20))
@@ -2699,10 +3605,9 @@ while True:
             
             if hovered_item_id and (data := item_data.get(hovered_item_id)):
                 info_panel_rect = pygame.Rect(container_rect.right + 20, container_rect.top, 400, 500)
-                pygame.draw.rect(screen, PANEL_FILL_COLOR, info_panel_rect, 0, 15)
-                pygame.draw.rect(screen, PANEL_BORDER_COLOR, info_panel_rect, 4, 15)
+                draw_panel(screen, info_panel_rect, 4, 15)
                 
-                name_text = font_small.render(data['name'], True, TEXT_COLOR)
+                name_text = render_text(font_small, data['name'], True, TEXT_COLOR)
                 name_rect = name_text.get_rect(centerx=info_panel_rect.centerx, top=info_panel_rect.top + 20)
                 screen.blit(name_text, name_rect)
 
@@ -2719,7 +3624,7 @@ while True:
 
                 if data.get("category") == "egg" and "possible_pets" in data.get("data", {}):
                     possible_pets = data["data"]["possible_pets"]
-                    pets_header = font_info.render("Possible Pets:", True, TEXT_COLOR)
+                    pets_header = render_text(font_info, "Possible Pets:", True, TEXT_COLOR)
                     screen.blit(pets_header, (info_panel_rect.left + 20, current_y_pos))
                     current_y_pos += pets_header.get_height() + 5
 
@@ -2730,7 +3635,7 @@ while True:
                         pet_name = pet_def.get('name', 'Unknown')
                         rarity = pet_def.get('rarity', 'Common')
                         pet_color = HEALTH_COLOR if hovered_item_id == "egg_legendary" else RARITY_COLORS.get(rarity, WHITE)
-                        pet_chance_text = font_info.render(f" - {pet_name} ({int(chance * 100)}%)", True, pet_color)
+                        pet_chance_text = render_text(font_info, f" - {pet_name} ({int(chance * 100)}%)", True, pet_color)
                         screen.blit(pet_chance_text, (info_panel_rect.left + 25, current_y_pos))
                         current_y_pos += pet_chance_text.get_height() + 2
                 
@@ -2741,32 +3646,31 @@ while True:
                 is_success="successful" in shop_message.lower()
                 message_font=font if is_success else font_small
                 message_color=(0,100,0) if is_success else (220,20,20)
-                msg_surf=message_font.render(shop_message,True,message_color)
+                msg_surf=render_text(message_font,shop_message,True,message_color)
                 msg_rect=msg_surf.get_rect(center=(container_rect.centerx,container_rect.bottom+50))
                 bg_rect=msg_rect.inflate(20,10)
                 bg_surf=pygame.Surface(bg_rect.size,pygame.SRCALPHA)
                 bg_surf.fill((0,0,0,160))
                 border_color=(0,50,0,180) if is_success else (50,0,0,180)
                 pygame.draw.rect(bg_surf,border_color,bg_surf.get_rect(),3,4)
-                screen.blit(bg_surf,bg_rect)
+                mark_dirty(screen.blit(bg_surf,bg_rect))
                 screen.blit(msg_surf,msg_rect)
             else: shop_message=""
-            exit_text=font_small.render("Press 'E' or 'Esc' to exit.",True,GRAY)
+            exit_text=render_text(font_small,"Press 'E' or 'Esc' to exit.",True,GRAY)
             screen.blit(exit_text,(SCREEN_WIDTH//2-exit_text.get_width()//2,SCREEN_HEIGHT-100))
         elif scene == "home_menu" or scene == "incubator_egg_select":
             if incubator_manager: incubator_manager.draw(screen,mouse_pos)
-            exit_text=font_small.render("Press 'E' to return.",True,GRAY)
+            exit_text=render_text(font_small,"Press 'E' to return.",True,GRAY)
             screen.blit(exit_text,(SCREEN_WIDTH//2-exit_text.get_width()//2,SCREEN_HEIGHT-100))
             if scene == "incubator_egg_select":
                 select_panel_rect=pygame.Rect(0,0,800,500)
                 select_panel_rect.center=(SCREEN_WIDTH//2,SCREEN_HEIGHT//2)
-                pygame.draw.rect(screen,PANEL_FILL_COLOR,select_panel_rect,0,15)
-                pygame.draw.rect(screen,PANEL_BORDER_COLOR,select_panel_rect,6,15)
-                title_text=font.render("SELECT AN EGG",True,TEXT_COLOR)
+                draw_panel(screen,select_panel_rect,6,15)
+                title_text=render_text(font,"SELECT AN EGG",True,TEXT_COLOR)
                 screen.blit(title_text,title_text.get_rect(centerx=select_panel_rect.centerx,top=select_panel_rect.top+20))
                 player_eggs=player_inventory.get_eggs()
                 if not player_eggs:
-                    no_eggs_text=font_small.render("You have no eggs!",True,TEXT_COLOR)
+                    no_eggs_text=render_text(font_small,"You have no eggs!",True,TEXT_COLOR)
                     screen.blit(no_eggs_text,no_eggs_text.get_rect(center=select_panel_rect.center))
                 else:
                     EGG_COLS,EGG_BOX_SIZE,EGG_PADDING=4,120,20
@@ -2778,20 +3682,17 @@ while True:
                         pygame.draw.rect(screen,(230,200,130),egg_box_rect,0,8)
                         if egg_img:=item_images.get(egg_id):
                             screen.blit(pygame.transform.scale(egg_img,(EGG_BOX_SIZE-20,EGG_BOX_SIZE-20)),egg_img.get_rect(center=egg_box_rect.center))
-                        qty_text=font_info.render(f"x{qty}",True,TEXT_COLOR)
+                        qty_text=render_text(font_info,f"x{qty}",True,TEXT_COLOR)
                         screen.blit(qty_text,(egg_box_rect.right-qty_text.get_width()-5,egg_box_rect.bottom-qty_text.get_height()-5))
                         pygame.draw.rect(screen,BUTTON_HOVER_COLOR if egg_box_rect.collidepoint(mouse_pos) else PANEL_BORDER_COLOR,egg_box_rect,4,8)
         elif scene == "inventory_menu":
-            overlay=pygame.Surface((SCREEN_WIDTH,SCREEN_HEIGHT),pygame.SRCALPHA)
-            overlay.fill((0,0,0,180))
+            overlay=get_overlay((SCREEN_WIDTH,SCREEN_HEIGHT),(0,0,0,180))
             screen.blit(overlay,(0,0))
             main_panel_rect=pygame.Rect(100,100,SCREEN_WIDTH*0.55,SCREEN_HEIGHT-200)
-            pygame.draw.rect(screen,PANEL_FILL_COLOR,main_panel_rect,0,15)
-            pygame.draw.rect(screen,PANEL_BORDER_COLOR,main_panel_rect,6,15)
+            draw_panel(screen,main_panel_rect,6,15)
             info_panel_rect=pygame.Rect(main_panel_rect.right+20,100,SCREEN_WIDTH-main_panel_rect.right-120,SCREEN_HEIGHT-200)
-            pygame.draw.rect(screen,PANEL_FILL_COLOR,info_panel_rect,0,15)
-            pygame.draw.rect(screen,PANEL_BORDER_COLOR,info_panel_rect,6,15)
-            title_text=font.render("INVENTORY",True,TEXT_COLOR)
+            draw_panel(screen,info_panel_rect,6,15)
+            title_text=render_text(font,"INVENTORY",True,TEXT_COLOR)
             screen.blit(title_text,title_text.get_rect(centerx=main_panel_rect.centerx,top=main_panel_rect.top+30))
             INV_COLS,INV_ROWS,INV_BOX_SIZE,INV_PADDING=10,5,70,10
             INV_GRID_W=INV_COLS*(INV_BOX_SIZE+INV_PADDING)-INV_PADDING
@@ -2811,14 +3712,13 @@ while True:
                     if item_img:=item_images.get(item_id):
                         screen.blit(pygame.transform.scale(item_img,(INV_BOX_SIZE-10,INV_BOX_SIZE-10)),pygame.transform.scale(item_img,(INV_BOX_SIZE-10,INV_BOX_SIZE-10)).get_rect(center=box_rect.center))
                     if qty>1:
-                        qty_text=font_info.render(str(qty),True,WHITE)
-                        qty_bg=pygame.Surface((qty_text.get_width()+4,qty_text.get_height()),pygame.SRCALPHA)
-                        qty_bg.fill((0,0,0,150))
+                        qty_text=render_text(font_info,str(qty),True,WHITE)
+                        qty_bg=get_overlay((qty_text.get_width()+4,qty_text.get_height()),(0,0,0,150))
                         screen.blit(qty_bg,(box_rect.right-qty_bg.get_width()-2,box_rect.bottom-qty_bg.get_height()-2))
                         screen.blit(qty_text,(box_rect.right-qty_text.get_width()-4,box_rect.bottom-qty_text.get_height()-4))
                 pygame.draw.rect(screen,BUTTON_HOVER_COLOR if is_selected else PANEL_BORDER_COLOR,box_rect,3 if is_selected else 2,8)
             if inventory_selected_item_id and (data := item_data.get(inventory_selected_item_id)):
-                name_text = font_small.render(data['name'], True, TEXT_COLOR)
+                name_text = render_text(font_small, data['name'], True, TEXT_COLOR)
                 name_rect = name_text.get_rect(centerx=info_panel_rect.centerx, top=info_panel_rect.top + 30)
                 screen.blit(name_text, name_rect)
 
@@ -2835,7 +3735,7 @@ while True:
 
                 if data.get("category") == "egg" and "possible_pets" in data.get("data", {}):
                     possible_pets = data["data"]["possible_pets"]
-                    pets_header = font_info.render("Possible Pets:", True, TEXT_COLOR)
+                    pets_header = render_text(font_info, "Possible Pets:", True, TEXT_COLOR)
                     screen.blit(pets_header, (info_panel_rect.left + 20, current_y_pos))
                     current_y_pos += pets_header.get_height() + 5
 
@@ -2846,28 +3746,25 @@ while True:
                         pet_name = pet_def.get('name', 'Unknown')
                         rarity = pet_def.get('rarity', 'Common')
                         pet_color = HEALTH_COLOR if inventory_selected_item_id == "egg_legendary" else RARITY_COLORS.get(rarity, WHITE)
-                        pet_chance_text = font_info.render(f" - {pet_name} ({int(chance * 100)}%)", True, pet_color)
+                        pet_chance_text = render_text(font_info, f" - {pet_name} ({int(chance * 100)}%)", True, pet_color)
                         screen.blit(pet_chance_text, (info_panel_rect.left + 25, current_y_pos))
                         current_y_pos += pet_chance_text.get_height() + 2
 
                 if 'effects' in data.get('data', {}):
                     draw_item_effects(screen, data['data']['effects'], (info_panel_rect.left + 20, current_y_pos))
-            exit_text=font_small.render("Press 'E' or 'Esc' to exit.",True,GRAY)
+            exit_text=render_text(font_small,"Press 'E' or 'Esc' to exit.",True,GRAY)
             screen.blit(exit_text,(SCREEN_WIDTH//2-exit_text.get_width()//2,SCREEN_HEIGHT-60))
         elif scene == "pet_management_menu":
-            overlay=pygame.Surface((SCREEN_WIDTH,SCREEN_HEIGHT),pygame.SRCALPHA)
-            overlay.fill((0,0,0,180))
+            overlay=get_overlay((SCREEN_WIDTH,SCREEN_HEIGHT),(0,0,0,180))
             screen.blit(overlay,(0,0))
             list_panel_rect=pygame.Rect(100,100,500,SCREEN_HEIGHT-200)
-            pygame.draw.rect(screen,PANEL_FILL_COLOR,list_panel_rect,0,15)
-            pygame.draw.rect(screen,PANEL_BORDER_COLOR,list_panel_rect,6,15)
+            draw_panel(screen,list_panel_rect,6,15)
             info_panel_rect=pygame.Rect(list_panel_rect.right+20,100,SCREEN_WIDTH-list_panel_rect.right-120,SCREEN_HEIGHT-200)
-            pygame.draw.rect(screen,PANEL_FILL_COLOR,info_panel_rect,0,15)
-            pygame.draw.rect(screen,PANEL_BORDER_COLOR,info_panel_rect,6,15)
+            draw_panel(screen,info_panel_rect,6,15)
             unlocked_slots=profiles[selected_profile_idx]['unlocked_pet_slots']
-            title_text=font.render("My Pets",True,TEXT_COLOR)
+            title_text=render_text(font,"My Pets",True,TEXT_COLOR)
             screen.blit(title_text,title_text.get_rect(centerx=list_panel_rect.centerx,top=list_panel_rect.top+20))
-            slot_count_text=font_small.render(f"Active: {len(active_pets)} / {unlocked_slots}",True,TEXT_COLOR)
+            slot_count_text=render_text(font_small,f"Active: {len(active_pets)} / {unlocked_slots}",True,TEXT_COLOR)
             screen.blit(slot_count_text,slot_count_text.get_rect(centerx=list_panel_rect.centerx,top=list_panel_rect.top+65))
             pets_in_inv=player_inventory.get_all_pets()
             ROW_H,PADDING_Y=80,10
@@ -2896,11 +3793,11 @@ while True:
                     pygame.draw.rect(list_surface_container,row_color,pet_row_rect,0,8)
                     if pet_icon:=pet_icons.get(pet['pet_id']):
                         list_surface_container.blit(pet_icon,pet_icon.get_rect(centery=pet_row_rect.centery,left=pet_row_rect.left+10))
-                    pet_name_text=font_small.render(pet['name'],True,TEXT_COLOR)
+                    pet_name_text=render_text(font_small,pet['name'],True,TEXT_COLOR)
                     list_surface_container.blit(pet_name_text,pet_name_text.get_rect(centery=pet_row_rect.centery,left=pet_row_rect.left+90))
                     ### NEW: Display pet level in the list view
                     pet_level = pet.get('level', 0)
-                    level_text = font_info.render(f"Lvl: {pet_level}", True, TEXT_COLOR)
+                    level_text = render_text(font_info, f"Lvl: {pet_level}", True, TEXT_COLOR)
                     list_surface_container.blit(level_text, level_text.get_rect(centery=pet_row_rect.centery, right=pet_row_rect.right - 15))
                     pygame.draw.rect(list_surface_container,BUTTON_HOVER_COLOR if is_selected else PANEL_BORDER_COLOR,pet_row_rect,3 if is_selected else 2,8)
             if max_scroll>0:
@@ -2918,7 +3815,7 @@ while True:
                     unlock_button_rect=pygame.Rect(list_panel_rect.left+20,list_panel_rect.bottom-70,list_panel_rect.width-40,50)
                     pygame.draw.rect(screen,BUTTON_HOVER_COLOR if unlock_button_rect.collidepoint(mouse_pos) else PANEL_BORDER_COLOR,unlock_button_rect,0,8)
                     price=PET_SLOT_UNLOCK_PRICES[price_index]
-                    btn_text=font_info.render(f"Unlock Slot: {price}",True,WHITE)
+                    btn_text=render_text(font_info,f"Unlock Slot: {price}",True,WHITE)
                     btn_text_rect=btn_text.get_rect(center=unlock_button_rect.center)
                     coin_icon_small=pygame.transform.scale(coin_img,(24,24))
                     total_width=btn_text.get_width()+coin_icon_small.get_width()+10
@@ -2931,13 +3828,13 @@ while True:
                 pet_def=pet_data[selected_pet_instance['pet_id']]
                 pet_name=selected_pet_instance.get('name',pet_def['name'])
                 display_name=f"{pet_name} ({pet_def['name']})"
-                name_text=font_small.render(display_name,True,TEXT_COLOR)
+                name_text=render_text(font_small,display_name,True,TEXT_COLOR)
                 name_rect=name_text.get_rect(centerx=info_panel_rect.centerx,top=info_panel_rect.top+30)
                 screen.blit(name_text,name_rect)
                 
                 rarity = pet_def.get('rarity', 'Unknown')
                 rarity_color = RARITY_COLORS.get(rarity, WHITE)
-                rarity_text = font_info.render(f"Rarity: {rarity}", True, rarity_color)
+                rarity_text = render_text(font_info, f"Rarity: {rarity}", True, rarity_color)
                 rarity_rect = rarity_text.get_rect(centerx=info_panel_rect.centerx, top=name_rect.bottom + 5)
                 screen.blit(rarity_text, rarity_rect)
                 icon_y_start = rarity_rect.bottom + 20
@@ -2962,34 +3859,33 @@ while True:
                     else:
                         btn_text,btn_color="Bring Out",PANEL_BORDER_COLOR
                     pygame.draw.rect(screen,BUTTON_HOVER_COLOR if btn_rect.collidepoint(mouse_pos) and not(not already_out and slots_full) else btn_color,btn_rect,0,8)
-                    text_surf=font.render(btn_text,True,WHITE)
+                    text_surf=render_text(font,btn_text,True,WHITE)
                     screen.blit(text_surf,text_surf.get_rect(center=btn_rect.center))
             else:
-                prompt_text=font_small.render("Select a pet from the list.",True,GRAY)
+                prompt_text=render_text(font_small,"Select a pet from the list.",True,GRAY)
                 screen.blit(prompt_text,prompt_text.get_rect(center=info_panel_rect.center))
             if pet_menu_message and time.time()-pet_menu_message_timer<2:
-                msg_surf=font_small.render(pet_menu_message,True,WHITE)
+                msg_surf=render_text(font_small,pet_menu_message,True,WHITE)
                 msg_rect=msg_surf.get_rect(midbottom=(list_panel_rect.centerx,list_panel_rect.bottom-80))
-                screen.blit(msg_surf,msg_rect)
+                mark_dirty(screen.blit(msg_surf,msg_rect))
             else: pet_menu_message=""
-            exit_text=font_small.render("Press 'R' or 'Esc' to exit.",True,GRAY)
+            exit_text=render_text(font_small,"Press 'R' or 'Esc' to exit.",True,GRAY)
             screen.blit(exit_text,(SCREEN_WIDTH//2-exit_text.get_width()//2,SCREEN_HEIGHT-60))
         elif scene == "storage_menu":
-            overlay=pygame.Surface((SCREEN_WIDTH,SCREEN_HEIGHT),pygame.SRCALPHA)
-            overlay.fill((0,0,0,180))
+            overlay=get_overlay((SCREEN_WIDTH,SCREEN_HEIGHT),(0,0,0,180))
             screen.blit(overlay,(0,0))
             PANEL_MARGIN,TOP_MARGIN,BOTTOM_MARGIN=150,120,100
             PANEL_Y,PANEL_HEIGHT=TOP_MARGIN,SCREEN_HEIGHT-TOP_MARGIN-BOTTOM_MARGIN
             PLAYER_PANEL_W=(SCREEN_WIDTH/2)-PANEL_MARGIN
             PLAYER_PANEL_RECT=pygame.Rect(50,PANEL_Y,PLAYER_PANEL_W,PANEL_HEIGHT)
             GLOBAL_PANEL_RECT=pygame.Rect(SCREEN_WIDTH-50-PLAYER_PANEL_W,PANEL_Y,PLAYER_PANEL_W,PANEL_HEIGHT)
-            pygame.draw.rect(screen,PANEL_FILL_COLOR,PLAYER_PANEL_RECT,0,15)
-            pygame.draw.rect(screen,PANEL_BORDER_COLOR,PLAYER_PANEL_RECT,6,15)
-            pygame.draw.rect(screen,PANEL_FILL_COLOR,GLOBAL_PANEL_RECT,0,15)
-            pygame.draw.rect(screen,PANEL_BORDER_COLOR,GLOBAL_PANEL_RECT,6,15)
-            player_title=font.render("Your Profile",True,TEXT_COLOR)
+            # Pick up transfers other instances made while this menu is open.
+            if shared_storage.refresh(): storage_selected_global_idx=None
+            draw_panel(screen,PLAYER_PANEL_RECT,6,15)
+            draw_panel(screen,GLOBAL_PANEL_RECT,6,15)
+            player_title=render_text(font,"Your Profile",True,TEXT_COLOR)
             screen.blit(player_title,player_title.get_rect(centerx=PLAYER_PANEL_RECT.centerx,top=PLAYER_PANEL_RECT.top+20))
-            global_title=font.render("Shared Storage",True,TEXT_COLOR)
+            global_title=render_text(font,"Shared Storage",True,TEXT_COLOR)
             screen.blit(global_title,global_title.get_rect(centerx=GLOBAL_PANEL_RECT.centerx,top=GLOBAL_PANEL_RECT.top+20))
             items_tab_rect=pygame.Rect(SCREEN_WIDTH/2-220,50,200,50)
             pets_tab_rect=pygame.Rect(SCREEN_WIDTH/2+20,50,200,50)
@@ -2997,9 +3893,9 @@ while True:
             pygame.draw.rect(screen,PANEL_BORDER_COLOR,items_tab_rect,4,8)
             pygame.draw.rect(screen,PANEL_BORDER_COLOR if storage_scene_tab=='pets' else LOCKED_SLOT_COLOR,pets_tab_rect,0,8)
             pygame.draw.rect(screen,PANEL_BORDER_COLOR,pets_tab_rect,4,8)
-            items_text=font.render("Items",True,WHITE)
+            items_text=render_text(font,"Items",True,WHITE)
             screen.blit(items_text,items_text.get_rect(center=items_tab_rect.center))
-            pets_text=font.render("Pets",True,WHITE)
+            pets_text=render_text(font,"Pets",True,WHITE)
             screen.blit(pets_text,pets_text.get_rect(center=pets_tab_rect.center))
             def draw_list(panel_rect,is_player_list,scroll_y_ref,selected_idx_ref):
                 content_rect=panel_rect.inflate(-40,-120)
@@ -3007,12 +3903,10 @@ while True:
                 list_surface=screen.subsurface(content_rect)
                 list_surface.fill(PANEL_FILL_COLOR)
                 data_list=[]
-                source=player_inventory.items if is_player_list else global_storage_data['items']
                 if storage_scene_tab=='items':
-                    data_list=sorted(source.items())
+                    data_list=player_inventory.get_all_items() if is_player_list else sorted(shared_storage.items.items())
                 else:
-                    source=player_inventory.pets if is_player_list else global_storage_data['pets']
-                    data_list=sorted(source,key=lambda p:p['instance_id'])
+                    data_list=player_inventory.get_all_pets() if is_player_list else sorted(shared_storage.pets,key=lambda p:p['instance_id'])
                 total_h=0
                 if storage_scene_tab=='items':
                     total_h=(len(data_list)//4+1)*110 if data_list else 0
@@ -3033,7 +3927,7 @@ while True:
                             scaled_img = pygame.transform.scale(img, (80, 80))
                             img_rect = scaled_img.get_rect(center=box_rect.center)
                             list_surface.blit(scaled_img, img_rect)
-                        qty_text=font_info.render(f"x{qty}",True,TEXT_COLOR)
+                        qty_text=render_text(font_info,f"x{qty}",True,TEXT_COLOR)
                         list_surface.blit(qty_text,qty_text.get_rect(bottomright=box_rect.bottomright))
                         pygame.draw.rect(list_surface,BUTTON_HOVER_COLOR if is_selected else PANEL_BORDER_COLOR,box_rect,4 if is_selected else 2,8)
                         abs_box_rect=box_rect.move(content_rect.topleft)
@@ -3047,7 +3941,7 @@ while True:
                         color=(200,190,120) if is_active else LOCKED_SLOT_COLOR
                         pygame.draw.rect(list_surface,color,row_rect,0,8)
                         if icon:=pet_icons.get(pet['pet_id']): list_surface.blit(icon,icon.get_rect(centery=row_rect.centery,left=row_rect.left+10))
-                        name_text=font_small.render(pet['name'],True,TEXT_COLOR)
+                        name_text=render_text(font_small,pet['name'],True,TEXT_COLOR)
                         list_surface.blit(name_text,name_text.get_rect(centery=row_rect.centery,left=row_rect.left+90))
                         pygame.draw.rect(list_surface,BUTTON_HOVER_COLOR if is_selected else PANEL_BORDER_COLOR,row_rect,4 if is_selected else 2,8)
                         abs_row_rect=row_rect.move(content_rect.topleft)
@@ -3078,23 +3972,21 @@ while True:
             retrieve_color=PANEL_BORDER_COLOR if can_retrieve else DISABLED_COLOR
             pygame.draw.rect(screen,retrieve_color,retrieve_button_rect,0,8)
             pygame.draw.polygon(screen,WHITE,[(retrieve_button_rect.left+20,retrieve_button_rect.centery),(retrieve_button_rect.right-20,retrieve_button_rect.top+20),(retrieve_button_rect.right-20,retrieve_button_rect.bottom-20)])
-            exit_text=font_small.render("Press 'E' or 'Esc' to exit.",True,GRAY)
+            exit_text=render_text(font_small,"Press 'E' or 'Esc' to exit.",True,GRAY)
             screen.blit(exit_text,exit_text.get_rect(midbottom=(SCREEN_WIDTH/2,SCREEN_HEIGHT-30)))
             if storage_transfer_popup_active:
-                popup_overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-                popup_overlay.fill((0, 0, 0, 180))
+                popup_overlay = get_overlay((SCREEN_WIDTH, SCREEN_HEIGHT), (0, 0, 0, 180))
                 screen.blit(popup_overlay, (0, 0))
                 popup_width, popup_height = 500, 300
                 popup_rect = pygame.Rect(0, 0, popup_width, popup_height)
                 popup_rect.center = (SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2)
-                pygame.draw.rect(screen, PANEL_FILL_COLOR, popup_rect, 0, 15)
-                pygame.draw.rect(screen, PANEL_BORDER_COLOR, popup_rect, 6, 15)
+                draw_panel(screen, popup_rect, 6, 15)
                 info = storage_transfer_info
                 item_name = item_data[info['item_id']]['name']
-                title_text = font_small.render(f"Move {item_name}", True, TEXT_COLOR)
+                title_text = render_text(font_small, f"Move {item_name}", True, TEXT_COLOR)
                 screen.blit(title_text, title_text.get_rect(centerx=popup_rect.centerx, top=popup_rect.top + 20))
                 
-                qty_text = font_small.render(f"Quantity: {info['quantity']}", True, TEXT_COLOR)
+                qty_text = render_text(font_small, f"Quantity: {info['quantity']}", True, TEXT_COLOR)
                 screen.blit(qty_text, qty_text.get_rect(centerx=popup_rect.centerx, top=popup_rect.top + 80))
                 
                 slider_rect = pygame.Rect(popup_rect.left + 100, popup_rect.centery + 10, popup_rect.width - 200, 20)
@@ -3104,41 +3996,39 @@ while True:
                 cancel_rect = pygame.Rect(popup_rect.centerx + 30, popup_rect.bottom - 80, 120, 50)
                 
                 pygame.draw.rect(screen, GRAY, minus_rect, 0, 8)
-                screen.blit(font.render("-", True, WHITE), font.render("-", True, WHITE).get_rect(center=minus_rect.center))
+                screen.blit(render_text(font, "-", True, WHITE), render_text(font, "-", True, WHITE).get_rect(center=minus_rect.center))
                 pygame.draw.rect(screen, GRAY, plus_rect, 0, 8)
-                screen.blit(font.render("+", True, WHITE), font.render("+", True, WHITE).get_rect(center=plus_rect.center))
+                screen.blit(render_text(font, "+", True, WHITE), render_text(font, "+", True, WHITE).get_rect(center=plus_rect.center))
                 pygame.draw.rect(screen, GRAY, slider_rect, 0, 10)
                 handle_x = slider_rect.left + (slider_rect.width - 20) * ((info['quantity'] - 1) / max(1, info['max_quantity'] - 1)) if info['max_quantity'] > 1 else slider_rect.left
                 handle_rect = pygame.Rect(handle_x, slider_rect.y, 20, 20)
                 pygame.draw.rect(screen, PANEL_BORDER_COLOR, handle_rect, 0, 10)
                 
                 pygame.draw.rect(screen, PANEL_BORDER_COLOR, confirm_rect, 0, 8)
-                screen.blit(font_small.render("OK", True, WHITE), font_small.render("OK", True, WHITE).get_rect(center=confirm_rect.center))
+                screen.blit(render_text(font_small, "OK", True, WHITE), render_text(font_small, "OK", True, WHITE).get_rect(center=confirm_rect.center))
                 pygame.draw.rect(screen, PANEL_BORDER_COLOR, cancel_rect, 0, 8)
-                screen.blit(font_small.render("Cancel", True, WHITE), font_small.render("Cancel", True, WHITE).get_rect(center=cancel_rect.center))
+                screen.blit(render_text(font_small, "Cancel", True, WHITE), render_text(font_small, "Cancel", True, WHITE).get_rect(center=cancel_rect.center))
         elif scene == "quest_dialogue":
             if current_map=="world":
                 for building in world_buildings: building.draw(screen)
                 for pos in fence_objects: screen.blit(fence_img,pos)
                 if player: player.draw(screen,(player.x,player.y),f"Idle{player.last_dir}")
-            overlay=pygame.Surface((SCREEN_WIDTH,SCREEN_HEIGHT),pygame.SRCALPHA)
-            overlay.fill((0,0,0,180))
+            overlay=get_overlay((SCREEN_WIDTH,SCREEN_HEIGHT),(0,0,0,180))
             screen.blit(overlay,(0,0))
             if quest_giver_npc_large:
                 quest_giver_npc_large.update(dt)
                 quest_giver_npc_large.draw(screen,(SCREEN_WIDTH-250,SCREEN_HEIGHT/2))
             dialogue_panel=pygame.Rect(100,SCREEN_HEIGHT/2-150,SCREEN_WIDTH-550,300)
-            pygame.draw.rect(screen,PANEL_FILL_COLOR,dialogue_panel,0,15)
-            pygame.draw.rect(screen,PANEL_BORDER_COLOR,dialogue_panel,6,15)
+            draw_panel(screen,dialogue_panel,6,15)
             quote="Care for a challenge? The rewards are great!"
             draw_text_wrapped(screen,quote,font_small,TEXT_COLOR,pygame.Rect(dialogue_panel.x+40,dialogue_panel.y+50,dialogue_panel.width-80,100),centered=True)
             quest_dialogue_yes_rect=pygame.Rect(dialogue_panel.centerx-220,dialogue_panel.bottom-100,200,60)
             quest_dialogue_no_rect=pygame.Rect(dialogue_panel.centerx+20,dialogue_panel.bottom-100,200,60)
             pygame.draw.rect(screen,BUTTON_HOVER_COLOR if quest_dialogue_yes_rect.collidepoint(mouse_pos) else PANEL_BORDER_COLOR,quest_dialogue_yes_rect,0,8)
             pygame.draw.rect(screen,BUTTON_HOVER_COLOR if quest_dialogue_no_rect.collidepoint(mouse_pos) else PANEL_BORDER_COLOR,quest_dialogue_no_rect,0,8)
-            yes_text=font.render("Yes",True,WHITE)
+            yes_text=render_text(font,"Yes",True,WHITE)
             screen.blit(yes_text,yes_text.get_rect(center=quest_dialogue_yes_rect.center))
-            no_text=font.render("No",True,WHITE)
+            no_text=render_text(font,"No",True,WHITE)
             screen.blit(no_text,no_text.get_rect(center=quest_dialogue_no_rect.center))
         elif scene == "challenge_main_dialogue":
             if current_map=="world":
@@ -3148,24 +4038,22 @@ while True:
                     screen.blit(fence_img,pos)
                 if player:
                     player.draw(screen,(player.x,player.y),f"Idle{player.last_dir}")
-            overlay=pygame.Surface((SCREEN_WIDTH,SCREEN_HEIGHT),pygame.SRCALPHA)
-            overlay.fill((0,0,0,180))
+            overlay=get_overlay((SCREEN_WIDTH,SCREEN_HEIGHT),(0,0,0,180))
             screen.blit(overlay,(0,0))
             if challenge_npc_large:
                 challenge_npc_large.update(dt)
                 challenge_npc_large.draw(screen,(SCREEN_WIDTH-250,SCREEN_HEIGHT/2))
             dialogue_panel=pygame.Rect(100,SCREEN_HEIGHT/2-150,SCREEN_WIDTH-550,300)
-            pygame.draw.rect(screen,PANEL_FILL_COLOR,dialogue_panel,0,15)
-            pygame.draw.rect(screen,PANEL_BORDER_COLOR,dialogue_panel,6,15)
+            draw_panel(screen,dialogue_panel,6,15)
             quote="What can I help you with?"
             draw_text_wrapped(screen,quote,font_small,TEXT_COLOR,pygame.Rect(dialogue_panel.x+40,dialogue_panel.y+50,dialogue_panel.width-80,100),centered=True)
             challenge_main_fight_rect = pygame.Rect(dialogue_panel.centerx - 220, dialogue_panel.bottom - 100, 200, 60)
             challenge_main_sell_rect = pygame.Rect(dialogue_panel.centerx + 20, dialogue_panel.bottom - 100, 200, 60)
             pygame.draw.rect(screen,BUTTON_HOVER_COLOR if challenge_main_fight_rect.collidepoint(mouse_pos) else PANEL_BORDER_COLOR,challenge_main_fight_rect,0,8)
             pygame.draw.rect(screen,BUTTON_HOVER_COLOR if challenge_main_sell_rect.collidepoint(mouse_pos) else PANEL_BORDER_COLOR,challenge_main_sell_rect,0,8)
-            fight_text=font.render("FIGHT",True,WHITE)
+            fight_text=render_text(font,"FIGHT",True,WHITE)
             screen.blit(fight_text,fight_text.get_rect(center=challenge_main_fight_rect.center))
-            sell_text=font.render("SELL",True,WHITE)
+            sell_text=render_text(font,"SELL",True,WHITE)
             screen.blit(sell_text,sell_text.get_rect(center=challenge_main_sell_rect.center))
         elif scene == "challenge_pre_sell_dialogue":
             if current_map=="world":
@@ -3175,24 +4063,22 @@ while True:
                     screen.blit(fence_img,pos)
                 if player:
                     player.draw(screen,(player.x,player.y),f"Idle{player.last_dir}")
-            overlay=pygame.Surface((SCREEN_WIDTH,SCREEN_HEIGHT),pygame.SRCALPHA)
-            overlay.fill((0,0,0,180))
+            overlay=get_overlay((SCREEN_WIDTH,SCREEN_HEIGHT),(0,0,0,180))
             screen.blit(overlay,(0,0))
             if challenge_npc_large:
                 challenge_npc_large.update(dt)
                 challenge_npc_large.draw(screen,(SCREEN_WIDTH-250,SCREEN_HEIGHT/2))
             dialogue_panel=pygame.Rect(100,SCREEN_HEIGHT/2-150,SCREEN_WIDTH-550,300)
-            pygame.draw.rect(screen,PANEL_FILL_COLOR,dialogue_panel,0,15)
-            pygame.draw.rect(screen,PANEL_BORDER_COLOR,dialogue_panel,6,15)
+            draw_panel(screen,dialogue_panel,6,15)
             quote="Do you have any chicken?"
             draw_text_wrapped(screen,quote,font_small,TEXT_COLOR,pygame.Rect(dialogue_panel.x+40,dialogue_panel.y+50,dialogue_panel.width-80,100),centered=True)
             challenge_pre_sell_yes_rect=pygame.Rect(dialogue_panel.centerx-220,dialogue_panel.bottom-100,200,60)
             challenge_pre_sell_no_rect=pygame.Rect(dialogue_panel.centerx+20,dialogue_panel.bottom-100,200,60)
             pygame.draw.rect(screen,BUTTON_HOVER_COLOR if challenge_pre_sell_yes_rect.collidepoint(mouse_pos) else PANEL_BORDER_COLOR,challenge_pre_sell_yes_rect,0,8)
             pygame.draw.rect(screen,BUTTON_HOVER_COLOR if challenge_pre_sell_no_rect.collidepoint(mouse_pos) else PANEL_BORDER_COLOR,challenge_pre_sell_no_rect,0,8)
-            yes_text=font.render("Yes",True,WHITE)
+            yes_text=render_text(font,"Yes",True,WHITE)
             screen.blit(yes_text,yes_text.get_rect(center=challenge_pre_sell_yes_rect.center))
-            no_text=font.render("No",True,WHITE)
+            no_text=render_text(font,"No",True,WHITE)
             screen.blit(no_text,no_text.get_rect(center=challenge_pre_sell_no_rect.center))
         elif scene == "challenge_dialogue":
             if current_map=="world":
@@ -3202,24 +4088,22 @@ while True:
                     screen.blit(fence_img,pos)
                 if player:
                     player.draw(screen,(player.x,player.y),f"Idle{player.last_dir}")
-            overlay=pygame.Surface((SCREEN_WIDTH,SCREEN_HEIGHT),pygame.SRCALPHA)
-            overlay.fill((0,0,0,180))
+            overlay=get_overlay((SCREEN_WIDTH,SCREEN_HEIGHT),(0,0,0,180))
             screen.blit(overlay,(0,0))
             if challenge_npc_large:
                 challenge_npc_large.update(dt)
                 challenge_npc_large.draw(screen,(SCREEN_WIDTH-250,SCREEN_HEIGHT/2))
             dialogue_panel=pygame.Rect(100,SCREEN_HEIGHT/2-150,SCREEN_WIDTH-550,300)
-            pygame.draw.rect(screen,PANEL_FILL_COLOR,dialogue_panel,0,15)
-            pygame.draw.rect(screen,PANEL_BORDER_COLOR,dialogue_panel,6,15)
+            draw_panel(screen,dialogue_panel,6,15)
             quote="These chickens are tough... can you help me?"
             draw_text_wrapped(screen,quote,font_small,TEXT_COLOR,pygame.Rect(dialogue_panel.x+40,dialogue_panel.y+50,dialogue_panel.width-80,100),centered=True)
             challenge_fight_yes_rect=pygame.Rect(dialogue_panel.centerx-220,dialogue_panel.bottom-100,200,60)
             challenge_fight_no_rect=pygame.Rect(dialogue_panel.centerx+20,dialogue_panel.bottom-100,200,60)
             pygame.draw.rect(screen,BUTTON_HOVER_COLOR if challenge_fight_yes_rect.collidepoint(mouse_pos) else PANEL_BORDER_COLOR,challenge_fight_yes_rect,0,8)
             pygame.draw.rect(screen,BUTTON_HOVER_COLOR if challenge_fight_no_rect.collidepoint(mouse_pos) else PANEL_BORDER_COLOR,challenge_fight_no_rect,0,8)
-            yes_text=font.render("Yes",True,WHITE)
+            yes_text=render_text(font,"Yes",True,WHITE)
             screen.blit(yes_text,yes_text.get_rect(center=challenge_fight_yes_rect.center))
-            no_text=font.render("No",True,WHITE)
+            no_text=render_text(font,"No",True,WHITE)
             screen.blit(no_text,no_text.get_rect(center=challenge_fight_no_rect.center))
         elif scene == "challenge_sell_dialogue":
             if current_map=="world":
@@ -3229,8 +4113,7 @@ while True:
                     screen.blit(fence_img,pos)
                 if player:
                     player.draw(screen,(player.x,player.y),f"Idle{player.last_dir}")
-            overlay=pygame.Surface((SCREEN_WIDTH,SCREEN_HEIGHT),pygame.SRCALPHA)
-            overlay.fill((0,0,0,180))
+            overlay=get_overlay((SCREEN_WIDTH,SCREEN_HEIGHT),(0,0,0,180))
             screen.blit(overlay,(0,0))
             if challenge_npc_large:
                 challenge_npc_large.update(dt)
@@ -3238,29 +4121,28 @@ while True:
             
             dialog_rect=pygame.Rect(0,0,700,350)
             dialog_rect.center=(SCREEN_WIDTH/2 - 100, SCREEN_HEIGHT/2)
-            pygame.draw.rect(screen,PANEL_FILL_COLOR,dialog_rect,0,15)
-            pygame.draw.rect(screen,PANEL_BORDER_COLOR,dialog_rect,6,15)
+            draw_panel(screen,dialog_rect,6,15)
             
             quote="I'll buy that chicken meat! How many pieces?"
             draw_text_wrapped(screen,quote,font_small,TEXT_COLOR,pygame.Rect(dialog_rect.x+40,dialog_rect.y+20,dialog_rect.width-80,100),centered=True)
             
-            qty_text = font_small.render(f"Sell: {sell_quantity}", True, TEXT_COLOR)
+            qty_text = render_text(font_small, f"Sell: {sell_quantity}", True, TEXT_COLOR)
             screen.blit(qty_text, qty_text.get_rect(centerx=dialog_rect.centerx, top=dialog_rect.y + 110))
 
             slider_rect = pygame.Rect(dialog_rect.centerx - 150, dialog_rect.centery, 300, 20)
             minus_rect = pygame.Rect(slider_rect.left - 60, slider_rect.centery - 10, 40, 40)
             plus_rect = pygame.Rect(slider_rect.right + 20, slider_rect.centery - 10, 40, 40)
             pygame.draw.rect(screen, GRAY, minus_rect, 0, 8)
-            screen.blit(font.render("-", True, WHITE), font.render("-", True, WHITE).get_rect(center=minus_rect.center))
+            screen.blit(render_text(font, "-", True, WHITE), render_text(font, "-", True, WHITE).get_rect(center=minus_rect.center))
             pygame.draw.rect(screen, GRAY, plus_rect, 0, 8)
-            screen.blit(font.render("+", True, WHITE), font.render("+", True, WHITE).get_rect(center=plus_rect.center))
+            screen.blit(render_text(font, "+", True, WHITE), render_text(font, "+", True, WHITE).get_rect(center=plus_rect.center))
             pygame.draw.rect(screen, GRAY, slider_rect, 0, 10)
             handle_x = slider_rect.left + (slider_rect.width - 20) * ((sell_quantity - 1) / max(1, max_sell_quantity - 1)) if max_sell_quantity > 1 else slider_rect.left
             handle_rect = pygame.Rect(handle_x, slider_rect.y, 20, 20)
             pygame.draw.rect(screen, PANEL_BORDER_COLOR, handle_rect, 0, 10)
 
             revenue = sell_quantity * 20
-            revenue_text = font_small.render(f"For: {revenue}", True, TEXT_COLOR)
+            revenue_text = render_text(font_small, f"For: {revenue}", True, TEXT_COLOR)
             rev_rect = revenue_text.get_rect(centerx=dialog_rect.centerx - 20, top=slider_rect.bottom + 20)
             screen.blit(revenue_text, rev_rect)
             screen.blit(pygame.transform.scale(coin_img, (32, 32)), (rev_rect.right + 10, rev_rect.y))
@@ -3268,23 +4150,21 @@ while True:
             sell_rect = pygame.Rect(dialog_rect.centerx - 150, dialog_rect.bottom - 80, 120, 50)
             cancel_rect = pygame.Rect(dialog_rect.centerx + 30, dialog_rect.bottom - 80, 120, 50)
             pygame.draw.rect(screen, BUTTON_HOVER_COLOR if sell_rect.collidepoint(mouse_pos) else PANEL_BORDER_COLOR, sell_rect, 0, 8)
-            screen.blit(font_small.render("Sell", True, WHITE), font_small.render("Sell", True, WHITE).get_rect(center=sell_rect.center))
+            screen.blit(render_text(font_small, "Sell", True, WHITE), render_text(font_small, "Sell", True, WHITE).get_rect(center=sell_rect.center))
             pygame.draw.rect(screen, BUTTON_HOVER_COLOR if cancel_rect.collidepoint(mouse_pos) else PANEL_BORDER_COLOR, cancel_rect, 0, 8)
-            screen.blit(font_small.render("Cancel", True, WHITE), font_small.render("Cancel", True, WHITE).get_rect(center=cancel_rect.center))
+            screen.blit(render_text(font_small, "Cancel", True, WHITE), render_text(font_small, "Cancel", True, WHITE).get_rect(center=cancel_rect.center))
         elif scene == "quest_menu":
-            overlay=pygame.Surface((SCREEN_WIDTH,SCREEN_HEIGHT),pygame.SRCALPHA)
-            overlay.fill((0,0,0,180))
+            overlay=get_overlay((SCREEN_WIDTH,SCREEN_HEIGHT),(0,0,0,180))
             screen.blit(overlay,(0,0))
             quest_panel_rect=pygame.Rect(0,0,900,650)
             quest_panel_rect.center=(SCREEN_WIDTH/2,SCREEN_HEIGHT/2)
-            pygame.draw.rect(screen,PANEL_FILL_COLOR,quest_panel_rect,0,15)
-            pygame.draw.rect(screen,PANEL_BORDER_COLOR,quest_panel_rect,6,15)
-            title_text=font.render("DAILY QUESTS",True,TEXT_COLOR)
+            draw_panel(screen,quest_panel_rect,6,15)
+            title_text=render_text(font,"DAILY QUESTS",True,TEXT_COLOR)
             screen.blit(title_text,title_text.get_rect(centerx=quest_panel_rect.centerx,top=quest_panel_rect.top+20))
             time_left=quest_manager.get_time_until_next_reset()
             timer_text=TienTe.format_time(time_left)
-            reset_text=font_info.render(f"Resets in: {timer_text}",True,GRAY)
-            screen.blit(reset_text,reset_text.get_rect(centerx=quest_panel_rect.centerx,top=quest_panel_rect.top+60))
+            reset_text=render_glyph_text(font_info,f"Resets in: {timer_text}",True,GRAY,"quest_reset")
+            mark_dirty(screen.blit(reset_text,reset_text.get_rect(centerx=quest_panel_rect.centerx,top=quest_panel_rect.top+60)))
             if quest_manager and quest_manager.quest_data['quests_accepted_today']:
                 start_y=quest_panel_rect.top+110
                 for i,quest_id in enumerate(quest_manager.quest_data['daily_quests']):
@@ -3292,7 +4172,7 @@ while True:
                     if not mission: continue
                     quest_box_rect=pygame.Rect(quest_panel_rect.left+50,start_y+i*160,quest_panel_rect.width-100,140)
                     pygame.draw.rect(screen,LOCKED_SLOT_COLOR,quest_box_rect,0,10)
-                    q_title=font_small.render(mission['title'],True,TEXT_COLOR)
+                    q_title=render_text(font_small,mission['title'],True,TEXT_COLOR)
                     screen.blit(q_title,(quest_box_rect.left+20,quest_box_rect.top+10))
                     desc_rect=pygame.Rect(quest_box_rect.left+20,quest_box_rect.top+50,450,50)
                     draw_text_wrapped(screen,mission['description'],font_info,GRAY,desc_rect,line_spacing=2)
@@ -3303,11 +4183,11 @@ while True:
                     prog_bar_rect=pygame.Rect(quest_box_rect.left+20,quest_box_rect.bottom-prog_bar_h-10,prog_bar_w,prog_bar_h)
                     pygame.draw.rect(screen,GRAY,prog_bar_rect,0,5)
                     pygame.draw.rect(screen,QUEST_PROGRESS_COLOR,(prog_bar_rect.x,prog_bar_rect.y,prog_bar_w*progress_pct,prog_bar_h),0,5)
-                    progress_text=font_info.render(f"{min(progress,target)} / {target}",True,WHITE)
+                    progress_text=render_text(font_info,f"{min(progress,target)} / {target}",True,WHITE)
                     screen.blit(progress_text,progress_text.get_rect(center=prog_bar_rect.center))
                     reward_x=prog_bar_rect.right+30
                     if 'money' in mission['reward']:
-                        reward_money_text=font_small.render(str(mission['reward']['money']),True,TEXT_COLOR)
+                        reward_money_text=render_text(font_small,str(mission['reward']['money']),True,TEXT_COLOR)
                         screen.blit(reward_money_text,(reward_x,prog_bar_rect.centery-reward_money_text.get_height()//2))
                         screen.blit(pygame.transform.scale(coin_img,(32,32)),(reward_x+reward_money_text.get_width()+10,prog_bar_rect.centery-16))
                         reward_x+=reward_money_text.get_width()+60
@@ -3315,7 +4195,7 @@ while True:
                         for item_id,qty in mission['reward']['items'].items():
                            if item_img:=item_images.get(item_id):
                                screen.blit(pygame.transform.scale(item_img,(48,48)),(reward_x,prog_bar_rect.centery-24))
-                               qty_text=font_info.render(f"x{qty}",True,TEXT_COLOR)
+                               qty_text=render_text(font_info,f"x{qty}",True,TEXT_COLOR)
                                screen.blit(qty_text,(reward_x+50,prog_bar_rect.centery-12))
                                reward_x+=100
                     is_complete=progress>=target
@@ -3331,7 +4211,7 @@ while True:
                     if btn_rect.collidepoint(mouse_pos) and is_complete and not is_claimed:
                         btn_color=BUTTON_HOVER_COLOR
                     pygame.draw.rect(screen,btn_color,btn_rect,0,8)
-                    btn_text=font.render(btn_text_str,True,WHITE)
+                    btn_text=render_text(font,btn_text_str,True,WHITE)
                     screen.blit(btn_text,btn_text.get_rect(center=btn_rect.center))
                     pygame.draw.rect(screen,PANEL_BORDER_COLOR,quest_box_rect,4,10)
             else:
@@ -3340,25 +4220,23 @@ while True:
                 text_area_rect.center=quest_panel_rect.center
                 draw_text_wrapped(screen,prompt_text,font_small,TEXT_COLOR,text_area_rect,centered=True)
             if quest_menu_message and time.time()-quest_menu_message_timer<2:
-                msg_surf=font_small.render(quest_menu_message,True,WHITE)
+                msg_surf=render_text(font_small,quest_menu_message,True,WHITE)
                 msg_rect=msg_surf.get_rect(midbottom=(quest_panel_rect.centerx,quest_panel_rect.bottom-20))
-                screen.blit(msg_surf,msg_rect)
+                mark_dirty(screen.blit(msg_surf,msg_rect))
             else: quest_menu_message=""
-            exit_text=font_small.render("Press 'Q' or 'Esc' to exit.",True,GRAY)
+            exit_text=render_text(font_small,"Press 'Q' or 'Esc' to exit.",True,GRAY)
             screen.blit(exit_text,(SCREEN_WIDTH//2-exit_text.get_width()//2,SCREEN_HEIGHT-60))
         elif scene == "challenge_pet_select":
-            overlay=pygame.Surface((SCREEN_WIDTH,SCREEN_HEIGHT),pygame.SRCALPHA)
-            overlay.fill((0,0,0,180))
+            overlay=get_overlay((SCREEN_WIDTH,SCREEN_HEIGHT),(0,0,0,180))
             screen.blit(overlay,(0,0))
             list_panel_rect=pygame.Rect(0,0,800,SCREEN_HEIGHT-200)
             list_panel_rect.center=(SCREEN_WIDTH/2,SCREEN_HEIGHT/2)
-            pygame.draw.rect(screen,PANEL_FILL_COLOR,list_panel_rect,0,15)
-            pygame.draw.rect(screen,PANEL_BORDER_COLOR,list_panel_rect,6,15)
-            title_text=font.render("Choose Your Fighter",True,TEXT_COLOR)
+            draw_panel(screen,list_panel_rect,6,15)
+            title_text=render_text(font,"Choose Your Fighter",True,TEXT_COLOR)
             screen.blit(title_text,title_text.get_rect(centerx=list_panel_rect.centerx,top=list_panel_rect.top+20))
-            eligible_pets=[p for p in player_inventory.get_all_pets() if pet_data.get(p['pet_id'],{}).get('can_attack')]
+            eligible_pets=player_inventory.get_pets_by_pet_ids([k for k,v in pet_data.items() if v.get('can_attack')])
             if not eligible_pets:
-                none_text=font_small.render("No attacking pets available!",True,GRAY)
+                none_text=render_text(font_small,"No attacking pets available!",True,GRAY)
                 screen.blit(none_text,none_text.get_rect(center=list_panel_rect.center))
             else:
                 ROW_H,PADDING_Y=80,10
@@ -3378,38 +4256,35 @@ while True:
                         pygame.draw.rect(list_surface_container,row_color,pet_row_rect,0,8)
                         if pet_icon:=pet_icons.get(pet['pet_id']):
                             list_surface_container.blit(pet_icon,pet_icon.get_rect(centery=pet_row_rect.centery,left=pet_row_rect.left+10))
-                        pet_name_text=font_small.render(pet['name'],True,TEXT_COLOR)
+                        pet_name_text=render_text(font_small,pet['name'],True,TEXT_COLOR)
                         list_surface_container.blit(pet_name_text,pet_name_text.get_rect(centery=pet_row_rect.centery,left=pet_row_rect.left+90))
                         pet_damage=pet_data[pet['pet_id']].get('damage',0)
-                        damage_text=font_info.render(f"DMG: {pet_damage}",True,TEXT_COLOR)
+                        damage_text=render_text(font_info,f"DMG: {pet_damage}",True,TEXT_COLOR)
                         list_surface_container.blit(damage_text,damage_text.get_rect(centery=pet_row_rect.centery,right=pet_row_rect.right-20))
                         pygame.draw.rect(list_surface_container,BUTTON_HOVER_COLOR if is_hovered else PANEL_BORDER_COLOR,pet_row_rect,3,8)
-            exit_text=font_small.render("Press 'E' to cancel.",True,GRAY)
+            exit_text=render_text(font_small,"Press 'E' to cancel.",True,GRAY)
             screen.blit(exit_text,exit_text.get_rect(midbottom=(list_panel_rect.centerx,list_panel_rect.bottom-10)))
 
     # --- General Message Display ---
     if storage_message and time.time() - storage_message_timer < 2.5:
-        msg_surf = font_small.render(storage_message, True, WHITE)
+        msg_surf = render_text(font_small, storage_message, True, WHITE)
         msg_rect = msg_surf.get_rect(midbottom=(SCREEN_WIDTH / 2, SCREEN_HEIGHT - 60))
         bg_rect = msg_rect.inflate(20, 10)
-        bg_surf = pygame.Surface(bg_rect.size, pygame.SRCALPHA)
-        bg_surf.fill((0, 0, 0, 160))
-        screen.blit(bg_surf, bg_rect)
+        bg_surf = get_overlay(bg_rect.size, (0, 0, 0, 160))
+        mark_dirty(screen.blit(bg_surf, bg_rect))
         screen.blit(msg_surf, msg_rect)
     else:
         storage_message = ""
 
     if confirming_escape:
-        overlay_dark=pygame.Surface((SCREEN_WIDTH,SCREEN_HEIGHT),pygame.SRCALPHA)
-        overlay_dark.fill((0,0,0,120))
+        overlay_dark=get_overlay((SCREEN_WIDTH,SCREEN_HEIGHT),(0,0,0,120))
         screen.blit(overlay_dark,(0,0))
-        pygame.draw.rect(screen,PANEL_FILL_COLOR,dialog_rect,0,10)
-        pygame.draw.rect(screen,PANEL_BORDER_COLOR,dialog_rect,6,10)
-        q_text=font_small.render("Do you want to escape?",True,TEXT_COLOR)
+        draw_panel(screen,dialog_rect,6,10)
+        q_text=render_text(font_small,"Do you want to escape?",True,TEXT_COLOR)
         screen.blit(q_text,q_text.get_rect(center=(dialog_rect.centerx,dialog_rect.top+60)))
         for r,t in [(yes_button_rect,"Yes"),(no_button_rect,"No")]:
             pygame.draw.rect(screen,BUTTON_HOVER_COLOR if r.collidepoint(mouse_pos) else PANEL_BORDER_COLOR,r,0,8)
-            screen.blit(font.render(t,True,WHITE),font.render(t,True,WHITE).get_rect(center=r.center))
+            screen.blit(render_text(font,t,True,WHITE),render_text(font,t,True,WHITE).get_rect(center=r.center))
 
     if game_currency and scene != "hatching_animation": game_currency.draw(screen, show_time=(scene=="play"))
     
@@ -3417,4 +4292,10 @@ while True:
         if is_music_playing: screen.blit(music_on_img,music_button_rect)
         else: screen.blit(music_off_img,music_button_rect)
 
-    pygame.display.update()
\ No newline at end of file
+    shared_storage.pump()
+    save_queue.pump()
+
+    # Input, held keys, scene switches and the frame-by-frame scenes redraw the whole screen; otherwise only marked areas are sent.
+    view = (scene, current_map)
+    present_frame(bool(frame_events) or any(pygame.key.get_pressed()) or view != presented_view or scene in ("loading", "hatching_animation", "char_select"))
+    presented_view = view
\ No newline at end of file
@@ -0,0 +1,167 @@
+# build_atlases.py
+
+import json
+import os
+import pygame
+
+# --- YOU ONLY NEED TO CHANGE THESE VARIABLES ---
+
+# 1. The pet definitions whose animation folders should be packed.
+PETS_FILE = "JSON/pets_p.json"
+
+# 2. The folder where each pet's atlas image and frame table are written.
+#    The game looks for ATLAS/<pet_id>.png and ATLAS/<pet_id>.json.
+OUTPUT_DIR = "ATLAS"
+
+# 3. Empty pixels left around every frame so scaled frames never bleed into each other.
+FRAME_PADDING = 1
+
+# ---------------------------------------------
+
+
+file_index = {}
+
+
+def find_file(path):
+    """
+    Finds a file the same way the game's asset index does: by case-insensitive relative path.
+    """
+    if not file_index:
+        for dirpath, dirnames, filenames in os.walk("."):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            for name in filenames:
+                real_path = os.path.relpath(os.path.join(dirpath, name)).replace("\\", "/")
+                file_index[real_path.lower()] = real_path
+    return file_index.get(os.path.normpath(path).replace("\\", "/").lower())
+
+
+def collect_sequence(path_format):
+    """
+    Loads numbered frames (path_format % 1, % 2, ...) until the first missing file.
+    """
+    frames = []
+    i = 1
+    while True:
+        path = find_file(path_format % i)
+        if not path:
+            return frames
+        frames.append(pygame.image.load(path))
+        i += 1
+
+
+def collect_pet_frames(pet_id, animation_paths):
+    """
+    Mirrors load_pet_animation_frames in RaiseYourPet_M.py.
+
+    Returns:
+        dict: {"idle": [Surface, ...], "walk": [...], "attack": [[Surface, ...], ...]}
+    """
+    animations = {}
+    for anim_key, prefix in animation_paths.items():
+        if anim_key == "attack":
+            styles = []
+            anim_num = 1
+            while find_file(f"{prefix}{pet_id}_{anim_num}_1.png"):
+                styles.append(collect_sequence(f"{prefix}{pet_id}_{anim_num}_%d.png"))
+                anim_num += 1
+            if not styles:
+                single = collect_sequence(f"{prefix}{pet_id}_%d.png")
+                if single:
+                    styles.append(single)
+            if styles:
+                animations[anim_key] = styles
+        else:
+            frames = collect_sequence(f"{prefix}{pet_id}_%d.png")
+            if frames:
+                animations[anim_key] = frames
+    return animations
+
+
+def pack_rows(rows):
+    """
+    Shelf-packs each frame sequence into its own row.
+
+    Args:
+        rows (list): Lists of Surfaces, one list per row.
+
+    Returns:
+        tuple: (atlas Surface, list of rect dicts per row)
+    """
+    width = max(sum(f.get_width() + FRAME_PADDING * 2 for f in row) for row in rows)
+    height = sum(max(f.get_height() for f in row) + FRAME_PADDING * 2 for row in rows)
+    atlas = pygame.Surface((width, height), pygame.SRCALPHA)
+    atlas.fill((0, 0, 0, 0))
+    rects = []
+    y = 0
+    for row in rows:
+        x = 0
+        row_rects = []
+        for frame in row:
+            pos = (x + FRAME_PADDING, y + FRAME_PADDING)
+            # BLEND_RGBA_MAX onto a cleared surface copies pixels and alpha exactly.
+            atlas.blit(frame, pos, special_flags=pygame.BLEND_RGBA_MAX)
+            row_rects.append({"x": pos[0], "y": pos[1], "w": frame.get_width(), "h": frame.get_height()})
+            x += frame.get_width() + FRAME_PADDING * 2
+        rects.append(row_rects)
+        y += max(f.get_height() for f in row) + FRAME_PADDING * 2
+    return atlas, rects
+
+
+def build_pet_atlas(pet_id, animation_paths, output_dir):
+    """
+    Packs one pet's idle, walk and attack frames into a single PNG plus a JSON frame table.
+    """
+    animations = collect_pet_frames(pet_id, animation_paths)
+    if not animations:
+        print(f"Skipping '{pet_id}': no frames found.")
+        return False
+
+    rows, layout = [], []
+    for anim_key, frames in animations.items():
+        if anim_key == "attack":
+            for style_index, style in enumerate(frames):
+                rows.append(style)
+                layout.append((anim_key, style_index))
+        else:
+            rows.append(frames)
+            layout.append((anim_key, None))
+
+    atlas, rects = pack_rows(rows)
+    table = {}
+    for (anim_key, style_index), row_rects in zip(layout, rects):
+        if style_index is None:
+            table[anim_key] = row_rects
+        else:
+            table.setdefault(anim_key, []).append(row_rects)
+
+    image_name = f"{pet_id}.png"
+    pygame.image.save(atlas, os.path.join(output_dir, image_name))
+    with open(os.path.join(output_dir, f"{pet_id}.json"), "w") as f:
+        json.dump({"image": image_name, "size": {"w": atlas.get_width(), "h": atlas.get_height()}, "animations": table}, f, indent=1)
+    frame_count = sum(len(row) for row in rows)
+    print(f"Packed {frame_count} frames for '{pet_id}' into {atlas.get_width()}x{atlas.get_height()}.")
+    return True
+
+
+def build_all_atlases(pets_file, output_dir):
+    """
+    Builds an atlas for every pet in pets_file.
+
+    Args:
+        pets_file (str): Path to the pet definitions JSON.
+        output_dir (str): Folder that receives the atlas images and frame tables.
+    """
+    if not os.path.exists(pets_file):
+        print(f"Error: Pet definitions not found at '{pets_file}'")
+        return
+    with open(pets_file) as f:
+        pet_data = json.load(f)
+    os.makedirs(output_dir, exist_ok=True)
+    built = sum(build_pet_atlas(pet_id, data.get("animation_paths", {}), output_dir) for pet_id, data in pet_data.items())
+    print(f"Done! {built} atlases written to '{output_dir}'.")
+
+
+# This part runs the function when you execute the script
+if __name__ == "__main__":
+    pygame.init()
+    build_all_atlases(PETS_FILE, OUTPUT_DIR)
@@ -0,0 +1,552 @@
+# pet_engine.py
+
+import argparse
+import json
+import math
+import random
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# The pet economy rules shared by RaiseYourPet_M.py and the headless simulator below.
+# Nothing here imports pygame: every function works on plain pet dicts and a clock,
+# so days of play can be simulated in seconds without a display.
+
+MAX_PET_LEVEL = 10
+EXP_FOR_NEXT_LEVEL = [
+    600,  # Lvl 0 -> 1 (10 minutes of active time)
+    1200, # Lvl 1 -> 2 (20 minutes)
+    1800, # Lvl 2 -> 3 (30 minutes)
+    2400, # Lvl 3 -> 4 (40 minutes)
+    3600, # Lvl 4 -> 5 (1 hour)
+    5400, # Lvl 5 -> 6 (1.5 hours)
+    7200, # Lvl 6 -> 7 (2 hours)
+    9000, # Lvl 7 -> 8 (2.5 hours)
+    10800,# Lvl 8 -> 9 (3 hours)
+    14400 # Lvl 9 -> 10 (4 hours)
+]
+EXP_GAIN_RATE = 1.0
+INCOME_INTERVAL_SECONDS = 60
+DEFAULT_HATCH_TIME_SECONDS = 3600
+DEFAULT_BASE_STATS = {"health": 100, "happiness": 100, "hunger": 100}
+PET_NAMES = ["Buddy", "Lucy", "Max", "Bella", "Charlie", "Daisy", "Rocky", "Molly", "Toby", "Sadie", "Coco", "Lola", "Jack", "Zoe", "Milo", "Ruby", "Oscar", "Penny", "Leo", "Rosie", "Pip", "Fuzzy", "Sparky", "Noodle", "Waffles"]
+
+
+class SimClock:
+    """
+    A clock that only moves when advance() is called, used by the simulator.
+    """
+    def __init__(self, start=0.0):
+        self.time = start
+
+    def now(self):
+        return self.time
+
+    def advance(self, seconds):
+        self.time += seconds
+
+
+# -------------------- PET RECORDS --------------------
+def new_pet_record(pet_id, instance_id, pet_def, rng=random):
+    """
+    Builds the saved dict for a freshly hatched or bought pet.
+    """
+    base_stats = pet_def.get("base_stats", DEFAULT_BASE_STATS)
+    return {
+        "instance_id": instance_id,
+        "pet_id": pet_id,
+        "name": rng.choice(PET_NAMES),
+        "health": base_stats.get("health", 100),
+        "happiness": base_stats.get("happiness", 100),
+        "hunger": base_stats.get("hunger", 100),
+        "level": 0,
+        "experience": 0
+    }
+
+
+def upgrade_pet_record(pet):
+    """
+    Fills in fields that older saves lack. Pets created by older versions stored
+    their starting hunger under "fullness", which nothing else reads.
+    """
+    if "hunger" not in pet:
+        pet["hunger"] = pet.pop("fullness", DEFAULT_BASE_STATS["hunger"])
+    pet.setdefault("level", 0)
+    pet.setdefault("experience", 0)
+    return pet
+
+
+# -------------------- RULES --------------------
+def decay_pet(pet, pet_def, seconds):
+    """
+    Applies stat_decay_rate for the given number of seconds. Health only drops once hunger is empty.
+    """
+    decay = pet_def.get("stat_decay_rate", {})
+    pet["hunger"] = max(0, pet["hunger"] - decay.get("hunger", 0) * seconds)
+    pet["happiness"] = max(0, pet["happiness"] - decay.get("happiness", 0) * seconds)
+    if pet["hunger"] <= 0:
+        pet["health"] = max(0, pet["health"] - decay.get("health", 0) * seconds)
+
+
+def gain_experience(pet, seconds):
+    """
+    Adds EXP for the given number of seconds while every stat is above 0.
+
+    Returns:
+        bool: True if the pet reached a new level.
+    """
+    level = pet.get("level", 0)
+    if level >= MAX_PET_LEVEL:
+        return False
+    if not (pet["health"] > 0 and pet["happiness"] > 0 and pet["hunger"] > 0):
+        return False
+    pet["experience"] += EXP_GAIN_RATE * seconds
+    exp_needed = EXP_FOR_NEXT_LEVEL[level]
+    if pet["experience"] >= exp_needed:
+        pet["level"] += 1
+        pet["experience"] -= exp_needed
+        return True
+    return False
+
+
+def update_active_pet(pet, pet_def, seconds):
+    """
+    One tick for a pet that is out in the pet area: stats decay, then EXP is gained.
+
+    Returns:
+        bool: True if the pet leveled up during this tick.
+    """
+    decay_pet(pet, pet_def, seconds)
+    return gain_experience(pet, seconds)
+
+
+def pet_income(pet, pet_def):
+    """
+    Coins one active pet earns per INCOME_INTERVAL_SECONDS: base_money_per_minute
+    scaled by its average stat and a 10% bonus per level.
+    """
+    level_bonus = 1.0 + (pet.get("level", 0) / 10.0)
+    avg_stat_ratio = (pet["health"] + pet["happiness"] + pet["hunger"]) / 300.0
+    return int(pet_def.get("base_money_per_minute", 0) * avg_stat_ratio * level_bonus)
+
+
+def collect_income(active_pets, pet_defs):
+    """
+    Returns the total coins the active pets earn for one income interval.
+    """
+    return sum(pet_income(pet, pet_defs[pet["pet_id"]]) for pet in active_pets if pet_defs.get(pet["pet_id"]))
+
+
+def decay_inactive_pets(pets, active_ids, pet_defs, seconds=INCOME_INTERVAL_SECONDS):
+    """
+    Decays the pets that are not out in the pet area. They earn nothing and gain no EXP.
+    """
+    for pet in pets:
+        if pet["instance_id"] not in active_ids and pet_defs.get(pet["pet_id"]):
+            decay_pet(pet, pet_defs[pet["pet_id"]], seconds)
+
+
+# -------------------- OFFLINE CATCH-UP --------------------
+def zero_time(value, rate):
+    """
+    Seconds until value, dropping by rate per second, reaches 0 (math.inf if it never does).
+    """
+    if value <= 0: return 0.0
+    return value / rate if rate > 0 else math.inf
+
+
+def catch_up_pet(pet, pet_def, seconds, active, carried=0.0):
+    """
+    Ages one pet by seconds in a single step, using the closed form of the per-frame rules.
+    Stats fall linearly and stop at 0, and health only starts falling once hunger is empty.
+    Active pets gain EXP while every stat is above 0 and earn income each
+    INCOME_INTERVAL_SECONDS. Stored pets only decay. carried is how far the income timer
+    already was into its interval when the pet was saved, so the first interval ends early.
+
+    Stored pets follow decay_inactive_pets exactly: they decay in whole INCOME_INTERVAL_SECONDS
+    chunks, and health falls for all of the chunk in which hunger runs out. For active pets the
+    closed form is an approximation: it is the limit of ever shorter frames, so a frame-by-frame
+    replay ends up to one frame's decay away, and the replay's rounding drift can drop a coin in
+    each minute whose income is exactly a whole number.
+
+    Returns:
+        int: Coins the pet earned.
+    """
+    decay = pet_def.get("stat_decay_rate", {})
+    rates = {stat: decay.get(stat, 0) for stat in ("health", "happiness", "hunger")}
+    start = {stat: pet[stat] for stat in rates}
+    hunger_gone = zero_time(start["hunger"], rates["hunger"])
+    if not active:
+        chunk = INCOME_INTERVAL_SECONDS
+        chunks = int((seconds + carried) // chunk)
+        # Health decays from the first chunk that ends with hunger at 0.
+        starving_chunks = chunks - max(1, math.ceil(hunger_gone / chunk)) + 1 if hunger_gone != math.inf else 0
+        pet["hunger"] = max(0, start["hunger"] - rates["hunger"] * chunk * chunks)
+        pet["happiness"] = max(0, start["happiness"] - rates["happiness"] * chunk * chunks)
+        pet["health"] = max(0, start["health"] - rates["health"] * chunk * max(0, starving_chunks))
+        return 0
+
+    happiness_gone = zero_time(start["happiness"], rates["happiness"])
+    health_gone = hunger_gone + zero_time(start["health"], rates["health"])
+
+    def stats_at(t):
+        return {"hunger": max(0, start["hunger"] - rates["hunger"] * t),
+                "happiness": max(0, start["happiness"] - rates["happiness"] * t),
+                "health": max(0, start["health"] - rates["health"] * max(0, t - hunger_gone))}
+
+    # Level-up times inside the window where every stat is above 0.
+    exp_end = min(seconds, hunger_gone, happiness_gone) if start["health"] > 0 else 0
+    level, experience, t = pet.get("level", 0), pet.get("experience", 0), 0.0
+    level_ups = []
+    while level < MAX_PET_LEVEL and t < exp_end:
+        t_next = t + max(0, EXP_FOR_NEXT_LEVEL[level] - experience) / EXP_GAIN_RATE
+        if t_next > exp_end:
+            experience += (exp_end - t) * EXP_GAIN_RATE
+            break
+        level, experience, t = level + 1, 0, t_next
+        level_ups.append(t)
+
+    def income_at(t):
+        state = stats_at(t)
+        state["level"] = pet.get("level", 0) + sum(1 for up in level_ups if up <= t)
+        return pet_income(state, pet_def)
+
+    # Income is truncated per interval, so it is summed interval by interval, but only
+    # until every stat and the level have stopped changing; after that it is constant.
+    intervals = int((seconds + carried) // INCOME_INTERVAL_SECONDS)
+    settled = max([0] + [end for end, rate in ((hunger_gone, rates["hunger"]), (happiness_gone, rates["happiness"]),
+                                               (health_gone, rates["health"])) if rate > 0 and end != math.inf] + level_ups)
+    changing = min(intervals, math.ceil((settled + carried) / INCOME_INTERVAL_SECONDS))
+    coins = sum(income_at(k * INCOME_INTERVAL_SECONDS - carried) for k in range(1, changing + 1))
+    if intervals > changing:
+        coins += (intervals - changing) * income_at(intervals * INCOME_INTERVAL_SECONDS - carried)
+    pet["level"], pet["experience"] = level, experience
+
+    pet.update(stats_at(seconds))
+    return coins
+
+
+def catch_up_profile(profile, pet_defs, now):
+    """
+    Applies the time since profile["last_saved"] to every pet of the profile and adds the
+    coins the active pets earned. Profiles saved before the stamp existed are left as they are.
+
+    Only whole income intervals pay out or decay stored pets. What is left of the last one is
+    kept in profile["income_timer"] (seconds), which the game loop resumes its income timer
+    from and stores back on save, so no part of a minute is lost between sessions.
+
+    Returns:
+        tuple: (seconds away, coins earned)
+    """
+    last_saved = profile.get("last_saved")
+    profile["last_saved"] = now
+    if last_saved is None or now <= last_saved:
+        return 0, 0
+    seconds = now - last_saved
+    carried = profile.get("income_timer", 0.0)
+    profile["income_timer"] = (carried + seconds) % INCOME_INTERVAL_SECONDS
+    active_ids = set(profile.get("active_pet_instances", []))
+    coins = 0
+    for pet in profile.get("pets", []):
+        pet_def = pet_defs.get(pet["pet_id"])
+        if pet_def:
+            coins += catch_up_pet(upgrade_pet_record(pet), pet_def, seconds, pet["instance_id"] in active_ids, carried)
+    if coins:
+        profile["money"] = profile.get("money", 0) + coins
+    return seconds, coins
+
+
+def hatch_time(egg_def):
+    return egg_def.get("data", {}).get("hatch_time_seconds", DEFAULT_HATCH_TIME_SECONDS)
+
+
+def egg_ready(egg_info, egg_def, now):
+    """
+    True once an incubator slot ({"item_id", "start_time"}) has been warming for its hatch time.
+    """
+    return now - egg_info["start_time"] >= hatch_time(egg_def)
+
+
+def egg_time_left(egg_info, egg_def, now):
+    return hatch_time(egg_def) - (now - egg_info["start_time"])
+
+
+def choose_pet_from_egg(egg_def, rng=random):
+    possible_pets = egg_def.get("data", {}).get("possible_pets", [])
+    if not possible_pets: return None
+    pet_ids = [p["pet_id"] for p in possible_pets]
+    chances = [p["chance"] for p in possible_pets]
+    return rng.choices(pet_ids, weights=chances, k=1)[0]
+
+
+# -------------------- ARRAY STORE --------------------
+class PetArrayStore:
+    """
+    Structure-of-arrays copy of a pet roster (needs numpy). Stats, level, EXP, decay rates and
+    base income are NumPy columns, so the rules above run as a few array operations per tick
+    however many pets there are. The pet dicts are only written back by sync().
+
+    Args:
+        pets (list): Pet dicts; the store keeps them in this order.
+        pet_defs (dict): Pet definitions, for decay rates and base income.
+        active_ids (iterable): Instance ids of the pets out in the pet area.
+    """
+    STATS = ("health", "happiness", "hunger")
+
+    def __init__(self, pets, pet_defs, active_ids=()):
+        if np is None:
+            raise ImportError("PetArrayStore needs numpy")
+        self.pet_defs = pet_defs
+        self.exp_needed = np.array(EXP_FOR_NEXT_LEVEL[:MAX_PET_LEVEL] + [np.inf])
+        self.pets = []
+        for name in self.STATS + ("experience", "base_money") + tuple(f"decay_{stat}" for stat in self.STATS):
+            setattr(self, name, np.zeros(0))
+        self.level = np.zeros(0, dtype=np.int64)
+        self.active = np.zeros(0, dtype=bool)
+        self.extend(pets, active_ids)
+
+    def extend(self, pets, active_ids=()):
+        """
+        Appends pets to every column.
+        """
+        active_ids = set(active_ids)
+        defs = [self.pet_defs.get(p["pet_id"], {}) for p in pets]
+        decay = [d.get("stat_decay_rate", {}) for d in defs]
+        for stat in self.STATS:
+            setattr(self, stat, np.append(getattr(self, stat), [float(p[stat]) for p in pets]))
+            setattr(self, f"decay_{stat}", np.append(getattr(self, f"decay_{stat}"), [float(d.get(stat, 0)) for d in decay]))
+        self.experience = np.append(self.experience, [float(p.get("experience", 0)) for p in pets])
+        self.base_money = np.append(self.base_money, [float(d.get("base_money_per_minute", 0)) for d in defs])
+        self.level = np.append(self.level, np.array([p.get("level", 0) for p in pets], dtype=np.int64))
+        self.active = np.append(self.active, np.array([p["instance_id"] in active_ids for p in pets], dtype=bool))
+        self.pets.extend(pets)
+        self.refresh_rows()
+
+    def set_active(self, active_ids):
+        active_ids = set(active_ids)
+        self.active = np.array([p["instance_id"] in active_ids for p in self.pets], dtype=bool)
+        self.refresh_rows()
+
+    def refresh_rows(self):
+        self.active_rows = np.flatnonzero(self.active)
+        self.inactive_rows = np.flatnonzero(~self.active)
+
+    def decay(self, seconds, rows):
+        """
+        decay_pet for the pets at the given row indices.
+        """
+        hunger = np.maximum(0, self.hunger[rows] - self.decay_hunger[rows] * seconds)
+        self.hunger[rows] = hunger
+        self.happiness[rows] = np.maximum(0, self.happiness[rows] - self.decay_happiness[rows] * seconds)
+        starving = rows[hunger <= 0]
+        self.health[starving] = np.maximum(0, self.health[starving] - self.decay_health[starving] * seconds)
+
+    def gain_experience(self, seconds, rows):
+        """
+        gain_experience for the pets at the given row indices.
+
+        Returns:
+            ndarray: Row indices of the pets that leveled up.
+        """
+        level = self.level[rows]
+        gaining = rows[(level < MAX_PET_LEVEL) & (self.health[rows] > 0) & (self.happiness[rows] > 0) & (self.hunger[rows] > 0)]
+        self.experience[gaining] += EXP_GAIN_RATE * seconds
+        needed = self.exp_needed[np.clip(self.level[gaining], 0, MAX_PET_LEVEL)]
+        reached = self.experience[gaining] >= needed
+        leveled = gaining[reached]
+        self.level[leveled] += 1
+        self.experience[leveled] -= needed[reached]
+        return leveled
+
+    def income(self, rows):
+        """
+        collect_income over the pets at the given row indices.
+        """
+        avg_stat_ratio = (self.health[rows] + self.happiness[rows] + self.hunger[rows]) / 300.0
+        return int(np.trunc(self.base_money[rows] * avg_stat_ratio * (1.0 + self.level[rows] / 10.0)).sum())
+
+    def sync(self):
+        """
+        Writes the columns back into the pet dicts.
+        """
+        for i, pet in enumerate(self.pets):
+            for stat in self.STATS:
+                pet[stat] = float(getattr(self, stat)[i])
+            pet["level"] = int(self.level[i])
+            pet["experience"] = float(self.experience[i])
+
+
+# -------------------- HEADLESS ENGINE --------------------
+class PetEconomy:
+    """
+    Runs the game's economy rules for one profile against an injectable clock.
+
+    Args:
+        pet_defs (dict): Pet definitions (pets_p.json).
+        item_defs (dict): Item definitions (items_p.json).
+        profile (dict): A profile as stored in profiles.json; it is updated in place.
+        clock: Anything with now(); a new SimClock by default.
+        rng: Random source for names and egg rolls.
+        use_arrays (bool): Keep the roster in a PetArrayStore. Defaults to True when numpy is installed.
+            The profile's pet dicts are then only up to date after sync().
+    """
+    def __init__(self, pet_defs, item_defs, profile, clock=None, rng=None, use_arrays=None):
+        self.pet_defs = pet_defs
+        self.item_defs = item_defs
+        self.profile = profile
+        self.clock = clock or SimClock()
+        self.rng = rng or random.Random()
+        self.income_timer = 0.0
+        self.last_tick = self.clock.now()
+        profile.setdefault("money", 0)
+        profile.setdefault("pets", [])
+        profile.setdefault("active_pet_instances", [])
+        profile.setdefault("incubator_slots", {})
+        for pet in profile["pets"]:
+            upgrade_pet_record(pet)
+        if use_arrays is None: use_arrays = np is not None
+        self.store = PetArrayStore(profile["pets"], pet_defs, profile["active_pet_instances"]) if use_arrays else None
+
+    def set_active(self, instance_ids):
+        self.profile["active_pet_instances"] = list(instance_ids)
+        if self.store: self.store.set_active(instance_ids)
+
+    def sync(self):
+        if self.store: self.store.sync()
+
+    def active_pets(self):
+        active_ids = set(self.profile["active_pet_instances"])
+        return [p for p in self.profile["pets"] if p["instance_id"] in active_ids]
+
+    def add_pet(self, pet_id):
+        instance_id = max([p["instance_id"] for p in self.profile["pets"]] + [0]) + 1
+        pet = new_pet_record(pet_id, instance_id, self.pet_defs.get(pet_id, {}), self.rng)
+        self.profile["pets"].append(pet)
+        if self.store: self.store.extend([pet])
+        return pet
+
+    def place_egg(self, slot_key, egg_id):
+        self.profile["incubator_slots"][str(slot_key)] = {"item_id": egg_id, "start_time": self.clock.now()}
+
+    def hatch_ready_eggs(self):
+        """
+        Hatches every egg whose time is up and returns the new pet records.
+        """
+        hatched = []
+        now = self.clock.now()
+        for slot_key, egg_info in list(self.profile["incubator_slots"].items()):
+            egg_def = self.item_defs.get(egg_info["item_id"], {})
+            if egg_ready(egg_info, egg_def, now):
+                del self.profile["incubator_slots"][slot_key]
+                pet_id = choose_pet_from_egg(egg_def, self.rng)
+                if pet_id: hatched.append(self.add_pet(pet_id))
+        return hatched
+
+    def tick(self):
+        """
+        Advances the rules to clock.now(), the same way one game frame does.
+
+        Returns:
+            dict: {"income": coins earned, "level_ups": [pets], "hatched": [pets]}
+        """
+        now = self.clock.now()
+        seconds = max(0.0, now - self.last_tick)
+        self.last_tick = now
+        store = self.store
+        if store:
+            store.decay(seconds, store.active_rows)
+            level_ups = [store.pets[i] for i in store.gain_experience(seconds, store.active_rows)]
+        else:
+            active = self.active_pets()
+            level_ups = [pet for pet in active if update_active_pet(pet, self.pet_defs[pet["pet_id"]], seconds)]
+        income = 0
+        self.income_timer += seconds
+        while self.income_timer >= INCOME_INTERVAL_SECONDS:
+            self.income_timer -= INCOME_INTERVAL_SECONDS
+            if store:
+                income += store.income(store.active_rows)
+                store.decay(INCOME_INTERVAL_SECONDS, store.inactive_rows)
+            else:
+                income += collect_income(active, self.pet_defs)
+                decay_inactive_pets(self.profile["pets"], set(self.profile["active_pet_instances"]), self.pet_defs)
+        self.profile["money"] += income
+        return {"income": income, "level_ups": level_ups, "hatched": self.hatch_ready_eggs()}
+
+    def run(self, seconds, step=1.0):
+        """
+        Advances a SimClock by step until seconds have passed, ticking after every step.
+
+        Returns:
+            dict: Totals of coins earned, level ups and hatched pets.
+        """
+        totals = {"income": 0, "level_ups": 0, "hatched": 0}
+        elapsed = 0.0
+        while elapsed < seconds:
+            dt = min(step, seconds - elapsed)
+            self.clock.advance(dt)
+            elapsed += dt
+            result = self.tick()
+            totals["income"] += result["income"]
+            totals["level_ups"] += len(result["level_ups"])
+            totals["hatched"] += len(result["hatched"])
+        self.sync()
+        return totals
+
+
+def simulate(pet_defs, item_defs, pet_ids, eggs, days, step, seed, stored=0, use_arrays=None):
+    """
+    Simulates a fresh profile with pet_ids out in the pet area, stored random pets kept
+    in the roster and eggs in the incubators.
+    """
+    profile = {"money": 0, "pets": [], "active_pet_instances": [], "incubator_slots": {}}
+    rng = random.Random(seed)
+    engine = PetEconomy(pet_defs, item_defs, profile, SimClock(), rng, use_arrays)
+    engine.set_active([engine.add_pet(pet_id)["instance_id"] for pet_id in pet_ids])
+    pet_pool = sorted(pet_defs)
+    for _ in range(stored):
+        engine.add_pet(rng.choice(pet_pool))
+    for slot, egg_id in enumerate(eggs):
+        engine.place_egg(slot, egg_id)
+    totals = engine.run(days * 86400, step)
+    return profile, totals
+
+
+# This part runs the simulator when you execute the script
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate the pet economy without a display.")
+    parser.add_argument("--days", type=float, default=1.0, help="Simulated play time in days.")
+    parser.add_argument("--step", type=float, default=1.0, help="Seconds per tick (the game ticks every frame).")
+    parser.add_argument("--pets", default="Bunny,Cat,Dog", help="Comma-separated pet ids put out in the pet area.")
+    parser.add_argument("--eggs", default="", help="Comma-separated egg item ids placed in the incubators.")
+    parser.add_argument("--stored", type=int, default=0, help="Extra random pets kept in the roster but not out.")
+    parser.add_argument("--no-arrays", action="store_true", help="Run the per-pet Python rules instead of the NumPy store.")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--pets-file", default="JSON/pets_p.json")
+    parser.add_argument("--items-file", default="JSON/items_p.json")
+    args = parser.parse_args()
+
+    with open(args.pets_file) as f:
+        pet_defs = json.load(f)
+    with open(args.items_file) as f:
+        item_defs = json.load(f)
+    pet_ids = [p for p in args.pets.split(",") if p]
+    eggs = [e for e in args.eggs.split(",") if e]
+    for pet_id in pet_ids:
+        if pet_id not in pet_defs: parser.error(f"unknown pet '{pet_id}'")
+    for egg_id in eggs:
+        if item_defs.get(egg_id, {}).get("category") != "egg": parser.error(f"'{egg_id}' is not an egg")
+
+    started = time.time()
+    profile, totals = simulate(pet_defs, item_defs, pet_ids, eggs, args.days, args.step, args.seed, args.stored,
+                               False if args.no_arrays else None)
+    print(f"Simulated {args.days:g} days in {time.time() - started:.2f}s.")
+    print(f"Money: {profile['money']}  Level ups: {totals['level_ups']}  Hatched: {totals['hatched']}")
+    for pet in profile["pets"][:20]:
+        print(f"  #{pet['instance_id']} {pet['name']} the {pet['pet_id']}: Lvl {pet['level']} "
+              f"HP {pet['health']:.0f} Happy {pet['happiness']:.0f} Fullness {pet['hunger']:.0f}")
+    if len(profile["pets"]) > 20:
+        print(f"  ... and {len(profile['pets']) - 20} more")
+    print(f"Profile save size: {len(json.dumps(profile, indent=2))} bytes")
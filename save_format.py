@@ -0,0 +1,321 @@
+# save_format.py
+
+import json
+import os
+import struct
+import sys
+import pet_engine
+
+# Save document formats and schema versions for RaiseYourPet_M.py. Nothing here imports pygame.
+#
+# A save document (a profile or the global storage) carries "schema_version". Documents written
+# before versioning count as version 0, and migrate_profile / migrate_storage step them up to the
+# current version one migration at a time, so old saves are upgraded in one place on load.
+#
+# Two codecs write the same documents:
+#   JSON_CODEC   - the readable pretty-printed JSON the game has always written (".json").
+#   BINARY_CODEC - a compact struct-packed form (".sav"). The file starts with a header holding the
+#                  schema version, then a table of every string in the document (item ids, pet ids,
+#                  names, dict keys) that the body refers to by index. Lists of pet records are
+#                  stored as one fixed-layout array instead of repeating every key for every pet.
+#
+# Run this file to convert a save between the two: python save_format.py profile_0.json profile_0.sav
+
+BINARY_MAGIC = b"RYPS"
+HEADER = struct.Struct("<4sHI")  # magic, schema version, string count
+
+# Value tags of the binary body.
+TAG_NONE, TAG_TRUE, TAG_FALSE, TAG_INT, TAG_FLOAT, TAG_STR, TAG_LIST, TAG_DICT, TAG_PETS, TAG_BIG_INT = range(10)
+INT64 = struct.Struct("<q")
+FLOAT64 = struct.Struct("<d")
+UINT32 = struct.Struct("<I")
+PET_BLOCK = struct.Struct("<IB")  # pet count, mask of the PET_FIELDS every record has
+
+# Packed pet record layout: strings are string-table indices, numbers are doubles. A per-record
+# byte marks which numbers were ints so they load back as ints.
+PET_FIELDS = (("instance_id", "d"), ("pet_id", "I"), ("name", "I"), ("health", "d"),
+              ("happiness", "d"), ("hunger", "d"), ("level", "d"), ("experience", "d"))
+EXACT_INT_LIMIT = 2 ** 53
+
+
+# -------------------- MIGRATIONS --------------------
+def profile_v0_to_v1(profile):
+    """
+    Backfills what unversioned saves could lack (these checks used to run on every profile load).
+    """
+    if profile.get("unlocked_pet_slots", 0) < 5: profile["unlocked_pet_slots"] = 5
+    profile.setdefault("active_pet_instances", [])
+    profile.setdefault("last_map", "world")
+    profile.setdefault("quests", {"daily_quests": [], "progress": {}, "claimed": [], "last_reset_day": 0, "quests_accepted_today": False})
+    profile["quests"].setdefault("quests_accepted_today", False)
+    for pet in profile.get("pets", []):
+        pet_engine.upgrade_pet_record(pet)
+
+
+def storage_v0_to_v1(storage):
+    storage.setdefault("items", {})
+    storage.setdefault("pets", [])
+    for pet in storage["pets"]:
+        pet_engine.upgrade_pet_record(pet)
+
+
+# MIGRATIONS[n] upgrades a document from version n to n + 1.
+PROFILE_MIGRATIONS = [profile_v0_to_v1]
+STORAGE_MIGRATIONS = [storage_v0_to_v1]
+PROFILE_SCHEMA_VERSION = len(PROFILE_MIGRATIONS)
+STORAGE_SCHEMA_VERSION = len(STORAGE_MIGRATIONS)
+
+
+def migrate(document, migrations):
+    version = document.get("schema_version", 0)
+    if version > len(migrations):
+        print(f"Warning: save schema {version} is newer than this game ({len(migrations)}).")
+        return document
+    for migration in migrations[version:]:
+        migration(document)
+    document["schema_version"] = len(migrations)
+    return document
+
+
+def migrate_profile(profile):
+    """
+    Brings a loaded profile up to PROFILE_SCHEMA_VERSION.
+    """
+    return migrate(profile, PROFILE_MIGRATIONS)
+
+
+def migrate_storage(storage):
+    """
+    Brings the loaded global storage up to STORAGE_SCHEMA_VERSION.
+    """
+    return migrate(storage, STORAGE_MIGRATIONS)
+
+
+# -------------------- JSON --------------------
+class JsonCodec:
+    """
+    The pretty-printed JSON the game has always written.
+    """
+    name = "json"
+    suffix = ".json"
+
+    @staticmethod
+    def dumps(document):
+        return json.dumps(document, indent=2).encode()
+
+    @staticmethod
+    def loads(data):
+        return json.loads(data)
+
+
+# -------------------- BINARY --------------------
+def pet_block_mask(pets):
+    """
+    Returns the PET_FIELDS mask if pets can be stored as one packed array, else None.
+    Every record must have the same keys, all of them PET_FIELDS, with values of the packed type.
+    """
+    if not pets or not all(type(pet) is dict for pet in pets):
+        return None
+    keys = pets[0].keys()
+    field_names = {name for name, _ in PET_FIELDS}
+    if not keys <= field_names or any(pet.keys() != keys for pet in pets):
+        return None
+    for name, code in PET_FIELDS:
+        if name not in keys: continue
+        for pet in pets:
+            value = pet[name]
+            if code == "I":
+                if type(value) is not str: return None
+            elif type(value) is int:
+                if abs(value) > EXACT_INT_LIMIT: return None
+            elif type(value) is not float:
+                return None
+    return sum(1 << i for i, (name, _) in enumerate(PET_FIELDS) if name in keys)
+
+
+def pet_record_struct(mask):
+    return struct.Struct("<B" + "".join(code for i, (_, code) in enumerate(PET_FIELDS) if mask & (1 << i)))
+
+
+class BinaryCodec:
+    """
+    Compact struct-packed save documents; see the notes at the top of this file.
+    """
+    name = "binary"
+    suffix = ".sav"
+
+    @staticmethod
+    def dumps(document):
+        document = dict(document)
+        version = document.pop("schema_version", 0)
+        strings, string_ids, parts = [], {}, []
+
+        def string_id(text):
+            index = string_ids.get(text)
+            if index is None:
+                index = string_ids[text] = len(strings)
+                strings.append(text)
+            return index
+
+        def write(value):
+            kind = type(value)
+            if value is None: parts.append(bytes((TAG_NONE,)))
+            elif value is True: parts.append(bytes((TAG_TRUE,)))
+            elif value is False: parts.append(bytes((TAG_FALSE,)))
+            elif kind is int:
+                if -2 ** 63 <= value < 2 ** 63:
+                    parts.append(bytes((TAG_INT,)) + INT64.pack(value))
+                else:
+                    parts.append(bytes((TAG_BIG_INT,)) + UINT32.pack(string_id(str(value))))
+            elif kind is float: parts.append(bytes((TAG_FLOAT,)) + FLOAT64.pack(value))
+            elif kind is str: parts.append(bytes((TAG_STR,)) + UINT32.pack(string_id(value)))
+            elif kind is dict:
+                parts.append(bytes((TAG_DICT,)) + UINT32.pack(len(value)))
+                for key, item in value.items():
+                    parts.append(UINT32.pack(string_id(key)))
+                    write(item)
+            elif kind in (list, tuple):
+                mask = pet_block_mask(value)
+                if mask is None:
+                    parts.append(bytes((TAG_LIST,)) + UINT32.pack(len(value)))
+                    for item in value:
+                        write(item)
+                    return
+                record = pet_record_struct(mask)
+                fields = [(name, code) for i, (name, code) in enumerate(PET_FIELDS) if mask & (1 << i)]
+                block = bytearray(PET_BLOCK.pack(len(value), mask))
+                for pet in value:
+                    int_bits, row = 0, []
+                    for bit, (name, code) in enumerate(fields):
+                        field = pet[name]
+                        if code == "I":
+                            row.append(string_id(field))
+                        else:
+                            if type(field) is int: int_bits |= 1 << bit
+                            row.append(field)
+                    block += record.pack(int_bits, *row)
+                parts.append(bytes((TAG_PETS,)) + bytes(block))
+            else:
+                raise TypeError(f"Cannot save a value of type {kind.__name__}")
+
+        write(document)
+        encoded = [text.encode() for text in strings]
+        table = struct.pack(f"<{len(encoded)}I", *(len(text) for text in encoded)) + b"".join(encoded)
+        return HEADER.pack(BINARY_MAGIC, version, len(strings)) + table + b"".join(parts)
+
+    @staticmethod
+    def loads(data):
+        try:
+            return BinaryCodec.read_document(data)
+        except (struct.error, IndexError) as e:
+            raise ValueError(f"Damaged binary save: {e}") from e
+
+    @staticmethod
+    def read_document(data):
+        magic, version, string_count = HEADER.unpack_from(data, 0)
+        if magic != BINARY_MAGIC:
+            raise ValueError("Not a binary save file")
+        pos = HEADER.size
+        lengths = struct.unpack_from(f"<{string_count}I", data, pos)
+        pos += 4 * string_count
+        end = pos + sum(lengths)
+        text = data[pos:end].decode()
+        strings = []
+        if len(text) == end - pos:
+            # Plain ASCII: byte lengths are character lengths, so slice the decoded text.
+            start = 0
+            for length in lengths:
+                strings.append(text[start:start + length])
+                start += length
+        else:
+            for length in lengths:
+                strings.append(data[pos:pos + length].decode())
+                pos += length
+        pos = end
+
+        def read(pos):
+            tag = data[pos]
+            pos += 1
+            if tag == TAG_STR: return strings[UINT32.unpack_from(data, pos)[0]], pos + 4
+            if tag == TAG_FLOAT: return FLOAT64.unpack_from(data, pos)[0], pos + 8
+            if tag == TAG_INT: return INT64.unpack_from(data, pos)[0], pos + 8
+            if tag == TAG_NONE: return None, pos
+            if tag == TAG_TRUE: return True, pos
+            if tag == TAG_FALSE: return False, pos
+            if tag == TAG_DICT:
+                count = UINT32.unpack_from(data, pos)[0]
+                pos += 4
+                value = {}
+                for _ in range(count):
+                    key = strings[UINT32.unpack_from(data, pos)[0]]
+                    value[key], pos = read(pos + 4)
+                return value, pos
+            if tag == TAG_LIST:
+                count = UINT32.unpack_from(data, pos)[0]
+                pos += 4
+                value = []
+                for _ in range(count):
+                    item, pos = read(pos)
+                    value.append(item)
+                return value, pos
+            if tag == TAG_PETS:
+                count, mask = PET_BLOCK.unpack_from(data, pos)
+                pos += PET_BLOCK.size
+                record = pet_record_struct(mask)
+                fields = [(name, code) for i, (name, code) in enumerate(PET_FIELDS) if mask & (1 << i)]
+                end = pos + record.size * count
+                # Rebuild column by column; far fewer Python-level steps than field by field.
+                int_bits, *columns = zip(*record.iter_unpack(data[pos:end]))
+                for bit, (name, code) in enumerate(fields):
+                    if code == "I":
+                        columns[bit] = [strings[index] for index in columns[bit]]
+                    else:
+                        flag = 1 << bit
+                        columns[bit] = [int(value) if bits & flag else value for value, bits in zip(columns[bit], int_bits)]
+                names = [name for name, _ in fields]
+                return [dict(zip(names, row)) for row in zip(*columns)], end
+            if tag == TAG_BIG_INT: return int(strings[UINT32.unpack_from(data, pos)[0]]), pos + 4
+            raise ValueError(f"Unknown tag {tag} in binary save")
+
+        document, _ = read(pos)
+        if version:
+            document["schema_version"] = version
+        return document
+
+
+JSON_CODEC = JsonCodec()
+BINARY_CODEC = BinaryCodec()
+CODECS = {codec.name: codec for codec in (JSON_CODEC, BINARY_CODEC)}
+
+
+def codec_for_path(path):
+    """
+    Picks the codec by file extension (".sav" is binary, anything else JSON).
+    """
+    return BINARY_CODEC if path.lower().endswith(BINARY_CODEC.suffix) else JSON_CODEC
+
+
+def convert(input_path, output_path):
+    """
+    Reads a save document in either format (replaying its journal, if any) and writes it in the
+    format of output_path.
+
+    Returns:
+        tuple: (input size, output size) in bytes
+    """
+    from save_system import SaveJournal, write_bytes_atomic
+    document = SaveJournal(input_path, codec=codec_for_path(input_path)).load()
+    if document is None:
+        raise ValueError(f"'{input_path}' holds no save")
+    data = codec_for_path(output_path).dumps(document)
+    write_bytes_atomic(output_path, data)
+    return os.path.getsize(input_path), len(data)
+
+
+# This part runs the converter when you execute the script
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python save_format.py <input .json|.sav> <output .json|.sav>")
+        sys.exit(1)
+    input_size, output_size = convert(sys.argv[1], sys.argv[2])
+    print(f"Converted '{sys.argv[1]}' ({input_size} bytes) to '{sys.argv[2]}' ({output_size} bytes).")
@@ -0,0 +1,391 @@
+# save_system.py
+
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from save_format import CODECS, JSON_CODEC, migrate_profile
+
+# Profile persistence for RaiseYourPet_M.py. Nothing here imports pygame.
+#
+# Every profile slot has its own file (saves/profile_<slot>.json or .sav, see save_format.py)
+# and saves/index.json keeps
+# only what the profile screen shows, so startup reads one small file and a full profile is
+# parsed only when its row is picked.
+#
+# Each file is a snapshot plus an append-only journal: a save appends one JSON line holding
+# only the top-level keys that changed since the last save. Loading replays the journal over
+# the snapshot; once the journal grows past JOURNAL_COMPACT_BYTES it is folded into a fresh
+# snapshot. A crash can at worst cut off the last journal line, which loading skips. Journal
+# records are JSON in either snapshot format.
+#
+# The game does not write on its own thread: it marks targets dirty on a SaveQueue, which
+# serializes each one once per burst and hands the text to a single writer thread.
+
+JOURNAL_COMPACT_BYTES = 256 * 1024
+PROFILE_SUMMARY_KEYS = ("name", "char", "money", "play_time", "unlocked_pet_slots")
+
+
+def write_bytes_atomic(path, data):
+    """
+    Writes data to a temp file next to path, then swaps it in, so readers never see a half-written file.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def write_text_atomic(path, text):
+    write_bytes_atomic(path, text.encode())
+
+
+def append_text(path, text):
+    with open(path, "a") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def remove_file(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+class SaveJournal:
+    """
+    Snapshot plus append-only journal for one saved document (a dict, or None for an empty slot).
+
+    Args:
+        snapshot_path (str): Where the snapshot is written.
+        journal_path (str): The journal file; defaults to snapshot_path + ".journal".
+        codec: How the snapshot is written (save_format.JSON_CODEC or BINARY_CODEC).
+    """
+    def __init__(self, snapshot_path, journal_path=None, codec=JSON_CODEC):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path or f"{snapshot_path}.journal"
+        self.codec = codec
+        self.persisted = None  # {key: JSON text} as last written
+        self.journal_bytes = 0
+
+    def load(self, read_path=None):
+        """
+        Reads the snapshot (from read_path if given, e.g. a differently-cased file) and replays the journal.
+
+        Returns:
+            dict: The document, or None if it was never saved or was deleted.
+        """
+        document = None
+        path = read_path or self.snapshot_path
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                document = self.codec.loads(f.read())
+        replayed, damaged = 0, False
+        if os.path.exists(self.journal_path):
+            self.journal_bytes = os.path.getsize(self.journal_path)
+            with open(self.journal_path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        print(f"Warning: skipped a damaged record in '{self.journal_path}'.")
+                        damaged = True
+                        continue
+                    document = self.apply(document, record)
+                    replayed += 1
+        self.persisted = self.encode(document)
+        if replayed:
+            print(f"Replayed {replayed} saves from '{self.journal_path}'.")
+        if damaged:
+            # New records must not be appended after a cut-off line.
+            self.compact(document)
+        return document
+
+    @staticmethod
+    def apply(document, record):
+        if "doc" in record:
+            return record["doc"]
+        document = document if document is not None else {}
+        document.update(record.get("set", {}))
+        for key in record.get("del", []):
+            document.pop(key, None)
+        return document
+
+    @staticmethod
+    def encode(document):
+        if document is None: return None
+        return {key: json.dumps(value, separators=(",", ":")) for key, value in document.items()}
+
+    def diff(self, document):
+        """
+        Compares document with what was last written.
+
+        Returns:
+            tuple: (journal record, or None if nothing changed; the document's encoded keys)
+        """
+        encoded = self.encode(document)
+        old = self.persisted
+        if encoded == old:
+            return None, encoded
+        if encoded is None or not old:
+            return {"doc": document}, encoded
+        changed = [key for key, text in encoded.items() if old.get(key) != text]
+        removed = [key for key in old if key not in encoded]
+        record = {}
+        if changed: record["set"] = {key: document[key] for key in changed}
+        if removed: record["del"] = removed
+        return record, encoded
+
+    def prepare_save(self, document):
+        """
+        Serializes the changed keys as one journal record, or the whole snapshot once the journal has
+        grown past JOURNAL_COMPACT_BYTES. Runs on the caller's thread; only the returned write touches the disk.
+
+        Returns:
+            callable: The disk write, or None if nothing changed.
+        """
+        record, encoded = self.diff(document)
+        if record is None:
+            return None
+        if document is None:
+            return self.prepare_compact(None)
+        self.persisted = encoded
+        text = json.dumps(record, separators=(",", ":")) + "\n"
+        self.journal_bytes += len(text.encode())
+        if self.journal_bytes > JOURNAL_COMPACT_BYTES:
+            return self.prepare_compact(document)
+        return lambda: append_text(self.journal_path, text)
+
+    def prepare_compact(self, document):
+        """
+        Serializes the document into a new snapshot. A None document removes the files instead.
+
+        Returns:
+            callable: Writes the snapshot and removes the journal.
+        """
+        data = self.codec.dumps(document) if document is not None else None
+        self.persisted = self.encode(document)
+        self.journal_bytes = 0
+        def write():
+            if data is None:
+                remove_file(self.snapshot_path)
+            else:
+                write_bytes_atomic(self.snapshot_path, data)
+            remove_file(self.journal_path)
+        return write
+
+    def save(self, document):
+        write = self.prepare_save(document)
+        if write: write()
+
+    def compact(self, document):
+        self.prepare_compact(document)()
+
+
+def load_legacy_profiles(snapshot_path, journal_path, slots=3):
+    """
+    Reads the old single-file format: profiles.json as a list of slots plus its slot-tagged journal.
+
+    Returns:
+        list: The profile slots.
+    """
+    with open(snapshot_path) as f:
+        profiles = json.load(f)
+    if os.path.exists(journal_path):
+        with open(journal_path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                index = record["slot"]
+                while len(profiles) <= index:
+                    profiles.append(None)
+                if "profile" in record:
+                    profiles[index] = record["profile"]
+                else:
+                    profiles[index] = SaveJournal.apply(profiles[index], record)
+    return (profiles + [None] * slots)[:slots]
+
+
+class ProfileStore:
+    """
+    One save file per profile slot plus a small index of what the profile screen shows.
+
+    Only the index is read at startup; a slot's full profile is read when it is picked.
+    Slots that were never loaded are never written, so a save costs one profile, not all of them.
+
+    Args:
+        directory (str): Folder for index.json and the profile_<slot> files.
+        slots (int): Number of save slots.
+        codec: Format of the profile files; the index is always JSON.
+    """
+    def __init__(self, directory, slots=3, codec=JSON_CODEC):
+        self.directory = directory
+        self.slots = slots
+        self.codec = codec
+        self.index_path = os.path.join(directory, "index.json")
+        self.journals = [SaveJournal(self.profile_path(slot, codec), codec=codec) for slot in range(slots)]
+        self.index = [None] * slots  # per slot: None or the summary dict
+        self.index_text = None  # the index as last written
+        self.loaded = set()  # slots whose full profile is held by the caller
+
+    def profile_path(self, slot, codec):
+        return os.path.join(self.directory, f"profile_{slot}{codec.suffix}")
+
+    @staticmethod
+    def summarize(profile):
+        if profile is None: return None
+        summary = {key: profile[key] for key in PROFILE_SUMMARY_KEYS if key in profile}
+        summary["pet_count"] = len(profile.get("pets", []))
+        return summary
+
+    def load_index(self, legacy_path=None, legacy_journal_path=None):
+        """
+        Reads the slot summaries. The first time, profiles saved in the old single-file format
+        (legacy_path plus its journal) are split into per-slot files; the old files are left untouched.
+
+        Returns:
+            list: One summary dict (or None) per slot. The list is updated in place by later saves.
+        """
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                saved = json.load(f)
+            self.index[:] = (saved + [None] * self.slots)[:self.slots]
+            self.index_text = json.dumps(self.index, indent=2)
+        elif legacy_path and os.path.exists(legacy_path):
+            profiles = load_legacy_profiles(legacy_path, legacy_journal_path or f"{legacy_path}.journal", self.slots)
+            os.makedirs(self.directory, exist_ok=True)
+            for slot, profile in enumerate(profiles):
+                if profile is not None:
+                    self.journals[slot].compact(profile)
+                self.index[slot] = self.summarize(profile)
+            self.index_text = json.dumps(self.index, indent=2)
+            write_text_atomic(self.index_path, self.index_text)
+            print(f"Moved {sum(p is not None for p in profiles)} profiles into '{self.directory}'.")
+        # An empty slot has nothing to read, so it counts as loaded.
+        self.loaded = {slot for slot in range(self.slots) if self.index[slot] is None}
+        return self.index
+
+    def load_profile(self, slot):
+        """
+        Reads one slot's full profile and migrates it to the current schema. A profile saved in
+        the other format is rewritten in this store's format.
+
+        Returns:
+            dict: The profile, or None if the slot is empty.
+        """
+        journal = self.journals[slot]
+        if os.path.exists(journal.snapshot_path) or os.path.exists(journal.journal_path):
+            profile = journal.load()
+        else:
+            profile = None
+            for codec in CODECS.values():
+                old = SaveJournal(self.profile_path(slot, codec), codec=codec)
+                if codec is not self.codec and os.path.exists(old.snapshot_path):
+                    profile = old.load()
+                    journal.compact(profile)
+                    old.compact(None)
+                    print(f"Converted profile {slot + 1} to the {self.codec.name} save format.")
+                    break
+        if profile is None and self.index[slot] is not None:
+            print(f"Warning: the save file for profile {slot + 1} is missing.")
+        self.loaded.add(slot)
+        return migrate_profile(profile) if profile is not None else None
+
+    def delete(self, slot):
+        """
+        Empties a slot right away in the index; its files are removed by the next save.
+        """
+        self.index[slot] = None
+        self.loaded.add(slot)
+        # Make the journal see a change even if this slot was never read.
+        self.journals[slot].persisted = {}
+
+    def prepare_save(self, profiles):
+        """
+        Serializes every loaded slot that changed, plus the index when a summary changed.
+
+        Returns:
+            callable: The disk writes, or None if nothing changed.
+        """
+        writes = []
+        for slot in sorted(self.loaded):
+            write = self.journals[slot].prepare_save(profiles[slot])
+            if write: writes.append(write)
+        for slot in self.loaded:
+            self.index[slot] = self.summarize(profiles[slot])
+        text = json.dumps(self.index, indent=2)
+        if text != self.index_text:
+            self.index_text = text
+            writes.append(lambda: write_text_atomic(self.index_path, text))
+        if not writes:
+            return None
+        def write_all():
+            os.makedirs(self.directory, exist_ok=True)
+            for write in writes:
+                write()
+        return write_all
+
+    def compact(self, slot, profile):
+        self.journals[slot].compact(profile)
+
+
+class SaveQueue:
+    """
+    Coalesces saves and runs the disk work on one background writer thread.
+
+    register(name, prepare) adds a save target: prepare() runs on the caller's thread, serializes
+    the target and returns the disk write (or None). mark_dirty(name) only notes the time; pump()
+    prepares each target once it has been dirty for coalesce_seconds, so a burst of changes becomes
+    one write. The single writer thread keeps writes in the order they were prepared.
+    """
+    def __init__(self, coalesce_seconds):
+        self.coalesce_seconds = coalesce_seconds
+        self.targets = {}
+        self.dirty_since = {}
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.last_write = None
+
+    def register(self, name, prepare):
+        self.targets[name] = prepare
+
+    def mark_dirty(self, name):
+        self.dirty_since.setdefault(name, time.time())
+
+    def pump(self, force=False):
+        """
+        Hands the targets that are due to the writer thread. Never waits for the disk.
+        """
+        now = time.time()
+        for name, since in list(self.dirty_since.items()):
+            if force or now - since >= self.coalesce_seconds:
+                del self.dirty_since[name]
+                write = self.targets[name]()
+                if write:
+                    self.last_write = self.executor.submit(self.run_write, name, write)
+
+    @staticmethod
+    def run_write(name, write):
+        """
+        Runs on the writer thread. Every failure is reported here, since a coalesced write's
+        Future is never looked at again.
+        """
+        try:
+            write()
+        except OSError as e:
+            print(f"Warning: could not save {name}: {e}")
+        except Exception:
+            print(f"Error: saving {name} failed:")
+            traceback.print_exc()
+
+    def flush(self):
+        """
+        Writes every dirty target now and waits until the writer thread has finished.
+        """
+        self.pump(force=True)
+        if self.last_write:
+            self.last_write.result()
@@ -0,0 +1,327 @@
+# shared_storage.py
+
+import json
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+# The storage building's shared items and pets, kept in one SQLite file so several game
+# instances (e.g. kiosks pointed at one shared folder) can use it at the same time.
+# Nothing here imports pygame.
+#
+# Every deposit and retrieval is its own transaction that changes only the rows it touches,
+# so two instances never overwrite each other's transfers: a deposit adds to whatever is
+# there now, and a retrieval fails cleanly if another instance already took the items or pet.
+# SQLite's file lock serializes writers; PRAGMA data_version tells an instance when another
+# one has committed, so refresh() only re-reads the tables after a real change.
+#
+# All database work runs on one worker thread that owns the connection, so the game's frame
+# never waits for the lock or a commit. Transfers take a finish callback that pump() runs on
+# the game's thread once the worker is done; a successful transfer patches items / pets in
+# place instead of re-reading the tables.
+#
+# A transfer changes two stores: this database and the player's profile file. So each transfer
+# also leaves a row in the transfers table, committed with it, under the profile's storage owner
+# id. The game saves the transfer id in the profile together with the inventory change, and when
+# the profile is next loaded, pending_transfers() tells it which transfers the saved profile
+# missed (applied then) and which it already has (settled, i.e. forgotten). A crash between the
+# two writes neither loses nor duplicates anything.
+#
+# Network filesystems differ in how well they honour SQLite's locks; a local disk or SMB share
+# with locking enabled is the safe choice.
+
+BUSY_TIMEOUT_SECONDS = 5.0
+REFRESH_INTERVAL_SECONDS = 0.5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (item_id TEXT PRIMARY KEY, quantity INTEGER NOT NULL CHECK (quantity > 0));
+CREATE TABLE IF NOT EXISTS pets (storage_id INTEGER PRIMARY KEY AUTOINCREMENT, data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS transfers (transfer_id INTEGER PRIMARY KEY AUTOINCREMENT, owner TEXT NOT NULL, record TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS transfers_by_owner ON transfers (owner);
+"""
+
+
+class SharedStorage:
+    """
+    Items and pets in the shared storage building.
+
+    items ({item_id: quantity}) and pets (pet dicts, each with its "storage_id") mirror the
+    database as of the last refresh or transfer made by this instance. Only the game's thread
+    touches them; the worker hands its results over through pump().
+
+    Args:
+        path (str): The SQLite file shared by every instance.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shared-storage")
+        self.pending = deque()
+        self.connection = None
+        self.data_version = None
+        self.items = {}
+        self.pets = []
+        self.transfers_in_flight = 0
+        self.refreshing = False
+        self.refreshed = False
+        self.next_refresh = 0.0
+        self.install(self.call(self.run_open))
+
+    # -------------------- GAME THREAD --------------------
+    def call(self, work, *args):
+        """
+        Runs work on the worker and waits for it. Only for startup, profile loads and shutdown.
+        """
+        return self.executor.submit(work, *args).result()
+
+    def submit(self, work, finish, *args):
+        self.pending.append((self.executor.submit(work, *args), finish))
+
+    def pump(self):
+        """
+        Runs the finish callbacks of finished calls, in the order the calls were made. Call it every frame.
+        """
+        while self.pending and self.pending[0][0].done():
+            future, finish = self.pending.popleft()
+            finish(future.result())
+
+    def wait(self):
+        """
+        Waits for every call in flight and runs its finish callback.
+        """
+        while self.pending:
+            future, finish = self.pending.popleft()
+            finish(future.result())
+
+    def install(self, contents):
+        self.items, self.pets = contents
+
+    def is_new(self):
+        return self.call(self.run_is_new)
+
+    def import_legacy(self, data, schema_version):
+        """
+        Fills a new database from the old global storage file ({"items": {...}, "pets": [...]},
+        possibly empty). Only the first instance to get here imports; the others see the marker and skip.
+
+        Returns:
+            bool: True if this call imported the data.
+        """
+        imported = self.call(self.run_import_legacy, data, schema_version)
+        if imported:
+            self.install(self.call(self.run_read_all))
+        return imported
+
+    def refresh(self):
+        """
+        Asks the worker, at most every REFRESH_INTERVAL_SECONDS, whether another instance changed the storage.
+
+        Returns:
+            bool: True if items or pets were reloaded since the last call.
+        """
+        self.pump()
+        now = time.monotonic()
+        if not self.refreshing and now >= self.next_refresh:
+            self.refreshing = True
+            self.next_refresh = now + REFRESH_INTERVAL_SECONDS
+            self.submit(self.run_refresh, self.finish_refresh)
+        refreshed, self.refreshed = self.refreshed, False
+        return refreshed
+
+    def finish_refresh(self, contents):
+        self.refreshing = False
+        if contents is not None:
+            self.install(contents)
+            self.refreshed = True
+
+    def start_transfer(self, work, patch, finish, *args):
+        """
+        Submits a transfer. patch(result) updates items / pets if it succeeded, then finish(result) runs.
+        """
+        self.transfers_in_flight += 1
+        def done(result):
+            self.transfers_in_flight -= 1
+            if result is not None:
+                patch(result)
+            finish(result)
+        self.submit(work, done, *args)
+
+    def deposit_item(self, owner, item_id, quantity, finish):
+        """
+        Adds quantity to whatever is stored now. finish(transfer_id) gets None if the
+        database stayed locked for BUSY_TIMEOUT_SECONDS.
+        """
+        def patch(transfer_id):
+            self.items[item_id] = self.items.get(item_id, 0) + quantity
+        record = {"kind": "item", "direction": "store", "item_id": item_id, "quantity": quantity}
+        self.start_transfer(self.run_deposit_item, patch, finish, owner, record)
+
+    def withdraw_item(self, owner, item_id, quantity, finish):
+        """
+        Takes quantity out only if that many are still stored. finish(transfer_id) gets None if not.
+        """
+        def patch(transfer_id):
+            left = self.items.get(item_id, 0) - quantity
+            if left > 0: self.items[item_id] = left
+            else: self.items.pop(item_id, None)
+        record = {"kind": "item", "direction": "retrieve", "item_id": item_id, "quantity": quantity}
+        self.start_transfer(self.run_withdraw_item, patch, finish, owner, record)
+
+    def deposit_pet(self, owner, pet, finish):
+        """
+        Stores a copy of pet. finish(transfer_id) gets None if the database stayed locked.
+        """
+        pet = dict(pet)
+        def patch(result):
+            transfer_id, storage_id = result
+            self.pets.append(dict(pet, storage_id=storage_id))
+        record = {"kind": "pet", "direction": "store", "pet": pet}
+        self.start_transfer(self.run_deposit_pet, patch, lambda result: finish(result and result[0]), owner, record)
+
+    def withdraw_pet(self, owner, storage_id, finish):
+        """
+        Takes one stored pet out. finish((transfer_id, pet without "storage_id")) gets None
+        if another instance took it first.
+        """
+        def patch(result):
+            self.pets = [pet for pet in self.pets if pet["storage_id"] != storage_id]
+        self.start_transfer(self.run_withdraw_pet, patch, finish, owner, storage_id)
+
+    def pending_transfers(self, owner):
+        """
+        Returns [(transfer_id, record)] for owner's transfers not yet settled, oldest first.
+        """
+        return self.call(self.run_pending_transfers, owner)
+
+    def settle_transfers(self, transfer_ids):
+        """
+        Forgets transfers the owner's saved profile already contains.
+        """
+        if transfer_ids:
+            self.submit(self.run_settle_transfers, lambda settled: None, list(transfer_ids))
+
+    def close(self):
+        self.wait()
+        self.call(self.run_close)
+        self.executor.shutdown()
+
+    # -------------------- WORKER THREAD --------------------
+    def run_open(self):
+        self.connection = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+        return self.run_read_all()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Takes the write lock up front, so the checks inside a transfer still hold when it commits.
+        """
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.connection.cursor()
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+
+    def run_is_new(self):
+        return self.connection.execute("SELECT value FROM meta WHERE key = 'created'").fetchone() is None
+
+    def run_import_legacy(self, data, schema_version):
+        with self.transaction() as cursor:
+            if cursor.execute("SELECT value FROM meta WHERE key = 'created'").fetchone():
+                return False
+            for item_id, quantity in data.get("items", {}).items():
+                if quantity > 0:
+                    cursor.execute("INSERT INTO items VALUES (?, ?)", (item_id, quantity))
+            for pet in data.get("pets", []):
+                cursor.execute("INSERT INTO pets (data) VALUES (?)", (json.dumps(pet),))
+            cursor.execute("INSERT INTO meta VALUES ('created', 'imported'), ('schema_version', ?)", (str(schema_version),))
+        return True
+
+    def run_read_all(self):
+        items = dict(self.connection.execute("SELECT item_id, quantity FROM items").fetchall())
+        pets = []
+        for storage_id, data in self.connection.execute("SELECT storage_id, data FROM pets"):
+            pet = json.loads(data)
+            pet["storage_id"] = storage_id
+            pets.append(pet)
+        # Commits on this connection never change its data_version, only other instances' commits do.
+        self.data_version = self.connection.execute("PRAGMA data_version").fetchone()[0]
+        return items, pets
+
+    def run_refresh(self):
+        try:
+            if self.connection.execute("PRAGMA data_version").fetchone()[0] == self.data_version:
+                return None
+            return self.run_read_all()
+        except sqlite3.OperationalError as e:
+            print(f"Warning: could not read shared storage: {e}")
+            return None
+
+    @staticmethod
+    def record_transfer(cursor, owner, record):
+        cursor.execute("INSERT INTO transfers (owner, record) VALUES (?, ?)", (owner, json.dumps(record)))
+        return cursor.lastrowid
+
+    def run_deposit_item(self, owner, record):
+        try:
+            with self.transaction() as cursor:
+                cursor.execute("INSERT INTO items VALUES (?, ?) ON CONFLICT (item_id) DO UPDATE SET quantity = quantity + excluded.quantity",
+                               (record["item_id"], record["quantity"]))
+                return self.record_transfer(cursor, owner, record)
+        except sqlite3.OperationalError as e:
+            print(f"Warning: could not store {record['item_id']}: {e}")
+            return None
+
+    def run_withdraw_item(self, owner, record):
+        item_id, quantity = record["item_id"], record["quantity"]
+        try:
+            with self.transaction() as cursor:
+                taken = cursor.execute("UPDATE items SET quantity = quantity - ? WHERE item_id = ? AND quantity > ?",
+                                       (quantity, item_id, quantity)).rowcount
+                if not taken:
+                    taken = cursor.execute("DELETE FROM items WHERE item_id = ? AND quantity = ?", (item_id, quantity)).rowcount
+                return self.record_transfer(cursor, owner, record) if taken == 1 else None
+        except sqlite3.OperationalError as e:
+            print(f"Warning: could not retrieve {item_id}: {e}")
+            return None
+
+    def run_deposit_pet(self, owner, record):
+        try:
+            with self.transaction() as cursor:
+                cursor.execute("INSERT INTO pets (data) VALUES (?)", (json.dumps(record["pet"]),))
+                storage_id = cursor.lastrowid
+                return self.record_transfer(cursor, owner, record), storage_id
+        except sqlite3.OperationalError as e:
+            print(f"Warning: could not store {record['pet'].get('name')}: {e}")
+            return None
+
+    def run_withdraw_pet(self, owner, storage_id):
+        try:
+            with self.transaction() as cursor:
+                rows = cursor.execute("DELETE FROM pets WHERE storage_id = ? RETURNING data", (storage_id,)).fetchall()
+                if not rows:
+                    return None
+                pet = json.loads(rows[0][0])
+                return self.record_transfer(cursor, owner, {"kind": "pet", "direction": "retrieve", "pet": pet}), pet
+        except sqlite3.OperationalError as e:
+            print(f"Warning: could not retrieve a pet: {e}")
+            return None
+
+    def run_pending_transfers(self, owner):
+        rows = self.connection.execute("SELECT transfer_id, record FROM transfers WHERE owner = ? ORDER BY transfer_id", (owner,))
+        return [(transfer_id, json.loads(record)) for transfer_id, record in rows]
+
+    def run_settle_transfers(self, transfer_ids):
+        try:
+            with self.transaction() as cursor:
+                cursor.executemany("DELETE FROM transfers WHERE transfer_id = ?", [(i,) for i in transfer_ids])
+        except sqlite3.OperationalError as e:
+            print(f"Warning: could not settle storage transfers: {e}")
+
+    def run_close(self):
+        self.connection.close()